@@ -0,0 +1,165 @@
+"""
+Admission control for chat requests.
+
+At most `max_active` chats run at once per worker. Further requests wait in a bounded
+FIFO queue for up to `max_wait` seconds; when the queue is full, the wait runs out, or
+one client already has `max_per_client` chats running or queued, the request is turned
+away at once with a status code and a Retry-After estimate instead of slowing down
+every chat in flight. A batch that answers several chats at once holds one slot per
+concurrent item.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from metrics import ADMISSION_ACTIVE, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, ADMISSION_WAIT
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted; carries the HTTP status and Retry-After seconds"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Admission:
+    """Granted slots (one per concurrent chat); release them exactly once when the work finishes"""
+
+    def __init__(self, controller: "AdmissionController", client_id: str):
+        self._controller = controller
+        self._client_id = client_id
+        self._started = time.monotonic()
+        self._released = False
+        self.slots = 1
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(self._client_id, time.monotonic() - self._started)
+            for _ in range(self.slots - 1):
+                self._controller._release(self._client_id, None)
+
+
+class AdmissionController:
+    def __init__(self, max_active: int, max_queue: int, max_wait: float, max_per_client: int):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_per_client = max_per_client
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._per_client: Dict[str, int] = {}
+        # Smoothed chat duration, for Retry-After estimates
+        self._service_seconds = 1.0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained, rounded up"""
+        backlog = (len(self._waiters) + 1) / max(self.max_active, 1)
+        return min(60, max(1, math.ceil(self._service_seconds * backlog)))
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        ADMISSION_REJECTIONS.inc(reason=reason)
+        return AdmissionRejected(status_code, reason, self.retry_after())
+
+    async def acquire(self, client_id: str, slots: int = 1) -> Admission:
+        """
+        Wait for a slot; raises AdmissionRejected when the request should be turned away.
+        Up to `slots - 1` more are added if free right now (nobody queued, within the client's
+        limit), so a batch never waits holding slots; `Admission.slots` says how many it got.
+        """
+        admission = await self._acquire(client_id)
+        while (
+            admission.slots < slots
+            and self._active < self.max_active
+            and not self._waiters
+            and self._per_client.get(client_id, 0) < self.max_per_client
+        ):
+            self._active += 1
+            self._per_client[client_id] += 1
+            admission.slots += 1
+        ADMISSION_ACTIVE.set(self._active)
+        return admission
+
+    async def _acquire(self, client_id: str) -> Admission:
+        if self._per_client.get(client_id, 0) >= self.max_per_client:
+            raise self._reject(429, "client_limit")
+        if self._active < self.max_active and not self._waiters:
+            return self._admit(client_id, 0.0)
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject(503, "queue_full")
+
+        queued_at = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._per_client[client_id] = self._per_client.get(client_id, 0) + 1
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+        try:
+            await asyncio.wait({waiter}, timeout=self.max_wait)
+        except asyncio.CancelledError:
+            # The client went away while queued; pass on a slot that was just handed over
+            self._leave_queue(waiter, client_id)
+            if waiter.done() and not waiter.cancelled():
+                self._release(client_id, 0.0, counted=False)
+            raise
+        self._leave_queue(waiter, client_id)
+        if not waiter.done() or waiter.cancelled():
+            waiter.cancel()
+            raise self._reject(503, "queue_timeout")
+        return self._admit(client_id, time.monotonic() - queued_at, counted=False)
+
+    def _leave_queue(self, waiter: asyncio.Future, client_id: str) -> None:
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        self._drop_client(client_id)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+    def _drop_client(self, client_id: str) -> None:
+        remaining = self._per_client.get(client_id, 0) - 1
+        if remaining > 0:
+            self._per_client[client_id] = remaining
+        else:
+            self._per_client.pop(client_id, None)
+
+    def _admit(self, client_id: str, waited: float, counted: bool = True) -> Admission:
+        # A slot handed over by _release is already counted as active
+        if counted:
+            self._active += 1
+        self._per_client[client_id] = self._per_client.get(client_id, 0) + 1
+        self.admitted += 1
+        ADMISSION_ACTIVE.set(self._active)
+        ADMISSION_WAIT.observe(waited)
+        return Admission(self, client_id)
+
+    def _release(self, client_id: str, elapsed: Optional[float], counted: bool = True) -> None:
+        # elapsed is None for a batch's extra slots, which say nothing new about chat duration
+        if counted:
+            self._drop_client(client_id)
+            if elapsed is not None:
+                self._service_seconds = 0.8 * self._service_seconds + 0.2 * elapsed
+        # Hand the slot straight to the longest waiter so it can't be taken out of turn
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+                return
+        self._active -= 1
+        ADMISSION_ACTIVE.set(self._active)
+
+    def stats(self) -> Dict:
+        return {
+            "active": self._active,
+            "queued": len(self._waiters),
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "retry_after_seconds": self.retry_after(),
+        }
@@ -1,31 +1,249 @@
+import asyncio
 import json
 import logging
-from typing import Dict, Optional, List
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional, List, Tuple
 from datetime import datetime, timedelta
-from openai import OpenAI
-from config import OPENAI_API_KEY, SYSTEM_PROMPT
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_TIMEOUT,
+    OPENAI_MAX_CONCURRENT_REQUESTS,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    TOOL_EXECUTOR_WORKERS,
+    TOOL_CACHE_MAX_ENTRIES,
+    TOOL_CACHE_MAX_BYTES,
+    TOOL_CACHE_TTL_SECONDS,
+    TRANSACTION_PAYLOAD_FORMAT,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_SUMMARY_CHUNK,
+    HISTORY_SUMMARY_MODEL,
+    HISTORY_SUMMARY_MAX_TOKENS,
+    HISTORY_SUMMARY_PROMPT,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_HISTORY_MESSAGES,
+    FAST_PATH_ENABLED,
+    REQUEST_COALESCING_ENABLED,
+    BATCH_MAX_CONCURRENCY,
+    SYSTEM_PROMPT
+)
+from cache import TTLCache
+from charts import CHART_TYPES, build_chart_request, chart_block, summarize_chart
+from metrics import (
+    CHAT_COALESCED,
+    LLM_DURATION,
+    LLM_ERRORS,
+    LLM_TOKENS,
+    TOOL_CALLS,
+    TOOL_DURATION,
+    TOOL_PAYLOAD_BYTES,
+    RequestTrace
+)
+from history import HistoryManager, fallback_summary
+from response_cache import ResponseCache, history_hash, normalize_query
+from singleflight import SingleFlight
+from intent_router import router as intent_router
+from payloads import dumps, encode_transactions, payload_stats
 from data import (
     get_customer, 
-    get_all_transactions,
+    get_data_version,
+    get_data_fingerprint,
     get_transactions_by_date_range,
-    get_current_month_transactions,
-    get_current_week_transactions,
-    get_current_year_transactions
+    get_current_month_window,
+    get_current_week_window,
+    get_current_year_window,
+    get_spending_by_category,
+    get_spending_by_merchant,
+    get_spending_over_time,
+    get_income_vs_expense,
+    get_top_transactions,
+    get_anomalous_transactions,
+    get_recurring_payments,
+    warm_customer,
+    ANOMALY_THRESHOLD,
+    CHART_GROUPINGS,
+    CHART_METRICS,
+    DEFAULT_CUSTOMER_ID
 )
-from models import MessageType
+from models import BotRequest, MessageType
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client with error handling
-try:
-    if not OPENAI_API_KEY:
-        raise ValueError("OpenAI API key is not configured")
-    client = OpenAI(api_key=OPENAI_API_KEY)
-except Exception as e:
-    logger.error(f"Failed to initialize OpenAI client: {e}")
-    client = None
+# The async OpenAI client is created on first use: importing the SDK (and httpx) is the
+# largest part of worker import time, so it stays off the startup path.
+# All requests share one pooled HTTP client so connections are reused across chats.
+_client = None
+_client_initialized = False
+_client_lock = threading.Lock()
+
+
+def preload_openai():
+    """Import the OpenAI SDK ahead of the first request (called off the event loop at startup)"""
+    import openai  # noqa: F401
+
+
+def get_client():
+    """Get the shared OpenAI client, or None when it is not configured"""
+    global _client, _client_initialized
+    if _client_initialized:
+        return _client
+    with _client_lock:
+        if not _client_initialized:
+            try:
+                if not OPENAI_API_KEY:
+                    raise ValueError("OpenAI API key is not configured")
+                import httpx
+                from openai import AsyncOpenAI
+                _client = AsyncOpenAI(
+                    api_key=OPENAI_API_KEY,
+                    base_url=OPENAI_BASE_URL,
+                    timeout=OPENAI_TIMEOUT,
+                    http_client=httpx.AsyncClient(
+                        timeout=OPENAI_TIMEOUT,
+                        limits=httpx.Limits(
+                            max_connections=OPENAI_MAX_CONNECTIONS,
+                            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS
+                        )
+                    )
+                )
+            except Exception as e:
+                logger.error(f"Failed to initialize OpenAI client: {e}")
+                _client = None
+            _client_initialized = True
+    return _client
+
+# Bounds the number of chat completion calls in flight at once on this worker
+_llm_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENT_REQUESTS)
+
+# Bounded pool for running tool calls off the event loop
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_WORKERS, thread_name_prefix="finbot-tool")
+
+# Serialized tool results, keyed by data version, tool and resolved date window
+_tool_result_cache = TTLCache(
+    max_entries=TOOL_CACHE_MAX_ENTRIES,
+    ttl_seconds=TOOL_CACHE_TTL_SECONDS,
+    max_bytes=TOOL_CACHE_MAX_BYTES
+)
+
+# Tool results being computed, by cache key: concurrent identical calls (e.g. batch items
+# asking about the same window) wait for the first one instead of computing it again
+_tool_flights: Dict[Tuple, Future] = {}
+_tool_flights_lock = threading.Lock()
+
+
+# Persistent cache of final responses for repeated questions against unchanged data
+response_cache = None
+if RESPONSE_CACHE_ENABLED:
+    try:
+        response_cache = ResponseCache(
+            RESPONSE_CACHE_PATH,
+            ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+            recent_messages=RESPONSE_CACHE_HISTORY_MESSAGES
+        )
+    except Exception as e:
+        logger.error(f"Failed to open response cache at {RESPONSE_CACHE_PATH}: {e}")
+
+
+class _MeteredStream:
+    """
+    A streamed chat completion that keeps its concurrency slot, and its latency timer
+    running, until the stream has been read to the end or closed.
+    """
+
+    def __init__(self, stream, model: str, started: float):
+        self._stream = stream
+        self._model = model
+        self._started = started
+        self._closed = False
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception as e:
+            LLM_ERRORS.inc(model=self._model, error=type(e).__name__)
+            raise
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Release the slot and record the call; safe to call more than once"""
+        if self._closed:
+            return
+        self._closed = True
+        _llm_semaphore.release()
+        LLM_DURATION.observe(time.perf_counter() - self._started, model=self._model, stream="true")
+        try:
+            await self._stream.close()
+        except Exception as e:
+            logger.debug(f"Error closing completion stream: {e}")
+
+
+async def create_chat_completion(**kwargs):
+    """
+    Call the chat completions API without blocking the event loop. Streamed calls return
+    a stream that holds its concurrency slot until it is exhausted or closed.
+    """
+    model = kwargs.get("model", "")
+    if kwargs.get("stream"):
+        await _llm_semaphore.acquire()
+        started = time.perf_counter()
+        try:
+            stream = await get_client().chat.completions.create(**kwargs)
+        except Exception as e:
+            _llm_semaphore.release()
+            LLM_ERRORS.inc(model=model, error=type(e).__name__)
+            raise
+        return _MeteredStream(stream, model, started)
+
+    async with _llm_semaphore:
+        started = time.perf_counter()
+        try:
+            response = await get_client().chat.completions.create(**kwargs)
+        except Exception as e:
+            LLM_ERRORS.inc(model=model, error=type(e).__name__)
+            raise
+    LLM_DURATION.observe(time.perf_counter() - started, model=model, stream="false")
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens, model=model, kind="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens, model=model, kind="completion")
+    return response
+
+
+async def close_client():
+    """Close the pooled HTTP connections held by the OpenAI client and stop the tool executor"""
+    if _client is not None:
+        await _client.close()
+    _tool_executor.shutdown(wait=False)
+    if response_cache is not None:
+        response_cache.close()
+
+# Date window parameters shared by the aggregation tools
+DATE_WINDOW_PROPERTIES = {
+    "start_date": {
+        "type": "string",
+        "description": "Start date in YYYY-MM-DD format. Defaults to January 1st of the current year."
+    },
+    "end_date": {
+        "type": "string",
+        "description": "End date in YYYY-MM-DD format. Defaults to today."
+    },
+    "days": {
+        "type": "integer",
+        "description": "Look back N days from today instead of giving start_date/end_date"
+    }
+}
 
 # Define tools/functions for GPT to call
 TOOLS = [
@@ -120,6 +338,183 @@ TOOLS = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_spending_by_category",
+            "description": "Get total spend, count and percentage share per category for a date range. Prefer this over raw transactions for category breakdowns and 'how much did I spend on X' questions.",
+            "parameters": {
+                "type": "object",
+                "properties": {**DATE_WINDOW_PROPERTIES},
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_spending_by_merchant",
+            "description": "Get total spend and count per merchant for a date range, optionally within one category. Use this for 'where do I spend the most' or merchant questions.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    **DATE_WINDOW_PROPERTIES,
+                    "category": {
+                        "type": "string",
+                        "description": "Only include merchants in this category, e.g. 'Dining'"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Return only the top N merchants"
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_spending_over_time",
+            "description": "Get spend and income totals per day, week or month for a date range. Use this for trends and period comparisons.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    **DATE_WINDOW_PROPERTIES,
+                    "granularity": {
+                        "type": "string",
+                        "enum": ["day", "week", "month"],
+                        "description": "Bucket size for the totals. Defaults to month."
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_income_vs_expense",
+            "description": "Get total income, total expenses, net savings and savings rate for a date range.",
+            "parameters": {
+                "type": "object",
+                "properties": {**DATE_WINDOW_PROPERTIES},
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_top_transactions",
+            "description": "Get the N largest expense or income transactions for a date range.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    **DATE_WINDOW_PROPERTIES,
+                    "n": {
+                        "type": "integer",
+                        "description": "Number of transactions to return (max 100). Defaults to 10."
+                    },
+                    "kind": {
+                        "type": "string",
+                        "enum": ["expense", "income"],
+                        "description": "Whether to rank expenses or income. Defaults to expense."
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "detect_anomalies",
+            "description": "Find unusual transactions in a date range: amounts far above what the customer normally pays in that category or at that merchant. Returns only the flagged transactions with their anomaly score and the typical amount they were compared with. Use this for questions about unusual, suspicious or anomalous transactions instead of fetching raw transactions.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    **DATE_WINDOW_PROPERTIES,
+                    "min_score": {
+                        "type": "number",
+                        "description": f"Minimum anomaly score (robust z-score) to report. Defaults to {ANOMALY_THRESHOLD}; lower it to see milder outliers."
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of transactions to return (max 100). Defaults to 20."
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_recurring_payments",
+            "description": "Find recurring payments across the customer's whole history: subscriptions, bills, rent, salary and other regular credits. Returns each series with its cadence (weekly, fortnightly, monthly, quarterly or yearly), usual day of the month, typical amount, number of occurrences and next expected date, plus the monthly total of recurring debits. Use this for questions about subscriptions, bills, regular or upcoming payments instead of fetching raw transactions.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "direction": {
+                        "type": "string",
+                        "enum": ["debit", "credit", "all"],
+                        "description": "debit for outgoing payments (subscriptions, bills, rent), credit for regular income such as salary. Defaults to all."
+                    },
+                    "include_inactive": {
+                        "type": "boolean",
+                        "description": "Also return series that appear to have stopped. Defaults to false."
+                    }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "build_chart",
+            "description": "Build a chart from the transaction data. The server computes every value and attaches the chart to your reply; you receive only a short summary. Use this whenever the user asks for a chart, graph or visualization.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    **DATE_WINDOW_PROPERTIES,
+                    "chart_type": {
+                        "type": "string",
+                        "enum": list(CHART_TYPES),
+                        "description": "pie for shares of a total, bar for comparisons, line for trends"
+                    },
+                    "metric": {
+                        "type": "string",
+                        "enum": list(CHART_METRICS),
+                        "description": "Value to plot: spend, income, net (income minus spend), count of transactions, or income_vs_expense (two series)"
+                    },
+                    "group_by": {
+                        "type": "string",
+                        "enum": list(CHART_GROUPINGS),
+                        "description": "One label per category, merchant, day, week or month"
+                    },
+                    "category": {
+                        "type": "string",
+                        "description": "Only include this category (e.g. Dining)"
+                    },
+                    "merchant": {
+                        "type": "string",
+                        "description": "Only include this merchant (e.g. Swiggy)"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Keep only the N largest categories or merchants"
+                    },
+                    "title": {
+                        "type": "string",
+                        "description": "Optional chart title"
+                    }
+                },
+                "required": ["chart_type", "metric", "group_by"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -135,114 +530,545 @@ TOOLS = [
 ]
 
 
-def execute_function(function_name: str, arguments: Dict) -> str:
-    """Execute a function call from GPT and return the result as JSON string"""
+def resolve_date_window(arguments: Dict) -> Tuple[str, str]:
+    """Resolve optional start_date/end_date/days tool arguments to a concrete date window"""
+    today = datetime.now()
+    if arguments.get("days"):
+        start_date = today - timedelta(days=int(arguments["days"]))
+        return start_date.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")
+    start_date = arguments.get("start_date") or datetime(today.year, 1, 1).strftime("%Y-%m-%d")
+    end_date = arguments.get("end_date") or today.strftime("%Y-%m-%d")
+    return start_date, end_date
+
+
+# Tools that return raw transaction rows. They all reduce to a date window, so
+# equivalent windows (e.g. last 7 days vs. an explicit range) share cached results.
+TRANSACTION_TOOLS = {
+    "get_transactions_by_date_range",
+    "get_transactions_last_n_days",
+    "get_transactions_last_n_months",
+    "get_current_month_transactions",
+    "get_current_week_transactions",
+    "get_current_year_transactions"
+}
+
+TOOL_NAMES = {tool["function"]["name"] for tool in TOOLS}
+
+# Payload encoding per raw-transaction tool; override entries to tune a single tool
+TOOL_PAYLOAD_FORMATS = {name: TRANSACTION_PAYLOAD_FORMAT for name in TRANSACTION_TOOLS}
+
+# Window arguments are folded into the resolved (start_date, end_date) of the cache key
+_WINDOW_ARGUMENTS = {"start_date", "end_date", "days", "months"}
+
+
+def resolve_tool_window(function_name: str, arguments: Dict) -> Optional[Tuple[str, str]]:
+    """Resolve the concrete (start_date, end_date) a tool call covers, or None if it has no window"""
+    if function_name in ("get_customer_info", "get_recurring_payments"):
+        return None
+    if function_name == "get_current_month_transactions":
+        return get_current_month_window()
+    if function_name == "get_current_week_transactions":
+        return get_current_week_window()
+    if function_name == "get_current_year_transactions":
+        return get_current_year_window()
+    if function_name == "get_transactions_by_date_range":
+        return arguments.get("start_date"), arguments.get("end_date")
+    
+    end_date = datetime.now()
+    if function_name == "get_transactions_last_n_days":
+        start_date = end_date - timedelta(days=arguments.get("days"))
+        return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+    if function_name == "get_transactions_last_n_months":
+        # Calculate approximate start date (months * 30 days)
+        start_date = end_date - timedelta(days=arguments.get("months") * 30)
+        return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+    
+    # Aggregation tools
+    return resolve_date_window(arguments)
+
+
+def tool_cache_key(
+    function_name: str, arguments: Dict, window: Optional[Tuple[str, str]], customer_id: str
+) -> Tuple:
+    """Build the result cache key: customer, data version, tool, resolved window and remaining arguments"""
+    version = get_data_version(customer_id)
+    if function_name in TRANSACTION_TOOLS:
+        return (customer_id, version, "transactions", window, TOOL_PAYLOAD_FORMATS[function_name])
+    extra_arguments = {k: v for k, v in arguments.items() if k not in _WINDOW_ARGUMENTS}
+    return (customer_id, version, function_name, window, json.dumps(extra_arguments, sort_keys=True))
+
+
+def get_tool_cache_stats() -> Dict:
+    """Hit/miss counters and occupancy of the tool result cache"""
+    return _tool_result_cache.stats()
+
+
+def execute_function(function_name: str, arguments: Dict, customer_id: str = DEFAULT_CUSTOMER_ID) -> str:
+    """Execute a function call from GPT against one customer's data and return the result as JSON string"""
+    started = time.perf_counter()
     try:
         logger.info(f"Executing function: {function_name} with args: {arguments}")
         
-        if function_name == "get_customer_info":
-            customer = get_customer()
-            return json.dumps(customer.model_dump(), indent=2)
-        
-        elif function_name == "get_current_month_transactions":
-            transactions = get_current_month_transactions()
-            return json.dumps([t.model_dump() for t in transactions], indent=2)
-        
-        elif function_name == "get_current_week_transactions":
-            transactions = get_current_week_transactions()
-            return json.dumps([t.model_dump() for t in transactions], indent=2)
-        
-        elif function_name == "get_current_year_transactions":
-            transactions = get_current_year_transactions()
-            return json.dumps([t.model_dump() for t in transactions], indent=2)
+        if function_name not in TOOL_NAMES:
+            TOOL_CALLS.inc(tool="unknown", outcome="unknown")
+            return json.dumps({"error": f"Unknown function: {function_name}"})
         
-        elif function_name == "get_transactions_by_date_range":
-            start_date = arguments.get("start_date")
-            end_date = arguments.get("end_date")
-            transactions = get_transactions_by_date_range(start_date, end_date)
-            return json.dumps([t.model_dump() for t in transactions], indent=2)
+        window = resolve_tool_window(function_name, arguments)
+        cache_key = tool_cache_key(function_name, arguments, window, customer_id)
+        cached = _tool_result_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Tool cache hit: {function_name} {window}")
+            TOOL_CALLS.inc(tool=function_name, outcome="cached")
+            TOOL_DURATION.observe(time.perf_counter() - started, tool=function_name, cached="true")
+            return cached
         
-        elif function_name == "get_transactions_last_n_days":
-            days = arguments.get("days")
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
-            transactions = get_transactions_by_date_range(
-                start_date.strftime("%Y-%m-%d"),
-                end_date.strftime("%Y-%m-%d")
-            )
-            return json.dumps([t.model_dump() for t in transactions], indent=2)
-        
-        elif function_name == "get_transactions_last_n_months":
-            months = arguments.get("months")
-            end_date = datetime.now()
-            # Calculate approximate start date (months * 30 days)
-            start_date = end_date - timedelta(days=months * 30)
-            transactions = get_transactions_by_date_range(
-                start_date.strftime("%Y-%m-%d"),
-                end_date.strftime("%Y-%m-%d")
-            )
-            return json.dumps([t.model_dump() for t in transactions], indent=2)
+        with _tool_flights_lock:
+            flight = _tool_flights.get(cache_key)
+            leader = flight is None
+            if leader:
+                flight = _tool_flights[cache_key] = Future()
+        if not leader:
+            result = flight.result()
+            logger.info(f"Tool result shared with a concurrent call: {function_name} {window}")
+            TOOL_CALLS.inc(tool=function_name, outcome="shared")
+            TOOL_DURATION.observe(time.perf_counter() - started, tool=function_name, cached="true")
+            return result
         
+        try:
+            result = _run_function(function_name, arguments, window, customer_id)
+        except Exception as e:
+            flight.set_exception(e)
+            raise
         else:
-            return json.dumps({"error": f"Unknown function: {function_name}"})
+            _tool_result_cache.put(cache_key, result)
+            flight.set_result(result)
+        finally:
+            with _tool_flights_lock:
+                _tool_flights.pop(cache_key, None)
+        stats = payload_stats(result)
+        logger.info(
+            f"Tool payload {function_name}: {stats['bytes']} bytes, ~{stats['estimated_tokens']} tokens"
+        )
+        TOOL_CALLS.inc(tool=function_name, outcome="ok")
+        TOOL_DURATION.observe(time.perf_counter() - started, tool=function_name, cached="false")
+        TOOL_PAYLOAD_BYTES.observe(stats["bytes"], tool=function_name)
+        return result
     
     except Exception as e:
         logger.error(f"Error executing function {function_name}: {e}")
+        TOOL_CALLS.inc(tool=function_name, outcome="error")
         return json.dumps({"error": str(e)})
 
 
-async def process_query(query: str, conversation_history: List[MessageType] = None) -> Dict:
+def _run_function(
+    function_name: str, arguments: Dict, window: Optional[Tuple[str, str]], customer_id: str
+) -> str:
+    """Run a tool against the data layer over its resolved date window and serialize the result"""
+    if function_name == "get_customer_info":
+        customer = get_customer(customer_id)
+        return dumps(customer.model_dump())
+    
+    if function_name == "get_recurring_payments":
+        return dumps(get_recurring_payments(
+            arguments.get("direction") or "all", bool(arguments.get("include_inactive")), customer_id
+        ))
+    
+    start_date, end_date = window
+    
+    if function_name in TRANSACTION_TOOLS:
+        transactions = get_transactions_by_date_range(start_date, end_date, customer_id)
+        return encode_transactions(transactions, TOOL_PAYLOAD_FORMATS[function_name])
+    
+    elif function_name == "get_spending_by_category":
+        return dumps(get_spending_by_category(start_date, end_date, customer_id))
+    
+    elif function_name == "get_spending_by_merchant":
+        return dumps(get_spending_by_merchant(
+            start_date, end_date, arguments.get("category"), arguments.get("limit"), customer_id
+        ))
+    
+    elif function_name == "get_spending_over_time":
+        return dumps(get_spending_over_time(
+            start_date, end_date, arguments.get("granularity") or "month", customer_id
+        ))
+    
+    elif function_name == "get_income_vs_expense":
+        return dumps(get_income_vs_expense(start_date, end_date, customer_id))
+    
+    elif function_name == "get_top_transactions":
+        return dumps(get_top_transactions(
+            start_date, end_date, arguments.get("n") or 10, arguments.get("kind") or "expense", customer_id
+        ))
+    
+    elif function_name == "detect_anomalies":
+        min_score = arguments.get("min_score")
+        return dumps(get_anomalous_transactions(
+            start_date, end_date, ANOMALY_THRESHOLD if min_score is None else float(min_score),
+            arguments.get("limit") or 20, customer_id
+        ))
+    
+    elif function_name == "build_chart":
+        chart = build_chart_request(
+            arguments.get("chart_type") or "bar",
+            arguments.get("metric") or "spend",
+            arguments.get("group_by") or "category",
+            start_date,
+            end_date,
+            customer_id,
+            category=arguments.get("category"),
+            merchant=arguments.get("merchant"),
+            limit=arguments.get("limit"),
+            title=arguments.get("title")
+        )
+        return dumps({"chart_request": chart, "summary": summarize_chart(chart)})
+    
+    raise ValueError(f"Unknown function: {function_name}")
+
+
+def _model_view_of_chart(result: str, charts: List[Dict]) -> str:
+    """Move a built chart into `charts` and give the model only its summary"""
+    payload = json.loads(result)
+    if "chart_request" not in payload:
+        return result
+    charts.append(payload["chart_request"])
+    return dumps({
+        "chart_attached": True,
+        **payload["summary"],
+        "note": "The chart is attached to your reply automatically. Do not write chart JSON or list its values."
+    })
+
+
+def attach_charts(response_text: str, charts: List[Dict]) -> str:
+    """Append built charts to the reply as json blocks the frontend renders"""
+    return "\n\n".join([response_text] + [chart_block(chart) for chart in charts])
+
+
+async def summarize_history(previous_summary: str, messages: List[MessageType]) -> str:
+    """Extend a rolling conversation summary with older turns"""
+    if get_client() is None:
+        return fallback_summary(previous_summary, messages)
+    transcript = "\n".join(
+        f"{'User' if msg.isUser else 'Assistant'}: {msg.text}" for msg in messages
+    )
+    response = await create_chat_completion(
+        model=HISTORY_SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": HISTORY_SUMMARY_PROMPT},
+            {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"}
+        ],
+        temperature=0,
+        max_tokens=HISTORY_SUMMARY_MAX_TOKENS,
+        timeout=OPENAI_TIMEOUT
+    )
+    if not response.choices or not response.choices[0].message.content:
+        raise ValueError("Empty summary from OpenAI API")
+    return response.choices[0].message.content.strip()
+
+
+history_manager = HistoryManager(
+    summarize=summarize_history,
+    budget_tokens=HISTORY_TOKEN_BUDGET,
+    chunk_size=HISTORY_SUMMARY_CHUNK
+)
+
+
+async def build_messages(query: str, conversation_history: List[MessageType] = None) -> List[Dict]:
+    """
+    Build the messages array: system prompt, conversation history, then the current query.
+    History is fitted to the token budget; older turns arrive as a rolling summary.
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    
+    # Add conversation history if available
+    if conversation_history:
+        messages.extend(await history_manager.build(conversation_history))
+    
+    # Add current user message
+    messages.append({"role": "user", "content": query})
+    return messages
+
+
+def _parse_tool_arguments(raw_arguments: str) -> Tuple[Optional[Dict], str]:
+    """Parse tool call arguments; returns (arguments, normalized key) or (None, raw) if malformed"""
+    try:
+        arguments = json.loads(raw_arguments or "{}")
+    except json.JSONDecodeError:
+        return None, raw_arguments
+    return arguments, json.dumps(arguments, sort_keys=True, separators=(",", ":"))
+
+
+def _timed_execute(function_name: str, arguments: Dict, customer_id: str) -> Tuple[str, float]:
+    started = time.perf_counter()
+    result = execute_function(function_name, arguments, customer_id)
+    return result, time.perf_counter() - started
+
+
+async def run_tool_calls(
+    messages: List,
+    tool_calls: List[Dict],
+    customer_id: str = DEFAULT_CUSTOMER_ID,
+    trace: Optional[RequestTrace] = None,
+    charts: Optional[List[Dict]] = None
+) -> None:
+    """
+    Execute tool calls (in OpenAI wire format) and append their results to messages.
+    Distinct calls run concurrently on the shared tool executor; calls with the same name
+    and normalized arguments are executed once. Results are appended in tool call order.
+    Each execution is recorded as a span on `trace`; charts built by build_chart are
+    collected into `charts` and replaced by a summary in the model's view.
+    """
+    loop = asyncio.get_running_loop()
+    pending: Dict[Tuple[str, str], asyncio.Future] = {}
+    call_keys = []
+    
+    for tool_call in tool_calls:
+        function_name = tool_call["function"]["name"]
+        function_args, normalized = _parse_tool_arguments(tool_call["function"]["arguments"])
+        key = (function_name, normalized)
+        call_keys.append(key)
+        
+        if key in pending:
+            logger.info(f"Reusing result for duplicate call: {function_name}")
+            continue
+        
+        logger.info(f"GPT calling function: {function_name}")
+        if function_args is None:
+            future = loop.create_future()
+            future.set_result((json.dumps({"error": f"Invalid JSON arguments for {function_name}"}), 0.0))
+        else:
+            future = loop.run_in_executor(
+                _tool_executor, _timed_execute, function_name, function_args, customer_id
+            )
+        pending[key] = future
+    
+    await asyncio.gather(*pending.values())
+    results = {}
+    for key, future in pending.items():
+        result, elapsed = future.result()
+        if trace is not None:
+            trace.tool_call(key[0], elapsed, len(result.encode()))
+        if key[0] == "build_chart" and charts is not None:
+            result = _model_view_of_chart(result, charts)
+        results[key] = result
+    
+    # Add function results to messages, one per tool_call_id in the order GPT issued them
+    for tool_call, key in zip(tool_calls, call_keys):
+        messages.append({
+            "role": "tool",
+            "tool_call_id": tool_call["id"],
+            "name": key[0],
+            "content": results[key]
+        })
+
+
+def lookup_cached_response(
+    query: str, conversation_history: List[MessageType], bypass_cache: bool, customer_id: str
+) -> Tuple[Optional[str], Optional[Dict], Dict]:
+    """
+    Check the response cache (blocking: SQLite read plus the data fingerprint).
+    Returns (cache key or None if caching is off, cached result or None, cache metadata).
+    """
+    if response_cache is None or bypass_cache:
+        return None, None, {"cache": "bypass" if bypass_cache else "disabled"}
+    try:
+        key = response_cache.make_key(
+            query, conversation_history, f"{customer_id}:{get_data_fingerprint(customer_id)}"
+        )
+        cached = response_cache.get(key)
+    except Exception as e:
+        logger.error(f"Response cache lookup failed: {e}")
+        return None, None, {"cache": "error"}
+    if cached is None:
+        return key, None, {"cache": "miss"}
+    response, age = cached
+    metadata = {"cache": "hit", "cache_age_seconds": round(age, 1)}
+    return key, {"response": response, "metadata": metadata}, metadata
+
+
+def store_cached_response(key: Optional[str], response: str) -> None:
+    if key is None:
+        return
+    try:
+        response_cache.put(key, response)
+    except Exception as e:
+        logger.error(f"Response cache write failed: {e}")
+
+
+def route_fast_path(query: str, customer_id: str) -> Optional[Dict]:
+    """Answer simple lookups deterministically; None means the query needs the LLM"""
+    if not FAST_PATH_ENABLED:
+        return None
+    try:
+        result = intent_router.route(query, customer_id)
+    except Exception as e:
+        logger.error(f"Fast path failed, falling back to LLM: {e}")
+        return None
+    if result is not None:
+        logger.info(f"Fast path answered query as {result['metadata']['intent']}")
+    return result
+
+
+def get_fast_path_stats() -> Dict:
+    return intent_router.stats()
+
+
+def get_response_cache_stats() -> Dict:
+    return response_cache.stats() if response_cache is not None else {"enabled": False}
+
+
+# In-flight chat answers that identical concurrent requests attach to
+_query_flights = SingleFlight()
+_stream_flights = SingleFlight()
+
+
+def flight_key(
+    query: str, conversation_history: Optional[List[MessageType]], bypass_cache: bool, customer_id: str
+) -> Optional[Tuple]:
+    """
+    Key under which identical concurrent requests coalesce; None turns coalescing off.
+    Reads the data version, which may load the customer, so call it off the event loop.
+    """
+    if not REQUEST_COALESCING_ENABLED:
+        return None
+    try:
+        # Requests after a data change don't join answers computed from the old data
+        version = get_data_version(customer_id)
+    except Exception:
+        return None
+    history = conversation_history or []
+    return (customer_id, version, bypass_cache, normalize_query(query), history_hash(history, len(history)))
+
+
+def get_coalescing_stats() -> Dict:
+    if not REQUEST_COALESCING_ENABLED:
+        return {"enabled": False}
+    return {"chat": _query_flights.stats(), "stream": _stream_flights.stats()}
+
+
+def friendly_error_message(error: Exception) -> str:
+    """Map an exception from the OpenAI call chain to a user-facing message"""
+    error_message = str(error).lower()
+    if "rate_limit" in error_message:
+        return "API rate limit exceeded. Please try again in a moment."
+    elif "authentication" in error_message or "api_key" in error_message:
+        return "API authentication failed. Please check the API key configuration."
+    elif "timeout" in error_message:
+        return "Request timed out. Please try again."
+    return "I encountered an error processing your request. Please try again."
+
+
+def upstream_retry_after(error: Exception) -> Optional[int]:
+    """Seconds to wait when the OpenAI API rate limited the call (HTTP 429), else None"""
+    if getattr(error, "status_code", None) != 429:
+        return None
+    response = getattr(error, "response", None)
+    try:
+        return max(1, math.ceil(float(response.headers.get("retry-after"))))
+    except (AttributeError, TypeError, ValueError):
+        return 1
+
+
+async def process_query(
+    query: str,
+    conversation_history: List[MessageType] = None,
+    bypass_cache: bool = False,
+    customer_id: str = DEFAULT_CUSTOMER_ID,
+    debug_timing: bool = False
+) -> Dict:
     """
     Process user query using OpenAI GPT with function calling for dynamic data fetching
-    Returns response text and optional chart data
+    Returns response text, optional chart data and response metadata.
+    With debug_timing the metadata also carries the request's timing spans.
     """
+    trace = RequestTrace()
+    key = await asyncio.to_thread(flight_key, query, conversation_history, bypass_cache, customer_id)
+    if key is None:
+        result, path = await _answer_query(query, conversation_history, bypass_cache, customer_id, trace)
+    else:
+        (result, path), joined = await _query_flights.run(
+            key, lambda: _answer_query(query, conversation_history, bypass_cache, customer_id, trace)
+        )
+        if joined:
+            # The flight's own request records its spans; this one only waited
+            CHAT_COALESCED.inc(endpoint="chat")
+            path = "coalesced"
+    timing = trace.finish(path)
+    logger.info(
+        f"Answered via {path} in {timing['total_ms']}ms "
+        f"(llm {timing['llm_ms']}ms, tools {timing['tool_ms']}ms, {timing['iterations']} model calls)"
+    )
+    if debug_timing:
+        result = {**result, "metadata": {**result.get("metadata", {}), "timing": timing}}
+    return result
+
+
+async def _answer_query(
+    query: str,
+    conversation_history: List[MessageType],
+    bypass_cache: bool,
+    customer_id: str,
+    trace: RequestTrace
+) -> Tuple[Dict, str]:
+    """Answer a query; returns the result and which path answered it (for metrics)"""
     # Validate input
     if not query or not query.strip():
         return {
             "response": "Please provide a valid query."
-        }
+        }, "invalid"
+
+    # Simple lookups are answered straight from the data without calling the model
+    # (in a worker thread: reading the ledger may load it or query SQLite)
+    fast_result = await asyncio.to_thread(route_fast_path, query, customer_id)
+    if fast_result is not None:
+        return fast_result, "fast_path"
+
+    # Repeated questions against unchanged data are answered from the response cache
+    cache_key, cached, cache_metadata = await asyncio.to_thread(
+        lookup_cached_response, query, conversation_history, bypass_cache, customer_id
+    )
+    if cached is not None:
+        logger.info(f"Response cache hit (age {cache_metadata['cache_age_seconds']}s)")
+        return cached, "cache"
 
     # Check if OpenAI client is available
-    if client is None:
+    if get_client() is None:
         return {
             "response": "AI service is not available. Please check the OpenAI API key configuration."
-        }
+        }, "unavailable"
 
     try:
         # Build messages array with conversation history
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-        
-        # Add conversation history if available
-        if conversation_history:
-            for msg in conversation_history:
-                role = "user" if msg.isUser else "assistant"
-                messages.append({"role": role, "content": msg.text})
-        
-        # Add current user message
-        messages.append({"role": "user", "content": query})
+        messages = await build_messages(query, conversation_history)
         
         # Initialize conversation loop for function calling
         max_iterations = 5  # Prevent infinite loops
         iteration = 0
+        charts: List[Dict] = []
         
         while iteration < max_iterations:
             iteration += 1
             
             # Call OpenAI API with tools
-            response = client.chat.completions.create(
+            call_started = time.perf_counter()
+            response = await create_chat_completion(
                 model="gpt-4o",
                 messages=messages,
                 tools=TOOLS,
                 tool_choice="auto",
                 temperature=0.7,
                 max_tokens=2000,
-                timeout=30.0
+                timeout=OPENAI_TIMEOUT
             )
 
             if not response.choices:
                 raise ValueError("Empty response from OpenAI API")
 
             message = response.choices[0].message
+            trace.llm_call(
+                time.perf_counter() - call_started,
+                getattr(response, "usage", None),
+                [tool_call.function.name for tool_call in message.tool_calls or []]
+            )
             
             # Check if GPT wants to call a function
             if message.tool_calls:
@@ -250,31 +1076,21 @@ async def process_query(query: str, conversation_history: List[MessageType] = No
                 messages.append(message)
                 
                 # Process each tool call
-                for tool_call in message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    logger.info(f"GPT calling function: {function_name}")
-                    
-                    # Execute the function
-                    function_result = execute_function(function_name, function_args)
-                    
-                    # Add function result to messages
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "name": function_name,
-                        "content": function_result
-                    })
+                await run_tool_calls(
+                    messages, [tool_call.model_dump() for tool_call in message.tool_calls], customer_id, trace, charts
+                )
                 
                 # Continue the loop to get GPT's response after function calls
                 continue
             
             # No more function calls, we have the final response
             if message.content:
+                response_text = attach_charts(message.content.strip(), charts)
+                await asyncio.to_thread(store_cached_response, cache_key, response_text)
                 return {
-                    "response": message.content.strip()
-                }
+                    "response": response_text,
+                    "metadata": cache_metadata
+                }, "llm"
             else:
                 raise ValueError("No content in final response")
         
@@ -282,22 +1098,256 @@ async def process_query(query: str, conversation_history: List[MessageType] = No
         logger.warning(f"Max iterations ({max_iterations}) reached in function calling loop")
         return {
             "response": "I apologize, but I'm having trouble processing your request. Please try rephrasing your question."
-        }
+        }, "max_iterations"
 
     except Exception as e:
         logger.error(f"Error processing query: {e}", exc_info=True)
-        error_message = str(e)
-
-        # Provide more user-friendly error messages
-        if "rate_limit" in error_message.lower():
-            user_message = "API rate limit exceeded. Please try again in a moment."
-        elif "authentication" in error_message.lower() or "api_key" in error_message.lower():
-            user_message = "API authentication failed. Please check the API key configuration."
-        elif "timeout" in error_message.lower():
-            user_message = "Request timed out. Please try again."
-        else:
-            user_message = f"I encountered an error processing your request. Please try again."
-
+        retry_after = upstream_retry_after(e)
+        if retry_after is not None:
+            return {
+                "response": friendly_error_message(e),
+                "metadata": {"retry_after": retry_after}
+            }, "rate_limited"
         return {
-            "response": user_message
+            "response": friendly_error_message(e)
+        }, "error"
+
+
+async def process_batch(requests: List[BotRequest], concurrency: int = BATCH_MAX_CONCURRENCY) -> AsyncIterator[Dict]:
+    """
+    Answer many chat requests, at most `concurrency` at a time.
+    Yields one "result" event per item (with its index) as soon as that item finishes, then
+    a "done" event with totals. A failing item yields an unsuccessful result; the rest go on.
+    """
+    started = time.perf_counter()
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+    # Load each customer's data once up front instead of on every item's first tool call;
+    # a customer that fails to load is reported by its own items
+    customers = {request.customerId for request in requests}
+    await asyncio.gather(*(asyncio.to_thread(warm_customer, c) for c in customers), return_exceptions=True)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, request: BotRequest) -> Dict:
+        async with semaphore:
+            return {"type": "result", "index": index, "customerId": request.customerId, **await _answer_batch_item(request)}
+
+    tasks = [asyncio.ensure_future(run(index, request)) for index, request in enumerate(requests)]
+    succeeded = 0
+    try:
+        for finished in asyncio.as_completed(tasks):
+            event = await finished
+            succeeded += event["success"]
+            yield event
+    finally:
+        # Stop outstanding items if the consumer went away
+        for task in tasks:
+            task.cancel()
+    yield {
+        "type": "done",
+        "items": len(requests),
+        "succeeded": succeeded,
+        "failed": len(requests) - succeeded,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+async def _answer_batch_item(request: BotRequest) -> Dict:
+    """One batch item's outcome: success with the response, or failure with an error"""
+    query = request.userAsk.strip()
+    if not query:
+        return {"success": False, "error": "Query cannot be empty"}
+    try:
+        result = await process_query(
+            query, request.conversationHistory, request.bypassCache, request.customerId, request.debugTiming
+        )
+    except Exception as e:
+        logger.error(f"Error in batch item: {e}", exc_info=True)
+        return {"success": False, "error": friendly_error_message(e)}
+    metadata = result.get("metadata", {})
+    if "retry_after" in metadata:
+        return {"success": False, "error": result["response"], "retry_after": metadata["retry_after"]}
+    return {"success": True, "response": result["response"], "metadata": metadata}
+
+
+async def stream_query(
+    query: str,
+    conversation_history: List[MessageType] = None,
+    bypass_cache: bool = False,
+    customer_id: str = DEFAULT_CUSTOMER_ID,
+    debug_timing: bool = False
+) -> AsyncIterator[Dict]:
+    """
+    Streaming variant of process_query.
+    Yields tool-call progress events, then the final answer token by token, then a
+    "done" event carrying the full response and time-to-first-token.
+    """
+    trace = RequestTrace()
+    key = await asyncio.to_thread(flight_key, query, conversation_history, bypass_cache, customer_id)
+    joined = False
+    if key is None:
+        events = _stream_answer(query, conversation_history, bypass_cache, customer_id, trace)
+    else:
+        # Joiners replay the events sent so far, then follow the flight live
+        events, joined = _stream_flights.stream(
+            key, lambda: _stream_answer(query, conversation_history, bypass_cache, customer_id, trace)
+        )
+        if joined:
+            CHAT_COALESCED.inc(endpoint="stream")
+    async for event in events:
+        if event["type"] in ("done", "error"):
+            if joined:
+                event["path"] = "coalesced"
+            timing = trace.finish(event.pop("path"))
+            if debug_timing and event["type"] == "done":
+                event["metadata"] = {**event.get("metadata", {}), "timing": timing}
+        yield event
+
+
+async def _stream_answer(
+    query: str,
+    conversation_history: List[MessageType],
+    bypass_cache: bool,
+    customer_id: str,
+    trace: RequestTrace
+) -> AsyncIterator[Dict]:
+    """Events for stream_query; the final done/error event names the answer path for metrics"""
+    started = trace.started
+
+    if not query or not query.strip():
+        yield {"type": "error", "error": "Please provide a valid query.", "path": "invalid"}
+        return
+
+    fast_result = await asyncio.to_thread(route_fast_path, query, customer_id)
+    if fast_result is not None:
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        yield {"type": "token", "text": fast_result["response"]}
+        yield {
+            "type": "done",
+            "response": fast_result["response"],
+            "time_to_first_token_ms": elapsed_ms,
+            "total_ms": elapsed_ms,
+            "metadata": fast_result["metadata"],
+            "path": "fast_path"
+        }
+        return
+
+    cache_key, cached, cache_metadata = await asyncio.to_thread(
+        lookup_cached_response, query, conversation_history, bypass_cache, customer_id
+    )
+    if cached is not None:
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        yield {"type": "token", "text": cached["response"]}
+        yield {
+            "type": "done",
+            "response": cached["response"],
+            "time_to_first_token_ms": elapsed_ms,
+            "total_ms": elapsed_ms,
+            "metadata": cache_metadata,
+            "path": "cache"
+        }
+        return
+
+    if get_client() is None:
+        yield {
+            "type": "error",
+            "error": "AI service is not available. Please check the OpenAI API key configuration.",
+            "path": "unavailable"
+        }
+        return
+
+    try:
+        messages = await build_messages(query, conversation_history)
+        max_iterations = 5  # Prevent infinite loops
+        first_token_ms = None
+        charts: List[Dict] = []
+        
+        for _ in range(max_iterations):
+            call_started = time.perf_counter()
+            stream = await create_chat_completion(
+                model="gpt-4o",
+                messages=messages,
+                tools=TOOLS,
+                tool_choice="auto",
+                temperature=0.7,
+                max_tokens=2000,
+                timeout=OPENAI_TIMEOUT,
+                stream=True
+            )
+
+            content = []
+            tool_calls: Dict[int, Dict] = {}
+            # Closing frees the completion slot even if the client disconnects mid-stream
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                
+                    # Tool call names and arguments arrive in fragments keyed by index
+                    for fragment in delta.tool_calls or []:
+                        call = tool_calls.setdefault(fragment.index, {
+                            "id": "", "type": "function", "function": {"name": "", "arguments": ""}
+                        })
+                        if fragment.id:
+                            call["id"] = fragment.id
+                        if fragment.function and fragment.function.name:
+                            call["function"]["name"] += fragment.function.name
+                        if fragment.function and fragment.function.arguments:
+                            call["function"]["arguments"] += fragment.function.arguments
+                
+                    if delta.content and not tool_calls:
+                        if first_token_ms is None:
+                            first_token_ms = (time.perf_counter() - started) * 1000
+                            logger.info(f"Time to first token: {first_token_ms:.0f}ms")
+                        content.append(delta.content)
+                        yield {"type": "token", "text": delta.content}
+            finally:
+                await stream.close()
+
+            # Streamed calls are timed to the end of the stream; the API reports no usage here
+            trace.llm_call(
+                time.perf_counter() - call_started,
+                tool_calls=[tool_calls[index]["function"]["name"] for index in sorted(tool_calls)]
+            )
+            if tool_calls:
+                ordered_calls = [tool_calls[index] for index in sorted(tool_calls)]
+                messages.append({
+                    "role": "assistant",
+                    "content": "".join(content) or None,
+                    "tool_calls": ordered_calls
+                })
+                for call in ordered_calls:
+                    yield {"type": "tool_call", "name": call["function"]["name"]}
+                await run_tool_calls(messages, ordered_calls, customer_id, trace, charts)
+                continue
+
+            response_text = "".join(content).strip()
+            if not response_text:
+                raise ValueError("No content in final response")
+            if charts:
+                response_text = attach_charts(response_text, charts)
+                for chart in charts:
+                    yield {"type": "token", "text": "\n\n" + chart_block(chart)}
+            await asyncio.to_thread(store_cached_response, cache_key, response_text)
+            total_ms = (time.perf_counter() - started) * 1000
+            yield {
+                "type": "done",
+                "response": response_text,
+                "time_to_first_token_ms": round(first_token_ms, 1),
+                "total_ms": round(total_ms, 1),
+                "metadata": cache_metadata,
+                "path": "llm"
+            }
+            return
+
+        logger.warning(f"Max iterations ({max_iterations}) reached in function calling loop")
+        yield {
+            "type": "error",
+            "error": "I apologize, but I'm having trouble processing your request. Please try rephrasing your question.",
+            "path": "max_iterations"
         }
+
+    except Exception as e:
+        logger.error(f"Error streaming query: {e}", exc_info=True)
+        yield {"type": "error", "error": friendly_error_message(e), "path": "error"}
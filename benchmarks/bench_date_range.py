@@ -0,0 +1,104 @@
+"""
+Range-query latency: columnar TransactionStore vs. the original list comprehension.
+
+The baseline reproduces the old ``data.get_transactions_by_date_range`` scan
+(``start_date <= t.date <= end_date`` over every row). Rows are lightweight
+objects carrying only the ``date`` string, so the 10M-row baseline fits in memory;
+the per-row comparison cost is identical to scanning Transaction models.
+
+Usage:
+    python benchmarks/bench_date_range.py [--sizes 10000 1000000 10000000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import TransactionStore, from_day_number, to_day_number  # noqa: E402
+
+ROWS_PER_DAY = 25
+
+
+class _Row:
+    __slots__ = ("date",)
+
+    def __init__(self, value: str):
+        self.date = value
+
+
+def build_store(size: int, first_day: int) -> TransactionStore:
+    """Build a synthetic store of `size` rows, ROWS_PER_DAY rows per day"""
+    rng = np.random.default_rng(42)
+    day = (first_day + np.arange(size) // ROWS_PER_DAY).astype(np.int32)
+    codes = (rng.integers(0, 10, size).astype(np.int32), [f"cat{i}" for i in range(10)])
+    return TransactionStore(
+        day=day,
+        amount=rng.uniform(-5000, 5000, size),
+        balance=np.zeros(size),
+        transaction_id=np.arange(size),
+        category=codes,
+        merchant=codes,
+        description=codes,
+        transaction_type=(np.zeros(size, dtype=np.int32), ["debit"]),
+        payment_method=(np.zeros(size, dtype=np.int32), ["card"]),
+    )
+
+
+def build_rows(store: TransactionStore) -> list:
+    """Build the baseline row list, sharing one date string per day"""
+    labels = {int(d): from_day_number(d) for d in np.unique(store.day)}
+    return [_Row(labels[int(d)]) for d in store.day]
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    first_day = to_day_number("2020-01-01")
+    print(f"{'rows':>12} {'window':>8} {'matched':>10} {'list scan':>12} {'store':>12} {'speedup':>9}")
+
+    for size in args.sizes:
+        store = build_store(size, first_day)
+        rows = build_rows(store)
+        last_day = int(store.day[-1])
+
+        for window in (7, 30, 365):
+            start_day = max(first_day, last_day - window + 1)
+            start_date, end_date = from_day_number(start_day), from_day_number(last_day)
+
+            def scan():
+                return [row for row in rows if start_date <= row.date <= end_date]
+
+            def indexed():
+                return store.slice(to_day_number(start_date), to_day_number(end_date))
+
+            matched = len(indexed())
+            assert matched == len(scan())
+            scan_s = best_of(scan, args.repeat)
+            store_s = best_of(indexed, args.repeat)
+            print(
+                f"{size:>12,} {window:>7}d {matched:>10,} "
+                f"{scan_s * 1e3:>10.3f}ms {store_s * 1e6:>10.2f}us {scan_s / store_s:>8.0f}x"
+            )
+
+        del rows
+
+
+if __name__ == "__main__":
+    main()
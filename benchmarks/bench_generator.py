@@ -0,0 +1,49 @@
+"""
+Synthetic data generation throughput: vectorized NumPy generator vs. the original
+per-row ``generate_sample_transactions`` loop.
+
+The baseline always generates the current year for one customer; the vectorized
+generator is timed for `--customers` customers over `--years` years.
+
+Usage:
+    python benchmarks/bench_generator.py [--customers 200] [--years 3] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import generate_customer_stores, generate_sample_transactions  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    baseline_rows = len(generate_sample_transactions(random.Random(args.seed)))
+    baseline = time.perf_counter() - started
+    print(f"per-row loop   {baseline_rows:>10,} rows  {baseline:7.3f}s  {baseline_rows / baseline:>12,.0f} rows/s")
+
+    end = date.today()
+    start = end - timedelta(days=365 * args.years)
+    started = time.perf_counter()
+    rows = sum(
+        len(store)
+        for _, store in generate_customer_stores(args.customers, start.isoformat(), end.isoformat(), args.seed)
+    )
+    elapsed = time.perf_counter() - started
+    print(f"vectorized     {rows:>10,} rows  {elapsed:7.3f}s  {rows / elapsed:>12,.0f} rows/s "
+          f"({args.customers} customers x {args.years} years)")
+    print(f"speedup        {(rows / elapsed) / (baseline_rows / baseline):.0f}x rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Intent router corpus check: fast-path hit rate, precision and answer latency.
+
+Each line of intent_corpus.jsonl holds a query and the intent the router should
+produce (null when the query must fall through to the LLM), plus the expected
+category or merchant where relevant. Exits non-zero if any query is misrouted.
+
+Usage:
+    python benchmarks/bench_intent_router.py [--corpus benchmarks/intent_corpus.jsonl] [--verbose]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import IntentRouter, answer_intent  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus.jsonl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.corpus) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    router = IntentRouter()
+    failures = []
+    answer_times = []
+    for case in corpus:
+        intent = router.classify(case["query"])
+        got = intent.metric if intent else None
+        ok = got == case["intent"]
+        if ok and intent:
+            ok = intent.category == case.get("category") and intent.merchant == case.get("merchant")
+            start = time.perf_counter()
+            answer = answer_intent(intent)
+            answer_times.append(time.perf_counter() - start)
+            if args.verbose:
+                print(f"--- {case['query']}\n{answer}\n")
+        if not ok:
+            failures.append((case, intent))
+
+    routable = sum(1 for case in corpus if case["intent"])
+    routed = sum(1 for case in corpus if router.classify(case["query"]))
+    print(f"corpus: {len(corpus)} queries, {routable} routable")
+    print(f"fast-path hit rate: {routed / len(corpus):.1%} of all queries, "
+          f"{(routable - sum(1 for c, _ in failures if c['intent'])) / max(routable, 1):.1%} of routable")
+    if answer_times:
+        answer_times.sort()
+        print(f"answer latency: p50 {answer_times[len(answer_times) // 2] * 1e3:.2f}ms, "
+              f"max {answer_times[-1] * 1e3:.2f}ms")
+    for case, intent in failures:
+        print(f"MISROUTED: {case['query']!r} expected {case['intent']} got {intent}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
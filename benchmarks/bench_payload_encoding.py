@@ -0,0 +1,46 @@
+"""
+Tool payload size and encode time per encoding mode.
+
+Encodes the current-year transaction set (the largest raw tool result) in each
+payload format and reports bytes, estimated prompt tokens and encode latency.
+
+Usage:
+    python benchmarks/bench_payload_encoding.py [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import get_current_year_transactions  # noqa: E402
+from payloads import PAYLOAD_FORMATS, encode_transactions, orjson, payload_stats  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    transactions = get_current_year_transactions()
+    print(f"get_current_year_transactions: {len(transactions)} rows, orjson={'yes' if orjson else 'no'}")
+    print(f"{'format':>10} {'bytes':>10} {'~tokens':>10} {'vs json':>8} {'encode':>10}")
+
+    baseline = None
+    for payload_format in PAYLOAD_FORMATS:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            payload = encode_transactions(transactions, payload_format)
+            timings.append(time.perf_counter() - start)
+        stats = payload_stats(payload)
+        baseline = baseline or stats["bytes"]
+        print(
+            f"{payload_format:>10} {stats['bytes']:>10,} {stats['estimated_tokens']:>10,} "
+            f"{stats['bytes'] / baseline:>7.0%} {min(timings) * 1e3:>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
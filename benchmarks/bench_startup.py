@@ -0,0 +1,129 @@
+"""
+Cold-start time: how long a fresh worker takes until it can serve requests.
+
+Starts ``uvicorn main:app`` in a subprocess and polls until /health/live answers,
+/health/ready reports ready, and a first chat request (a fast-path lookup, so no
+OpenAI key is needed) succeeds. Runs once with an empty snapshot directory (data is
+generated and the snapshot written) and then with the snapshot in place.
+
+A second section compares generating a larger dataset with memory-mapping its snapshot.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 3] [--years 10]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data import generate_transaction_store  # noqa: E402
+from store import load_snapshot, save_snapshot  # noqa: E402
+
+FIRST_QUERY = {"userAsk": "How much did I spend this month?", "conversationHistory": []}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _ok(url: str, body: dict = None) -> bool:
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status == 200 and (body is None or json.load(response).get("success"))
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return False
+
+
+def time_boot(snapshot_dir: str) -> dict:
+    """Spawn a worker and return milliseconds until live, ready and first response"""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATA_SNAPSHOT_DIR=snapshot_dir, RESPONSE_CACHE_ENABLED="false", FAST_PATH_ENABLED="true")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    marks = {}
+    try:
+        checks = [
+            ("live", lambda: _ok(f"{base}/health/live")),
+            ("ready", lambda: _ok(f"{base}/health/ready")),
+            ("first_response", lambda: _ok(f"{base}/getBotResponse", FIRST_QUERY)),
+        ]
+        for name, check in checks:
+            while not check():
+                if process.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                if time.perf_counter() - started > 60:
+                    raise RuntimeError(f"timed out waiting for {name}")
+                time.sleep(0.005)
+            marks[name] = (time.perf_counter() - started) * 1000
+    finally:
+        process.terminate()
+        process.wait()
+    return marks
+
+
+def bench_server(runs: int):
+    print("Worker cold start (ms from spawn, median of runs)")
+    print(f"{'mode':<18}{'live':>10}{'ready':>10}{'first response':>17}")
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        modes = [
+            ("no snapshot", lambda: ""),
+            ("snapshot (warm)", lambda: snapshot_dir),
+        ]
+        # Populate the snapshot once so the warm runs load instead of generating
+        time_boot(snapshot_dir)
+        for label, directory in modes:
+            results = [time_boot(directory()) for _ in range(runs)]
+            row = {key: statistics.median(r[key] for r in results) for key in results[0]}
+            print(f"{label:<18}{row['live']:>10.0f}{row['ready']:>10.0f}{row['first_response']:>17.0f}")
+
+
+def bench_dataset(years: int):
+    end = date.today()
+    start = end - timedelta(days=365 * years)
+    started = time.perf_counter()
+    store = generate_transaction_store(start.isoformat(), end.isoformat(), np.random.default_rng(0))
+    generated_ms = (time.perf_counter() - started) * 1000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "snapshot")
+        save_snapshot(store, path)
+        started = time.perf_counter()
+        loaded, _ = load_snapshot(path)
+        loaded.slice(int(loaded.day[-1]) - 30, int(loaded.day[-1])).amount.sum()
+        loaded_ms = (time.perf_counter() - started) * 1000
+    print(f"\nDataset load, {len(store):,} rows ({years} years)")
+    print(f"  generate          {generated_ms:8.1f} ms")
+    print(f"  snapshot (mmap)   {loaded_ms:8.1f} ms  (including a first 30-day query)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--years", type=int, default=10)
+    args = parser.parse_args()
+    bench_server(args.runs)
+    bench_dataset(args.years)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Offline stand-in for the OpenAI chat completions API, for load tests without API cost.
+
+Serves POST /v1/chat/completions in both plain and streaming (SSE) form. Each
+request is answered from a script: the latest user message is matched against
+the script's rules, and the rule's tool-call steps are issued one round at a time
+(counting the assistant tool-call rounds since that user message) before a final
+text answer. Requests without tools (history summaries) get a short summary.
+
+Point FinBot at it with:
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=fake uvicorn main:app
+
+Usage:
+    python benchmarks/fake_openai.py [--port 8001] [--latency-ms 400] [--jitter-ms 100]
+                                     [--token-delay-ms 15] [--script script.json]
+
+A script is a JSON list of rules, tried in order; the last rule should match everything:
+    [{"match": "categor", "steps": [[{"name": "get_spending_by_category", "arguments": {}}]],
+      "answer": "Your top category was Shopping."}, ...]
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+DEFAULT_SCRIPT = [
+    {
+        "match": r"categor|breakdown|where .* money",
+        "steps": [[{"name": "get_spending_by_category", "arguments": {}}]],
+        "answer": "Shopping was your largest spending category this year, followed by Groceries and Dining.",
+    },
+    {
+        "match": r"merchant|store|shop",
+        "steps": [[{"name": "get_spending_by_merchant", "arguments": {"limit": 5}}]],
+        "answer": "Your top merchants this year were Amazon India, Flipkart and Big Bazaar.",
+    },
+    {
+        "match": r"chart|graph|plot",
+        "steps": [[{"name": "build_chart", "arguments": {"chart_type": "pie", "metric": "spend", "group_by": "category"}}]],
+        "answer": "Here is your spending by category; Shopping takes the largest share.",
+    },
+    {
+        "match": r"unusual|anomal|suspicious",
+        "steps": [[{"name": "detect_anomalies", "arguments": {}}]],
+        "answer": "One grocery purchase stands out: it is far above what you usually spend there.",
+    },
+    {
+        "match": r"subscription|recurring|bills",
+        "steps": [[{"name": "get_recurring_payments", "arguments": {"direction": "debit"}}]],
+        "answer": "You pay rent on the 5th, utilities around the 10th and a few monthly subscriptions.",
+    },
+    {
+        "match": r"trend|monthly|over time",
+        "steps": [[{"name": "get_spending_over_time", "arguments": {"granularity": "month"}}]],
+        "answer": "Your monthly spending has been fairly steady, with a peak in the spring.",
+    },
+    {
+        "match": r"compare|versus|vs",
+        "steps": [
+            [{"name": "get_current_month_transactions", "arguments": {}}],
+            [{"name": "get_transactions_last_n_months", "arguments": {"months": 2}}],
+        ],
+        "answer": "You spent slightly less this month than last month.",
+    },
+    {
+        "match": r"save|income|earn",
+        "steps": [[{"name": "get_income_vs_expense", "arguments": {}}]],
+        "answer": "You saved about a quarter of your income this year.",
+    },
+    {
+        "match": r".",
+        "steps": [[
+            {"name": "get_current_month_transactions", "arguments": {}},
+            {"name": "get_customer_info", "arguments": {}},
+        ]],
+        "answer": "Here is a summary of your recent transactions: spending is within your usual range.",
+    },
+]
+
+
+class FakeOpenAI:
+    def __init__(self, script: List[Dict], latency_ms: float, jitter_ms: float, token_delay_ms: float):
+        self.rules = [(re.compile(rule["match"], re.IGNORECASE), rule) for rule in script]
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_delay_ms = token_delay_ms
+        self.requests = 0
+
+    async def think(self) -> None:
+        """Simulated model latency before the first byte"""
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000)
+
+    def reply(self, body: Dict) -> Dict:
+        """Decide the assistant turn: {"tool_calls": [...]} or {"content": "..."}"""
+        messages = body.get("messages", [])
+        if not body.get("tools"):
+            return {"content": "The user asked about their spending; the assistant reported totals."}
+
+        last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+        query = messages[last_user].get("content", "") if last_user >= 0 else ""
+        rounds = sum(1 for m in messages[last_user + 1:] if m.get("role") == "assistant" and m.get("tool_calls"))
+        rule = next(rule for pattern, rule in self.rules if pattern.search(query or ""))
+        if rounds < len(rule["steps"]):
+            return {
+                "tool_calls": [
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:12]}",
+                        "type": "function",
+                        "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+                    }
+                    for call in rule["steps"][rounds]
+                ]
+            }
+        return {"content": rule["answer"]}
+
+    def completion(self, body: Dict, turn: Dict) -> Dict:
+        message = {"role": "assistant", "content": turn.get("content")}
+        if "tool_calls" in turn:
+            message["tool_calls"] = turn["tool_calls"]
+        completion_tokens = len((turn.get("content") or "").split()) + 10
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if "tool_calls" in turn else "stop",
+            }],
+            "usage": {"prompt_tokens": 100, "completion_tokens": completion_tokens, "total_tokens": 100 + completion_tokens},
+        }
+
+    async def chunks(self, body: Dict, turn: Dict):
+        """SSE chunks: tool calls as name + argument fragments, content word by word"""
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def chunk(delta: Dict, finish_reason: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        yield chunk({"role": "assistant", "content": None if "tool_calls" in turn else ""})
+        if "tool_calls" in turn:
+            for index, call in enumerate(turn["tool_calls"]):
+                yield chunk({"tool_calls": [{
+                    "index": index, "id": call["id"], "type": "function",
+                    "function": {"name": call["function"]["name"], "arguments": ""},
+                }]})
+                yield chunk({"tool_calls": [{"index": index, "function": {"arguments": call["function"]["arguments"]}}]})
+            yield chunk({}, "tool_calls")
+        else:
+            for word in re.findall(r"\S+\s*", turn["content"]):
+                await asyncio.sleep(self.token_delay_ms / 1000)
+                yield chunk({"content": word})
+            yield chunk({}, "stop")
+        yield "data: [DONE]\n\n"
+
+
+def create_app(fake: FakeOpenAI) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        fake.requests += 1
+        turn = fake.reply(body)
+        await fake.think()
+        if body.get("stream"):
+            return StreamingResponse(fake.chunks(body, turn), media_type="text/event-stream")
+        return fake.completion(body, turn)
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": fake.requests}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=400, help="delay before each response starts")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="uniform +/- jitter on the latency")
+    parser.add_argument("--token-delay-ms", type=float, default=15, help="delay between streamed tokens")
+    parser.add_argument("--script", help="JSON file of rules replacing the built-in script")
+    args = parser.parse_args()
+
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+    fake = FakeOpenAI(script, args.latency_ms, args.jitter_ms, args.token_delay_ms)
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
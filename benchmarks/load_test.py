@@ -0,0 +1,176 @@
+"""
+End-to-end load generator for the FinBot API.
+
+Sends chat requests at a fixed target rate (open loop: requests start on schedule
+whether or not earlier ones have finished) for a set duration, then reports latency
+percentiles, achieved throughput and error rate. Queries are drawn round-robin from
+a JSONL file with a "query" field.
+
+Run it against a FinBot pointed at the offline stand-in to measure the LLM loop
+without API cost:
+    python benchmarks/fake_openai.py --port 8001 &
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=fake FAST_PATH_ENABLED=false \\
+        uvicorn main:app --port 8000 &
+    python benchmarks/load_test.py --rps 20 --duration 30 --bypass-cache
+
+Usage:
+    python benchmarks/load_test.py [--url http://127.0.0.1:8000] [--rps 10] [--duration 30]
+                                   [--clients 100] [--stream] [--bypass-cache] [--output results.json]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus.jsonl")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+async def send(client: httpx.AsyncClient, url: str, body: Dict, stream: bool, headers: Dict) -> Dict:
+    """Send one chat request; returns latency, success flag and (for streams) time to first event"""
+    started = time.perf_counter()
+    first_event_ms = None
+    status = "failed"
+    try:
+        if stream:
+            ok = False
+            async with client.stream("POST", f"{url}/getBotResponse/stream", json=body, headers=headers) as response:
+                if response.status_code != 200:
+                    # Turned away by admission control (429/503) before the stream started
+                    status = f"http_{response.status_code}"
+                    await response.aread()
+                    return {"ok": False, "latency_ms": (time.perf_counter() - started) * 1000,
+                            "first_event_ms": None, "status": status}
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    if first_event_ms is None:
+                        first_event_ms = (time.perf_counter() - started) * 1000
+                    event = json.loads(line)
+                    if event["type"] == "done":
+                        ok = True
+                    elif event["type"] == "error":
+                        ok = False
+                        break
+        else:
+            response = await client.post(f"{url}/getBotResponse", json=body, headers=headers)
+            ok = response.status_code == 200 and response.json().get("success", False)
+            if response.status_code != 200:
+                status = f"http_{response.status_code}"
+        return {"ok": ok, "latency_ms": (time.perf_counter() - started) * 1000, "first_event_ms": first_event_ms,
+                "status": "ok" if ok else status}
+    except Exception as e:
+        return {"ok": False, "latency_ms": (time.perf_counter() - started) * 1000, "first_event_ms": None,
+                "status": type(e).__name__}
+
+
+async def run_load(
+    url: str, queries: List[str], rps: float, duration: float, stream: bool, bypass_cache: bool, timeout: float,
+    customers: int, clients: int
+) -> Dict:
+    total = int(rps * duration)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=256)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        tasks = []
+        query_cycle = itertools.cycle(queries)
+        started = time.perf_counter()
+        for i in range(total):
+            delay = started + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            body = {
+                "userAsk": next(query_cycle),
+                "conversationHistory": [],
+                "bypassCache": bypass_cache,
+                "customerId": f"CUST{1 + i % customers:03d}",
+            }
+            # Distinct client IDs, so the server's per-client limit sees many users rather than one
+            headers = {"X-Client-ID": f"load-{i % clients}"}
+            tasks.append(asyncio.create_task(send(client, url, body, stream, headers)))
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    latencies = [r["latency_ms"] for r in results if r["ok"]]
+    first_events = [r["first_event_ms"] for r in results if r["ok"] and r["first_event_ms"] is not None]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r["status"]] = errors.get(r["status"], 0) + 1
+
+    report = {
+        "target_rps": rps,
+        "duration_s": round(elapsed, 2),
+        "requests": len(results),
+        "succeeded": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(1 - len(latencies) / len(results), 4) if results else 0.0,
+        "errors": errors,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "mean": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+            "max": round(max(latencies), 1) if latencies else 0.0,
+        },
+    }
+    if first_events:
+        report["first_event_ms"] = {
+            "p50": round(percentile(first_events, 50), 1),
+            "p95": round(percentile(first_events, 95), 1),
+            "p99": round(percentile(first_events, 99), 1),
+        }
+    return report
+
+
+def load_queries(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["query"] for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=10, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to generate load")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="JSONL file with a \"query\" field per line")
+    parser.add_argument("--customers", type=int, default=1, help="spread requests over CUST001..CUSTnnn")
+    parser.add_argument("--clients", type=int, default=100, help="spread requests over this many X-Client-ID values")
+    parser.add_argument("--stream", action="store_true", help="use the streaming endpoint")
+    parser.add_argument("--bypass-cache", action="store_true", help="skip the server's response cache")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(
+        args.url.rstrip("/"), load_queries(args.queries), args.rps, args.duration,
+        args.stream, args.bypass_cache, args.timeout, args.customers, args.clients
+    ))
+    latency = report["latency_ms"]
+    print(f"requests      {report['requests']} in {report['duration_s']}s (target {args.rps} rps)")
+    print(f"throughput    {report['throughput_rps']} rps")
+    print(f"error rate    {report['error_rate']:.2%} {report['errors'] or ''}")
+    print(f"latency       p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  max {latency['max']}ms")
+    if "first_event_ms" in report:
+        first = report["first_event_ms"]
+        print(f"first event   p50 {first['p50']}ms  p95 {first['p95']}ms  p99 {first['p99']}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Microbenchmark suite for the data and tool-execution hot paths.
+
+Runs offline (no OpenAI key or network needed) and writes machine-readable results,
+so two runs -- e.g. before and after a change -- can be compared and regressions flagged.
+
+Cases:
+    date_range/<rows>/<window>   get_transactions_by_date_range at several data sizes
+    current/<period>             get_current_{week,month,year}_transactions
+    tool/<name>                  execute_function per tool, tool cache cleared each call
+    generate/...                 generate_sample_transactions and the vectorized generator
+    ingest/<rows>/batch<n>       ingest_transactions appending to ledgers of several sizes
+    aggregate/<rows>/<window>/.. spending by category from the daily rollup vs. a row scan
+    rollup_build/<rows>          building a ledger's rollup from scratch
+    anomaly_build/<rows>         scoring a whole ledger for anomalies from scratch
+    recurring_detect/<rows>      detecting recurring series across a whole ledger
+
+Usage:
+    python benchmarks/suite.py run [--output results.json] [--filter tool/] [--quick]
+    python benchmarks/suite.py compare baseline.json results.json [--threshold 0.10]
+
+`compare` exits with status 1 when any case's median slowed down by more than the threshold.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data  # noqa: E402
+import ai_service  # noqa: E402
+from models import NewTransaction  # noqa: E402
+from recurring import detect_recurring  # noqa: E402
+from storage import CustomerDataset, MemoryBackend  # noqa: E402
+from store import AnomalyScores, DailyRollup, TransactionStore  # noqa: E402
+
+# Transactions per customer-year of generated data, used to size the date-range cases
+_ROWS_PER_CUSTOMER_YEAR = 900
+DATE_RANGE_SIZES = (1_000, 100_000, 1_000_000)
+DATE_RANGE_WINDOWS = (7, 30, 365)
+INGEST_BATCH = 10
+
+TOOL_ARGUMENTS = {
+    "get_customer_info": {},
+    "get_current_week_transactions": {},
+    "get_current_month_transactions": {},
+    "get_current_year_transactions": {},
+    "get_transactions_last_n_days": {"days": 30},
+    "get_transactions_last_n_months": {"months": 3},
+    "get_transactions_by_date_range": {"start_date": "{year}-01-01", "end_date": "{year}-03-31"},
+    "get_spending_by_category": {},
+    "get_spending_by_merchant": {"limit": 10},
+    "get_spending_over_time": {"granularity": "month"},
+    "get_income_vs_expense": {},
+    "get_top_transactions": {"n": 10, "kind": "expense"},
+    "detect_anomalies": {},
+    "get_recurring_payments": {},
+    "build_chart": {"chart_type": "bar", "metric": "spend", "group_by": "category"},
+}
+
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> Dict:
+    """Time fn: calibrate a loop count that takes >= min_time, then take `repeat` samples"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) / loops * 1e6)
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "min_us": round(min(samples), 3),
+        "stdev_us": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        "repeat": repeat,
+        "loops": loops,
+    }
+
+
+def _merged_store(rows: int) -> TransactionStore:
+    """Stack generated customer-years into one date-sorted store of about `rows` rows"""
+    end = datetime.now().date()
+    start = end - timedelta(days=364)
+    customers = max(1, round(rows / _ROWS_PER_CUSTOMER_YEAR))
+    stores = [
+        data.generate_transaction_store(start.isoformat(), end.isoformat(), np.random.default_rng([0, i]))
+        for i in range(customers)
+    ]
+    first = stores[0]
+
+    def stack(column: str) -> np.ndarray:
+        return np.concatenate([getattr(store, column) for store in stores])
+
+    return TransactionStore(
+        day=stack("day"),
+        amount=stack("amount"),
+        balance=stack("balance"),
+        transaction_id=stack("transaction_id"),
+        category=(stack("category"), first.categories),
+        merchant=(stack("merchant"), first.merchants),
+        description=(stack("description"), first.descriptions),
+        transaction_type=(stack("transaction_type"), first.transaction_types),
+        payment_method=(stack("payment_method"), first.payment_methods),
+    )
+
+
+def date_range_cases(sizes) -> Tuple[MemoryBackend, List[Tuple[str, Callable]]]:
+    """
+    Cases for synthetic customers of each size, served by their own memory backend.
+    The caller installs the backend as the data layer's backend while they run.
+    """
+    stores = {f"CUST9{i:03d}": _merged_store(size) for i, size in enumerate(sizes)}
+    backend = _synthetic_backend(stores)
+    cases = []
+    today = datetime.now()
+    for (customer_id, store), size in zip(stores.items(), sizes):
+        for window in DATE_RANGE_WINDOWS:
+            start = (today - timedelta(days=window - 1)).strftime("%Y-%m-%d")
+            end = today.strftime("%Y-%m-%d")
+
+            def run(start=start, end=end, customer_id=customer_id):
+                return data.get_transactions_by_date_range(start, end, customer_id)
+
+            cases.append((f"date_range/{size}/{window}d", run))
+
+            def rollup(start=start, end=end, customer_id=customer_id):
+                return data.get_spending_by_category(start, end, customer_id)
+
+            def scan(start=start, end=end, customer_id=customer_id):
+                return _scan_spending_by_category(start, end, customer_id)
+
+            cases.append((f"aggregate/{size}/{window}d/rollup", rollup))
+            cases.append((f"aggregate/{size}/{window}d/scan", scan))
+        cases.append((f"rollup_build/{size}", lambda store=store: DailyRollup.build(store)))
+        cases.append((f"anomaly_build/{size}", lambda store=store: AnomalyScores.build(store)))
+        cases.append((f"recurring_detect/{size}", lambda store=store: detect_recurring(store)))
+    return backend, cases
+
+
+def _scan_spending_by_category(start_date: str, end_date: str, customer_id: str) -> Dict:
+    """Row-scan baseline: get_spending_by_category as a bincount over the window's rows"""
+    view = data.get_transactions_by_date_range(start_date, end_date, customer_id)
+    store = view.store
+    expense = view.amount < 0
+    codes = view.category[expense]
+    totals = np.bincount(codes, weights=-view.amount[expense], minlength=len(store.categories))
+    counts = np.bincount(codes, minlength=len(store.categories))
+    total_spent = totals.sum()
+    categories = [
+        {
+            "category": store.categories[code],
+            "total": round(float(totals[code]), 2),
+            "count": int(counts[code]),
+            "share_pct": round(float(totals[code] / total_spent * 100), 2) if total_spent else 0.0,
+        }
+        for code in np.argsort(-totals, kind="stable") if counts[code]
+    ]
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "total_spent": round(float(total_spent), 2),
+        "categories": categories,
+    }
+
+
+def _synthetic_backend(stores: Dict[str, TransactionStore]) -> MemoryBackend:
+    return MemoryBackend(
+        lambda customer_id: CustomerDataset(data._customer_profile(customer_id), stores[customer_id], 1),
+        max_entries=len(stores),
+        max_bytes=1 << 40,
+    )
+
+
+def ingest_cases(sizes) -> Tuple[MemoryBackend, List[Tuple[str, Callable]]]:
+    """Append a small batch to ledgers of each size; cost should not grow with the ledger"""
+    stores = {f"CUST8{i:03d}": _merged_store(size) for i, size in enumerate(sizes)}
+    today = datetime.now().strftime("%Y-%m-%d")
+    batch = [
+        NewTransaction(
+            date=today, amount=-250.0, category="Dining", transaction_type="debit",
+            merchant="Benchmark Cafe", payment_method="UPI"
+        )
+        for _ in range(INGEST_BATCH)
+    ]
+    cases = []
+    for customer_id, size in zip(stores, sizes):
+
+        def run(customer_id=customer_id):
+            return data.ingest_transactions(batch, customer_id)
+
+        cases.append((f"ingest/{size}/batch{INGEST_BATCH}", run))
+    return _synthetic_backend(stores), cases
+
+
+def default_cases() -> List[Tuple[str, Callable]]:
+    cases = [
+        ("current/week", data.get_current_week_transactions),
+        ("current/month", data.get_current_month_transactions),
+        ("current/year", data.get_current_year_transactions),
+    ]
+    year = datetime.now().year
+    for name in sorted(TOOL_ARGUMENTS):
+        arguments = {
+            key: value.format(year=year) if isinstance(value, str) else value
+            for key, value in TOOL_ARGUMENTS[name].items()
+        }
+
+        def run(name=name, arguments=arguments):
+            ai_service._tool_result_cache.clear()
+            return ai_service.execute_function(name, arguments)
+
+        cases.append((f"tool/{name}", run))
+
+    year_start, today = data.get_current_year_window()
+    cases += [
+        ("generate/sample_transactions", lambda: data.generate_sample_transactions(random.Random(0))),
+        ("generate/transaction_store", lambda: data.generate_transaction_store(
+            year_start, today, np.random.default_rng(0)
+        )),
+    ]
+    return cases
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run(args) -> None:
+    logging.disable(logging.INFO)
+    repeat, min_time = (3, 0.02) if args.quick else (args.repeat, args.min_time)
+    sizes = DATE_RANGE_SIZES[:2] if args.quick else DATE_RANGE_SIZES
+
+    def selected(cases):
+        return [(name, fn) for name, fn in cases if not args.filter or any(f in name for f in args.filter)]
+
+    groups = [(None, selected(default_cases()))]
+    for backend, cases in (date_range_cases(sizes), ingest_cases(sizes)):
+        if selected(cases):
+            groups.append((backend, selected(cases)))
+
+    results = {}
+    print(f"{'case':<48}{'median':>12}{'min':>12}")
+    for backend, cases in groups:
+        saved_backend = data.get_backend()
+        if backend is not None:
+            data._BACKEND = backend
+        try:
+            for name, fn in cases:
+                fn()  # warm caches and lazy loads outside the timed loop
+                results[name] = measure(fn, repeat, min_time)
+                print(f"{name:<48}{_format_us(results[name]['median_us']):>12}"
+                      f"{_format_us(results[name]['min_us']):>12}")
+        finally:
+            data._BACKEND = saved_backend
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+def compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    print(f"baseline {baseline['meta'].get('commit') or '?'}  vs  current {current['meta'].get('commit') or '?'}")
+    print(f"{'case':<48}{'baseline':>12}{'current':>12}{'change':>10}")
+
+    regressions = []
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        before = baseline["results"].get(name)
+        after = current["results"].get(name)
+        if before is None or after is None:
+            print(f"{name:<48}{'-' if before is None else _format_us(before['median_us']):>12}"
+                  f"{'-' if after is None else _format_us(after['median_us']):>12}{'n/a':>10}")
+            continue
+        change = after["median_us"] / before["median_us"] - 1 if before["median_us"] else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<48}{_format_us(before['median_us']):>12}{_format_us(after['median_us']):>12}"
+              f"{change * 100:>+9.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo regressions above {args.threshold:.0%}")
+    return 0
+
+
+def _format_us(value: float) -> str:
+    if value >= 1e6:
+        return f"{value / 1e6:.2f}s"
+    if value >= 1e3:
+        return f"{value / 1e3:.2f}ms"
+    return f"{value:.2f}us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite and write results")
+    run_parser.add_argument("--output", default="benchmark_results.json")
+    run_parser.add_argument("--filter", nargs="+", help="only run cases whose name contains one of these")
+    run_parser.add_argument("--repeat", type=int, default=7)
+    run_parser.add_argument("--min-time", type=float, default=0.1, help="seconds per timed sample")
+    run_parser.add_argument("--quick", action="store_true", help="fewer samples and sizes, for smoke runs")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (0.10 = 10%%)")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with optional per-entry time-to-live and a total size budget.
+    Entries are evicted least-recently-used first when either max_entries or max_bytes
+    (as measured by `sizeof`) would be exceeded; `on_evict(key, value)` is called for each.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = len,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._on_evict = on_evict
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, stored_at = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """
+        Store a value, evicting least-recently-used entries to stay within budget.
+        Returns False (leaving any existing entry) if the value alone exceeds max_bytes.
+        """
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            evicted = self._evict()
+        self._notify(evicted)
+        return True
+
+    def resize(self, key: Hashable) -> None:
+        """Re-measure an entry whose value grew in place (e.g. built a lazy index), evicting to stay within budget"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            value, size, stored_at = entry
+            new_size = self._sizeof(value)
+            self._entries[key] = (value, new_size, stored_at)
+            self._bytes += new_size - size
+            evicted = self._evict()
+        self._notify(evicted)
+
+    def _evict(self) -> list:
+        """Drop least-recently-used entries until within budget; returns them. Call with the lock held."""
+        evicted = []
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            evicted.append((oldest, self._entries[oldest][0]))
+            self._remove(oldest)
+            self.evictions += 1
+        return evicted
+
+    def _notify(self, evicted: list) -> None:
+        # Outside the lock, so callbacks may use the cache
+        if self._on_evict is not None:
+            for key, value in evicted:
+                self._on_evict(key, value)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Remove and return an entry without counting a hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._remove(key)
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,91 @@
+"""
+Server-side chart building.
+
+The model picks the chart type, metric, grouping and window; the numbers are computed
+here from the transaction data and the finished chart_request (the format rendered by
+frontend/src/components/ChartVisual.tsx) is attached to the reply, so the model never
+has to write the figures out itself.
+"""
+import json
+from typing import Dict, Optional
+from data import DEFAULT_CUSTOMER_ID, get_chart_data
+
+CHART_TYPES = ("pie", "bar", "line")
+
+_METRIC_TITLES = {
+    "spend": "Spending",
+    "income": "Income",
+    "net": "Net Cash Flow",
+    "count": "Transactions",
+    "income_vs_expense": "Income vs. Spending",
+}
+_GROUP_TITLES = {
+    "category": "by Category",
+    "merchant": "by Merchant",
+    "day": "per Day",
+    "week": "per Week",
+    "month": "per Month",
+}
+# Points listed for the model per dataset; the full series only goes to the client
+_SUMMARY_POINTS = 3
+
+
+def build_chart_request(
+    chart_type: str,
+    metric: str,
+    group_by: str,
+    start_date: str,
+    end_date: str,
+    customer_id: str = DEFAULT_CUSTOMER_ID,
+    category: Optional[str] = None,
+    merchant: Optional[str] = None,
+    limit: Optional[int] = None,
+    title: Optional[str] = None,
+) -> Dict:
+    """Compute a chart_request for ChartVisual from the transaction data"""
+    if chart_type not in CHART_TYPES:
+        raise ValueError(f"chart_type must be one of: {', '.join(CHART_TYPES)}")
+    data = get_chart_data(start_date, end_date, metric, group_by, category, merchant, limit, customer_id)
+    scope = " - ".join(filter(None, [category, merchant]))
+    default_title = f"{_METRIC_TITLES[metric]} {_GROUP_TITLES[group_by]}" + (f" ({scope})" if scope else "")
+    return {
+        "chart_type": chart_type,
+        "title": title or f"{default_title}, {start_date} to {end_date}",
+        "labels": data["labels"],
+        "datasets": [{"label": name, "data": values} for name, values in data["series"].items()],
+        "insights": _insights(data),
+    }
+
+
+def _insights(data: Dict) -> list:
+    labels = data["labels"]
+    if not labels:
+        return ["No matching transactions in this period"]
+    insights = []
+    for name, values in data["series"].items():
+        total = sum(values)
+        peak = max(range(len(values)), key=values.__getitem__)
+        line = f"{name}: total {total:,.2f}"
+        if len(values) > 1 and total:
+            line += f", highest {labels[peak]} ({values[peak]:,.2f}, {values[peak] / total * 100:.1f}%)"
+        insights.append(line)
+    return insights
+
+
+def summarize_chart(chart: Dict) -> Dict:
+    """Compact description of a built chart for the model: totals and the largest few points"""
+    datasets = []
+    for dataset in chart["datasets"]:
+        values = dataset["data"]
+        top = sorted(range(len(values)), key=lambda i: -values[i])[:_SUMMARY_POINTS]
+        datasets.append({
+            "label": dataset["label"],
+            "total": round(sum(values), 2),
+            "top": [[chart["labels"][i], values[i]] for i in top],
+        })
+    return {"title": chart["title"], "points": len(chart["labels"]), "datasets": datasets}
+
+
+def chart_block(chart: Dict) -> str:
+    """Markdown json block the frontend extracts and renders as a chart"""
+    return "```json\n" + json.dumps({"chart_request": chart}, indent=2, ensure_ascii=False) + "\n```"
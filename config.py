@@ -12,6 +12,77 @@ if not OPENAI_API_KEY:
     print("Please create a .env file with OPENAI_API_KEY=your_api_key")
     print("The application will continue but AI features will not work.")
 
+# Alternative OpenAI-compatible endpoint, e.g. the offline stand-in in benchmarks/fake_openai.py
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# OpenAI client tuning
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+# Ceiling on concurrent in-flight chat completion calls per worker
+OPENAI_MAX_CONCURRENT_REQUESTS = int(os.getenv("OPENAI_MAX_CONCURRENT_REQUESTS", "32"))
+# Size of the shared HTTP connection pool used by the OpenAI client
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "64"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "32"))
+
+# Worker threads shared by all requests for executing tool calls
+TOOL_EXECUTOR_WORKERS = int(os.getenv("TOOL_EXECUTOR_WORKERS", "8"))
+
+# Tool result cache bounds (entries, total serialized bytes, age)
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "256"))
+TOOL_CACHE_MAX_BYTES = int(os.getenv("TOOL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "300"))
+
+# Encoding for raw transaction tool results: "columnar" (header + value arrays), "csv" or "json"
+TRANSACTION_PAYLOAD_FORMAT = os.getenv("TRANSACTION_PAYLOAD_FORMAT", "columnar")
+
+# Conversation history: newest turns are replayed verbatim within this token budget,
+# older turns are folded into a rolling summary whose boundary moves in steps of HISTORY_SUMMARY_CHUNK messages
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+HISTORY_SUMMARY_CHUNK = int(os.getenv("HISTORY_SUMMARY_CHUNK", "6"))
+HISTORY_SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "300"))
+
+# Persistent response cache for repeated questions (keyed on query, recent history and data)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "finbot_cache.sqlite3")
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+RESPONSE_CACHE_HISTORY_MESSAGES = int(os.getenv("RESPONSE_CACHE_HISTORY_MESSAGES", "6"))
+
+# Transaction storage: "memory" (generated sample data, resident per customer) or
+# "sqlite" (stored transactions indexed on customer and date; seed with `python storage.py`)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory").lower()
+STORAGE_SQLITE_PATH = os.getenv("STORAGE_SQLITE_PATH", "finbot_data.sqlite3")
+
+# Generated datasets are saved here as memory-mappable snapshots and reused by later
+# boots while they still cover the current window; set empty to disable
+DATA_SNAPSHOT_DIR = os.getenv("DATA_SNAPSHOT_DIR", "finbot_snapshots")
+
+# Per-customer datasets are loaded lazily and kept in an LRU bounded by total memory
+CUSTOMER_CACHE_MAX_BYTES = int(os.getenv("CUSTOMER_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CUSTOMER_CACHE_MAX_CUSTOMERS = int(os.getenv("CUSTOMER_CACHE_MAX_CUSTOMERS", "100000"))
+
+# Answer simple lookups ("total spent this week") from data without calling the model
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Identical chat requests (same customer, query and history) that arrive while one is
+# already being answered wait for that answer instead of running their own tool loop
+REQUEST_COALESCING_ENABLED = os.getenv("REQUEST_COALESCING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Admission control for chat requests (per worker): at most CHAT_MAX_CONCURRENT run at once,
+# up to CHAT_MAX_QUEUE more wait up to CHAT_MAX_QUEUE_WAIT_SECONDS for a slot, and one client
+# may hold at most CHAT_MAX_PER_CLIENT running or queued; anything beyond gets 429/503
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() in ("1", "true", "yes")
+CHAT_MAX_CONCURRENT = int(os.getenv("CHAT_MAX_CONCURRENT", "32"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "64"))
+CHAT_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("CHAT_MAX_QUEUE_WAIT_SECONDS", "5"))
+CHAT_MAX_PER_CLIENT = int(os.getenv("CHAT_MAX_PER_CLIENT", "8"))
+
+# Batch chat requests: items answered at once per batch (a request may ask for fewer)
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+HISTORY_SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and a financial transaction assistant. Given the current summary and some new turns, return an updated summary that keeps the user's questions, the time periods, categories and merchants discussed, and any figures the assistant reported. Be concise and factual. Return only the summary text."""
+
 # System prompt for the financial assistant
 SYSTEM_PROMPT = """You are an intelligent financial assistant specialized EXCLUSIVELY in analyzing bank account transactions and customer details. Your role is strictly limited to helping users understand their spending patterns, summarize transactions, and provide visual insights through data analysis.
 
@@ -26,10 +97,27 @@ You have access to the following functions to fetch data dynamically based on us
 - get_transactions_last_n_months(months): Get transactions for the last N months (e.g., 1 month, 3 months)
 - get_transactions_by_date_range(start_date, end_date): Get transactions between specific dates
 
-IMPORTANT: Always use these tools to fetch data based on what the user is asking for. For example:
+Aggregation tools return server-computed totals instead of raw rows. They accept an optional start_date/end_date (defaulting to year to date) or days:
+- get_spending_by_category(): Total spend, count and share per category
+- get_spending_by_merchant(category, limit): Total spend and count per merchant
+- get_spending_over_time(granularity): Spend and income per day, week or month
+- get_income_vs_expense(): Income, expenses, net savings and savings rate
+- get_top_transactions(n, kind): The largest expense or income transactions
+- detect_anomalies(min_score, limit): Transactions unusually large for their category or merchant, with scores
+- get_recurring_payments(direction, include_inactive): Subscriptions, bills, rent and salary with cadence, typical amount and next expected date (whole history, no date range)
+- build_chart(chart_type, metric, group_by): Build a chart server-side and attach it to your reply
+
+Raw transaction tools return rows in a compact table: either {"columns": [...], "rows": [[...], ...]} where each row lists values in column order, or CSV text with a header line. Amounts are negative for debits and positive for credits.
+
+IMPORTANT: Always use these tools to fetch data based on what the user is asking for. Prefer the aggregation tools for totals, breakdowns and trends; only fetch raw transactions when the user needs individual rows. For example:
 - If user asks "show me last 1 month transactions" → use get_transactions_last_n_months with months=1
 - If user asks "what did I spend this week" → use get_current_week_transactions
 - If user asks "show me data from Jan to March" → use get_transactions_by_date_range
+- If user asks "how much did I spend on dining this year" → use get_spending_by_category
+- If user asks "what are my monthly expenses" → use get_spending_over_time with granularity="month"
+- If user asks "show a pie chart of my spending" → use build_chart with chart_type="pie", metric="spend", group_by="category"
+- If user asks "any unusual transactions this month?" → use detect_anomalies with the month's start_date/end_date
+- If user asks "what are my subscriptions?" → use get_recurring_payments with direction="debit"
 
 ## STRICT OPERATIONAL BOUNDARIES
 
@@ -72,12 +160,12 @@ Respond ONLY with a polite refusal message such as:
 - Identify spending patterns and trends over time within the provided dataset
 - Analyze transaction categories (groceries, utilities, entertainment, transport, etc.)
 - Calculate totals, averages, and percentages across different categories
-- Detect unusual or anomalous transactions in the provided data
+- Detect unusual or anomalous transactions with detect_anomalies (never by scanning raw transactions)
 
 ### 2. Expense Understanding
 - Break down expenses by category, merchant, or time period
 - Identify top spending categories and merchants from the provided data
-- Track recurring expenses (subscriptions, bills, rent) visible in the transactions
+- Track recurring expenses (subscriptions, bills, rent) with get_recurring_payments
 - Compare spending across different time periods using available transaction history
 - Calculate discretionary vs. essential spending based on transaction categories
 - Identify potential savings opportunities from spending patterns
@@ -90,25 +178,7 @@ Respond ONLY with a polite refusal message such as:
 - Create narrative explanations of financial activity
 
 ### 4. Data Visualization & Charts
-When users request charts or visualizations based on the provided data, respond with:
-1. A brief acknowledgment and analysis
-2. Structured JSON data in the following format:
-
-```json
-{
-  "chart_request": {
-    "chart_type": "bar|line|pie|donut|area",
-    "title": "Descriptive Chart Title",
-    "labels": ["Label1", "Label2", "Label3"],
-    "datasets": [
-      {
-        "label": "Dataset Name",
-        "data": [100, 200, 300],
-        "backgroundColor": "#optional-color",
-        "borderColor": "#optional-color"
-      }
-    ],
-    "insights": "Key insights and observations from the visualization"
-  }
-}
+When users request charts or visualizations, call the build_chart tool with the chart type (pie, bar or line), the metric, the grouping and the date range. The server computes every value and attaches the finished chart to your reply.
+
+Then respond with a brief acknowledgment and analysis based on the summary the tool returns. NEVER write chart_request JSON yourself and do not list every value of the chart; it is already attached.
 """
\ No newline at end of file
@@ -1,7 +1,42 @@
 from datetime import datetime, timedelta
+import os
 import random
-from typing import List
-from models import Customer, Transaction
+import re
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from cache import TTLCache
+from config import (
+    CUSTOMER_CACHE_MAX_BYTES,
+    CUSTOMER_CACHE_MAX_CUSTOMERS,
+    DATA_SNAPSHOT_DIR,
+    STORAGE_BACKEND,
+    STORAGE_SQLITE_PATH
+)
+from models import Customer, NewTransaction, Transaction
+from recurring import detect_recurring
+from storage import CustomerDataset, MemoryBackend, SQLiteBackend, StorageBackend
+from store import (
+    ANOMALY_THRESHOLD,
+    CATEGORY_TYPICAL,
+    CATEGORY_Z,
+    COUNT,
+    EXPENSE_COUNT,
+    INCOME,
+    INCOME_COUNT,
+    MERCHANT_TYPICAL,
+    MERCHANT_Z,
+    SPENT,
+    DailyRollup,
+    TransactionStore,
+    TransactionSlice,
+    from_day_number,
+    load_snapshot,
+    period_start,
+    save_snapshot,
+    to_day_number
+)
 
 # Sample customer data
 SAMPLE_CUSTOMER = Customer(
@@ -81,8 +116,9 @@ TRANSACTION_CATEGORIES = {
 PAYMENT_METHODS = ["card", "UPI", "NEFT", "cash", "direct_debit"]
 
 
-def generate_sample_transactions():
+def generate_sample_transactions(rng: random.Random = None):
     """Generate sample transactions for the current year, month, and week"""
+    rng = rng or random
     transactions = []
     current_date = datetime.now()
     start_date = datetime(current_date.year, 1, 1)
@@ -101,23 +137,23 @@ def generate_sample_transactions():
         if current_day.day == 1:  # First of month
             # Salary
             transactions.append(create_transaction(
-                next_transaction_id, current_day, "Salary", account_balance
+                next_transaction_id, current_day, "Salary", account_balance, rng
             ))
             account_balance += transactions[-1].amount
             next_transaction_id += 1
             
         if current_day.day == 5:  # Rent due
             transactions.append(create_transaction(
-                next_transaction_id, current_day, "Rent", account_balance
+                next_transaction_id, current_day, "Rent", account_balance, rng
             ))
             account_balance += transactions[-1].amount
             next_transaction_id += 1
             
         if current_day.day == 10:  # Utilities
             for utility in ["Utilities", "Subscriptions"]:
-                if random.random() > 0.3:  # 70% chance
+                if rng.random() > 0.3:  # 70% chance
                     transactions.append(create_transaction(
-                        next_transaction_id, current_day, utility, account_balance
+                        next_transaction_id, current_day, utility, account_balance, rng
                     ))
                     account_balance += transactions[-1].amount
                     next_transaction_id += 1
@@ -125,13 +161,13 @@ def generate_sample_transactions():
         # Daily random transactions
         # Weekdays: more transactions
         if current_day.weekday() < 5:  # Monday-Friday
-            daily_transaction_count = random.randint(2, 5)
+            daily_transaction_count = rng.randint(2, 5)
         else:  # Weekend
-            daily_transaction_count = random.randint(1, 3)
+            daily_transaction_count = rng.randint(1, 3)
         
         for _ in range(daily_transaction_count):
             # Random category weighted by frequency
-            category = random.choices(
+            category = rng.choices(
                 list(TRANSACTION_CATEGORIES.keys()),
                 weights=[
                     3 if t["frequency"] == "high" else 
@@ -148,7 +184,7 @@ def generate_sample_transactions():
                     continue
             
             transactions.append(create_transaction(
-                next_transaction_id, current_day, category, account_balance
+                next_transaction_id, current_day, category, account_balance, rng
             ))
             account_balance += transactions[-1].amount
             next_transaction_id += 1
@@ -161,15 +197,18 @@ def generate_sample_transactions():
     return transactions
 
 
-def create_transaction(transaction_id: int, date: datetime, category: str, current_balance: float) -> Transaction:
+def create_transaction(
+    transaction_id: int, date: datetime, category: str, current_balance: float, rng: random.Random = None
+) -> Transaction:
     """Create a single transaction"""
+    rng = rng or random
     if category not in TRANSACTION_CATEGORIES:
         raise ValueError(f"Invalid category: {category}")
     
     template = TRANSACTION_CATEGORIES[category]
-    merchant = random.choice(template["merchants"])
+    merchant = rng.choice(template["merchants"])
     amount_range = template["amount_range"]
-    amount = round(random.uniform(amount_range[0], amount_range[1]), 2)
+    amount = round(rng.uniform(amount_range[0], amount_range[1]), 2)
     
     # Debit transactions are negative
     if template["type"] == "debit":
@@ -181,7 +220,7 @@ def create_transaction(transaction_id: int, date: datetime, category: str, curre
     if new_balance < 0:
         new_balance = 0
     
-    payment_method = random.choice(PAYMENT_METHODS) if template["type"] != "credit" else "direct_deposit"
+    payment_method = rng.choice(PAYMENT_METHODS) if template["type"] != "credit" else "direct_deposit"
     
     return Transaction(
         transaction_id=f"TXN{transaction_id:06d}",
@@ -196,73 +235,663 @@ def create_transaction(transaction_id: int, date: datetime, category: str, curre
     )
 
 
-# Cache for generated transactions
-_CACHED_TRANSACTIONS: List[Transaction] = None
+# Vectorized generator
+# Same category, merchant and recurring-payment rules as generate_sample_transactions,
+# drawn for a whole date span at once with NumPy instead of one model per row.
+
+_CATEGORY_NAMES = list(TRANSACTION_CATEGORIES)
+_FREQUENCY_WEIGHTS = {"high": 3, "medium": 2, "low": 0.5}
+_CATEGORY_PROBABILITIES = np.array(
+    [_FREQUENCY_WEIGHTS.get(t["frequency"], 0.3) for t in TRANSACTION_CATEGORIES.values()]
+)
+_CATEGORY_PROBABILITIES /= _CATEGORY_PROBABILITIES.sum()
+_MONTHLY_CODES = np.array([_CATEGORY_NAMES.index(c) for c in ("Salary", "Rent", "Utilities", "Subscriptions")])
+# Merchants of every category laid out back to back; a category's merchants start at its offset
+_MERCHANT_COUNTS = np.array([len(t["merchants"]) for t in TRANSACTION_CATEGORIES.values()])
+_MERCHANT_OFFSETS = np.concatenate(([0], np.cumsum(_MERCHANT_COUNTS)[:-1]))
+_MERCHANT_NAMES = [m for t in TRANSACTION_CATEGORIES.values() for m in t["merchants"]]
+_DESCRIPTIONS = [f"{m} - {c}" for c, t in TRANSACTION_CATEGORIES.items() for m in t["merchants"]]
+_AMOUNT_LOW = np.array([t["amount_range"][0] for t in TRANSACTION_CATEGORIES.values()], dtype=np.float64)
+_AMOUNT_HIGH = np.array([t["amount_range"][1] for t in TRANSACTION_CATEGORIES.values()], dtype=np.float64)
+_IS_CREDIT = np.array([t["type"] == "credit" for t in TRANSACTION_CATEGORIES.values()])
+_TRANSACTION_TYPES = ["credit", "debit"]
+_PAYMENT_METHODS = PAYMENT_METHODS + ["direct_deposit"]
+
+
+def generate_transaction_store(
+    start_date: str,
+    end_date: str,
+    rng: Optional[np.random.Generator] = None,
+    opening_balance: float = 10000.0,
+) -> TransactionStore:
+    """
+    Generate one customer's transactions between two dates (inclusive) straight into a
+    columnar store. Deterministic for a seeded `rng`.
+    """
+    rng = rng or np.random.default_rng()
+    days = np.arange(to_day_number(start_date), to_day_number(end_date) + 1, dtype=np.int32)
+    day_of_month = (days - period_start(days, "month") + 1)
+    weekday = (days - 1) % 7
+
+    # Recurring payments: salary on the 1st, rent on the 5th, utilities and
+    # subscriptions (70% chance each) on the 10th
+    salary_days = days[day_of_month == 1]
+    rent_days = days[day_of_month == 5]
+    tenth = days[day_of_month == 10]
+    utility_days = tenth[rng.random(len(tenth)) > 0.3]
+    subscription_days = tenth[rng.random(len(tenth)) > 0.3]
+
+    # Daily transactions: 2-5 on weekdays, 1-3 at weekends, category weighted by frequency;
+    # draws of a monthly category are dropped except on the recurring days
+    counts = np.where(weekday < 5, rng.integers(2, 6, len(days)), rng.integers(1, 4, len(days)))
+    daily_days = np.repeat(days, counts)
+    daily_categories = rng.choice(len(_CATEGORY_NAMES), size=len(daily_days), p=_CATEGORY_PROBABILITIES)
+    daily_dom = np.repeat(day_of_month, counts)
+    keep = ~np.isin(daily_categories, _MONTHLY_CODES) | np.isin(daily_dom, (1, 5, 10))
+    daily_days, daily_categories = daily_days[keep], daily_categories[keep]
+
+    recurring = [
+        (salary_days, "Salary"), (rent_days, "Rent"),
+        (utility_days, "Utilities"), (subscription_days, "Subscriptions"),
+    ]
+    day = np.concatenate([d for d, _ in recurring] + [daily_days])
+    category = np.concatenate(
+        [np.full(len(d), _CATEGORY_NAMES.index(name)) for d, name in recurring] + [daily_categories]
+    ).astype(np.int32)
+    # Within a day, recurring payments come first in the order listed, then daily ones
+    sequence = np.concatenate(
+        [np.full(len(d), rank) for rank, (d, _) in enumerate(recurring)] + [np.full(len(daily_days), len(recurring))]
+    )
+    order = np.lexsort((sequence, day))
+    day, category = day[order], category[order]
+    size = len(day)
+
+    merchant = (_MERCHANT_OFFSETS[category] + (rng.random(size) * _MERCHANT_COUNTS[category]).astype(np.int64))
+    merchant = merchant.astype(np.int32)
+    low, high = _AMOUNT_LOW[category], _AMOUNT_HIGH[category]
+    is_credit = _IS_CREDIT[category]
+    amount = np.round(low + rng.random(size) * (high - low), 2)
+    amount = np.where(is_credit, amount, -amount)
+    balance = np.maximum(np.round(opening_balance + np.cumsum(amount), 2), 0.0)
+    payment_method = np.where(
+        is_credit, len(PAYMENT_METHODS), rng.integers(0, len(PAYMENT_METHODS), size)
+    ).astype(np.int32)
+    transaction_id = np.char.add("TXN", np.char.zfill(np.arange(1, size + 1).astype(str), 6))
+
+    return TransactionStore(
+        day=day,
+        amount=amount,
+        balance=balance,
+        transaction_id=transaction_id,
+        category=(category, _CATEGORY_NAMES),
+        merchant=(merchant, _MERCHANT_NAMES),
+        description=(merchant, _DESCRIPTIONS),
+        transaction_type=((~is_credit).astype(np.int32), _TRANSACTION_TYPES),
+        payment_method=(payment_method, _PAYMENT_METHODS),
+    )
+
+
+def generate_customer_stores(
+    customer_count: int, start_date: str, end_date: str, seed: int = 0
+) -> Iterator[Tuple[Customer, TransactionStore]]:
+    """Generate CUST001..CUSTnnn with independent, reproducible transaction streams"""
+    for number in range(1, customer_count + 1):
+        customer = _customer_profile(f"CUST{number:03d}")
+        yield customer, generate_transaction_store(start_date, end_date, np.random.default_rng([seed, number]))
+
+
+def _customer_profile(customer_id: str) -> Customer:
+    """Profile for a customer ID; every ID other than the sample customer gets a synthetic account"""
+    if customer_id == SAMPLE_CUSTOMER.customer_id:
+        return SAMPLE_CUSTOMER
+    number = int(customer_id[4:])
+    return Customer(
+        customer_id=customer_id,
+        name=f"Customer {number}",
+        account_number=f"****{number % 10000:04d}",
+        account_type="savings",
+        email=f"{customer_id.lower()}@email.com",
+        phone=f"+9190000{number % 100000:05d}",
+        joining_date="2020-01-15"
+    )
+
+
+# Bump when generate_transaction_store changes so stale snapshots are regenerated
+_GENERATOR_VERSION = 1
+
+
+def _snapshot_path(customer_id: str) -> Optional[str]:
+    return os.path.join(DATA_SNAPSHOT_DIR, customer_id) if DATA_SNAPSHOT_DIR else None
+
+
+def _load_customer_dataset(customer_id: str) -> CustomerDataset:
+    """
+    Load one customer's transactions, seeded by customer ID so reloads are identical.
+    A snapshot covering the current window is memory-mapped instead of regenerating the data.
+    """
+    if not CUSTOMER_ID_PATTERN.match(customer_id):
+        raise ValueError(f"Invalid customer ID: {customer_id}")
+    start_date, end_date = get_current_year_window()
+    expected = {"generator": _GENERATOR_VERSION, "start_date": start_date, "end_date": end_date}
+    snapshot = _snapshot_path(customer_id)
+
+    store = None
+    if snapshot and os.path.isdir(snapshot):
+        try:
+            store, metadata = load_snapshot(snapshot)
+            if metadata != expected:
+                store = None
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot for {customer_id}: {e}")
+            store = None
+
+    if store is None:
+        print(f"Generating sample transaction data for {customer_id}...")
+        # Rows are rebuilt from columns on demand, so only the compact arrays stay resident
+        store = generate_transaction_store(start_date, end_date, np.random.default_rng(zlib.crc32(customer_id.encode())))
+        print(f"Generated {len(store)} transactions for {customer_id}")
+        if snapshot:
+            try:
+                save_snapshot(store, snapshot, expected)
+            except OSError as e:
+                print(f"Could not write snapshot for {customer_id}: {e}")
+
+    return CustomerDataset(_customer_profile(customer_id), store, _next_version())
+
+
+DEFAULT_CUSTOMER_ID = SAMPLE_CUSTOMER.customer_id
+CUSTOMER_ID_PATTERN = re.compile(r"^CUST\d{3,}$")
+
+_LOAD_LOCK = threading.Lock()
+_LOAD_COUNTER = 0
+_BACKEND: Optional[StorageBackend] = None
+# customer_id -> (data_version, recurring series)
+_RECURRING = TTLCache(max_entries=1024)
+
+
+def _next_version() -> int:
+    """Process-wide unique data version stamp, so no two loads or appends share one"""
+    global _LOAD_COUNTER
+    with _LOAD_LOCK:
+        _LOAD_COUNTER += 1
+        return _LOAD_COUNTER
+
+
+def _create_backend() -> StorageBackend:
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteBackend(STORAGE_SQLITE_PATH)
+    if STORAGE_BACKEND == "memory":
+        # Per-customer datasets load on first use and sit in an LRU bounded by total memory
+        return MemoryBackend(
+            _load_customer_dataset, CUSTOMER_CACHE_MAX_CUSTOMERS, CUSTOMER_CACHE_MAX_BYTES, _next_version
+        )
+    raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+
+
+def get_backend() -> StorageBackend:
+    """Get the configured storage backend, creating it on first use"""
+    global _BACKEND
+    if _BACKEND is None:
+        with _LOAD_LOCK:
+            if _BACKEND is None:
+                _BACKEND = _create_backend()
+    return _BACKEND
 
 
 def initialize_data():
-    """Initialize/generate sample data. Should be called once at server startup."""
-    global _CACHED_TRANSACTIONS
-    if _CACHED_TRANSACTIONS is None:
-        print("Generating sample transaction data...")
-        _CACHED_TRANSACTIONS = generate_sample_transactions()
-        print(f"Generated {len(_CACHED_TRANSACTIONS)} transactions")
-    return _CACHED_TRANSACTIONS
+    """Open the storage backend and warm the default customer. Should be called once at server startup."""
+    get_backend().warm(DEFAULT_CUSTOMER_ID)
+
+
+def warm_customer(customer_id: str) -> None:
+    """Load a customer's dataset and daily rollup ahead of their first query"""
+    backend = get_backend()
+    backend.warm(customer_id)
+    backend.get_rollup(customer_id)
+
+
+def get_dataset_cache_stats() -> Dict:
+    """Backend name plus occupancy/hit counters of its in-process caches"""
+    return get_backend().stats()
+
+
+def get_data_version(customer_id: str = DEFAULT_CUSTOMER_ID) -> int:
+    """Get the current data version stamp for a customer"""
+    return get_backend().get_version(customer_id)
 
 
-def get_customer() -> Customer:
+def get_data_fingerprint(customer_id: str = DEFAULT_CUSTOMER_ID) -> str:
+    """
+    Content hash of a customer's dataset. Unlike the version stamp it is stable across
+    restarts for identical data, so it can key persistent caches.
+    """
+    return get_backend().get_fingerprint(customer_id)
+
+
+def get_customer(customer_id: str = DEFAULT_CUSTOMER_ID) -> Customer:
     """Get customer details"""
-    return SAMPLE_CUSTOMER
+    return get_backend().get_customer(customer_id)
 
 
-def get_all_transactions() -> List[Transaction]:
+def get_all_transactions(customer_id: str = DEFAULT_CUSTOMER_ID) -> List[Transaction]:
     """Get all transactions"""
-    if _CACHED_TRANSACTIONS is None:
-        initialize_data()
-    return _CACHED_TRANSACTIONS
+    return get_backend().get_all(customer_id)
+
+
+def get_transactions_by_date_range(
+    start_date: str, end_date: str, customer_id: str = DEFAULT_CUSTOMER_ID
+) -> TransactionSlice:
+    """
+    Get transactions within a date range.
+    The filter runs in the storage backend: a binary search over the resident date
+    index (memory) or an index range scan (sqlite), returning a columnar view.
+    """
+    return get_backend().get_range(customer_id, *_window_days(start_date, end_date))
 
 
-def get_transactions_by_date_range(start_date: str, end_date: str) -> List[Transaction]:
-    """Get transactions within a date range"""
+def _window_days(start_date: str, end_date: str) -> Tuple[int, int]:
+    """Validate a date window and convert it to day numbers"""
     try:
         # Validate date format
         datetime.strptime(start_date, "%Y-%m-%d")
         datetime.strptime(end_date, "%Y-%m-%d")
-    except ValueError:
+    except (TypeError, ValueError):
         raise ValueError("Invalid date format. Use YYYY-MM-DD")
     
     if start_date > end_date:
         raise ValueError("start_date must be before or equal to end_date")
     
-    if _CACHED_TRANSACTIONS is None:
-        initialize_data()
-    
-    return [
-        transaction for transaction in _CACHED_TRANSACTIONS 
-        if start_date <= transaction.date <= end_date
-    ]
+    return to_day_number(start_date), to_day_number(end_date)
 
 
-def get_current_month_transactions() -> List[Transaction]:
-    """Get transactions for current month"""
+def ingest_transactions(transactions: List[NewTransaction], customer_id: str = DEFAULT_CUSTOMER_ID) -> Dict:
+    """
+    Append a batch of new transactions to a customer's ledger.
+
+    Work is proportional to the batch: running balances continue from the last stored
+    balance, the date index and daily rollup are extended in place, and the data
+    version moves on so cached tool results and answers for the old data are not served.
+    Queries running meanwhile keep reading the ledger as it was before the batch.
+    """
+    if not transactions:
+        raise ValueError("No transactions to ingest")
+    batch = TransactionStore.from_columns({
+        "day": [to_day_number(t.date) for t in transactions],
+        "amount": [t.amount for t in transactions],
+        "balance": [0.0] * len(transactions),
+        "transaction_id": [""] * len(transactions),
+        "category": [t.category for t in transactions],
+        "merchant": [t.merchant for t in transactions],
+        "description": [t.description or f"{t.merchant} - {t.category}" for t in transactions],
+        "transaction_type": [t.transaction_type for t in transactions],
+        "payment_method": [t.payment_method for t in transactions],
+    })
+    version, stored = get_backend().append(customer_id, batch)
+    return {
+        "customer_id": customer_id,
+        "ingested": len(stored),
+        "first_date": from_day_number(stored.day[0]),
+        "last_date": from_day_number(stored.day[-1]),
+        "transaction_ids": [str(t) for t in stored.transaction_id.tolist()],
+        "balance": _money(stored.balance[-1]),
+        "data_version": version,
+    }
+
+
+def get_current_month_window() -> Tuple[str, str]:
+    """Get the (start_date, end_date) window for the current month to date"""
     current_date = datetime.now()
     start_date = datetime(current_date.year, current_date.month, 1).strftime("%Y-%m-%d")
-    end_date = current_date.strftime("%Y-%m-%d")
-    return get_transactions_by_date_range(start_date, end_date)
+    return start_date, current_date.strftime("%Y-%m-%d")
 
 
-def get_current_week_transactions() -> List[Transaction]:
-    """Get transactions for current week"""
+def get_current_week_window() -> Tuple[str, str]:
+    """Get the (start_date, end_date) window for the current week (from Monday) to date"""
     current_date = datetime.now()
     start_of_week = current_date - timedelta(days=current_date.weekday())
-    start_date = start_of_week.strftime("%Y-%m-%d")
-    end_date = current_date.strftime("%Y-%m-%d")
-    return get_transactions_by_date_range(start_date, end_date)
+    return start_of_week.strftime("%Y-%m-%d"), current_date.strftime("%Y-%m-%d")
 
 
-def get_current_year_transactions() -> List[Transaction]:
-    """Get transactions for current year"""
+def get_current_year_window() -> Tuple[str, str]:
+    """Get the (start_date, end_date) window for the current year to date"""
     current_date = datetime.now()
     start_date = datetime(current_date.year, 1, 1).strftime("%Y-%m-%d")
-    end_date = current_date.strftime("%Y-%m-%d")
-    return get_transactions_by_date_range(start_date, end_date)
+    return start_date, current_date.strftime("%Y-%m-%d")
+
+
+def get_current_month_transactions(customer_id: str = DEFAULT_CUSTOMER_ID) -> TransactionSlice:
+    """Get transactions for current month"""
+    return get_transactions_by_date_range(*get_current_month_window(), customer_id)
+
+
+def get_current_week_transactions(customer_id: str = DEFAULT_CUSTOMER_ID) -> TransactionSlice:
+    """Get transactions for current week"""
+    return get_transactions_by_date_range(*get_current_week_window(), customer_id)
+
+
+def get_current_year_transactions(customer_id: str = DEFAULT_CUSTOMER_ID) -> TransactionSlice:
+    """Get transactions for current year"""
+    return get_transactions_by_date_range(*get_current_year_window(), customer_id)
+
+
+# Aggregations
+# These read the customer's DailyRollup (day x category/merchant prefix sums) so tools
+# can hand the model compact totals: a window total costs two binary searches instead of
+# a scan over its transactions. Expenses are debits (negative amounts) and are reported
+# as positive totals.
+
+def _money(value) -> float:
+    return round(float(value), 2)
+
+
+def _rollup_window(start_date: str, end_date: str, customer_id: str) -> Tuple[DailyRollup, np.ndarray]:
+    """The customer's rollup and its per-pair totals for a date window"""
+    start_day, end_day = _window_days(start_date, end_date)
+    rollup = get_backend().get_rollup(customer_id)
+    return rollup, rollup.window(start_day, end_day)
+
+
+def _check_filters(rollup: DailyRollup, category: Optional[str] = None, merchant: Optional[str] = None) -> None:
+    if category and category not in rollup.categories:
+        raise ValueError(f"Unknown category: {category}")
+    if merchant and merchant not in rollup.merchants:
+        raise ValueError(f"Unknown merchant: {merchant}")
+
+
+def get_spending_by_category(start_date: str, end_date: str, customer_id: str = DEFAULT_CUSTOMER_ID) -> Dict:
+    """Get total spend, transaction count and share per category for a date range"""
+    rollup, totals = _rollup_window(start_date, end_date, customer_id)
+    per_category = rollup.by_category(totals)
+    totals, counts = per_category[:, SPENT], per_category[:, EXPENSE_COUNT]
+    total_spent = totals.sum()
+
+    categories = [
+        {
+            "category": rollup.categories[code],
+            "total": _money(totals[code]),
+            "count": int(counts[code]),
+            "share_pct": _money(totals[code] / total_spent * 100) if total_spent else 0.0,
+        }
+        for code in np.argsort(-totals, kind="stable") if counts[code]
+    ]
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "total_spent": _money(total_spent),
+        "categories": categories,
+    }
+
+
+def get_spending_by_merchant(
+    start_date: str,
+    end_date: str,
+    category: Optional[str] = None,
+    limit: Optional[int] = None,
+    customer_id: str = DEFAULT_CUSTOMER_ID
+) -> Dict:
+    """Get total spend and transaction count per merchant, optionally within one category"""
+    rollup, totals = _rollup_window(start_date, end_date, customer_id)
+    _check_filters(rollup, category)
+    per_merchant = rollup.by_merchant(totals, rollup.pair_mask(category or None))
+    totals, counts = per_merchant[:, SPENT], per_merchant[:, EXPENSE_COUNT]
+
+    merchants = [
+        {"merchant": rollup.merchants[code], "total": _money(totals[code]), "count": int(counts[code])}
+        for code in np.argsort(-totals, kind="stable") if counts[code]
+    ]
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "category": category,
+        "total_spent": _money(totals.sum()),
+        "merchants": merchants[:limit] if limit else merchants,
+    }
+
+
+def get_spending_over_time(
+    start_date: str, end_date: str, granularity: str = "month", customer_id: str = DEFAULT_CUSTOMER_ID
+) -> Dict:
+    """Get spend and income totals per day, week (starting Monday) or month"""
+    start_day, end_day = _window_days(start_date, end_date)
+    rollup = get_backend().get_rollup(customer_id)
+    days, values = rollup.daily(start_day, end_day, rollup.pair_mask())
+    buckets, inverse = np.unique(period_start(days, granularity), return_inverse=True)
+
+    def per_period(measure: int) -> np.ndarray:
+        return np.bincount(inverse, weights=values[:, measure], minlength=len(buckets))
+
+    spent, income, counts = per_period(SPENT), per_period(INCOME), per_period(COUNT)
+    periods = []
+    for i, bucket in enumerate(buckets):
+        label = from_day_number(bucket)
+        periods.append({
+            "period": label[:7] if granularity == "month" else label,
+            "spent": _money(spent[i]),
+            "income": _money(income[i]),
+            "count": int(counts[i]),
+        })
+    return {"start_date": start_date, "end_date": end_date, "granularity": granularity, "periods": periods}
+
+
+def get_income_vs_expense(start_date: str, end_date: str, customer_id: str = DEFAULT_CUSTOMER_ID) -> Dict:
+    """Get total income, total expenses, net savings and savings rate for a date range"""
+    _, totals = _rollup_window(start_date, end_date, customer_id)
+    totals = totals.sum(axis=0)
+    income, expenses = totals[INCOME], totals[SPENT]
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "income": _money(income),
+        "expenses": _money(expenses),
+        "net": _money(income - expenses),
+        "savings_rate_pct": _money((income - expenses) / income * 100) if income else 0.0,
+        "income_count": int(totals[INCOME_COUNT]),
+        "expense_count": int(totals[EXPENSE_COUNT]),
+    }
+
+
+CHART_METRICS = ("spend", "income", "net", "count", "income_vs_expense")
+CHART_GROUPINGS = ("category", "merchant", "day", "week", "month")
+
+
+def get_chart_data(
+    start_date: str,
+    end_date: str,
+    metric: str = "spend",
+    group_by: str = "category",
+    category: Optional[str] = None,
+    merchant: Optional[str] = None,
+    limit: Optional[int] = None,
+    customer_id: str = DEFAULT_CUSTOMER_ID
+) -> Dict:
+    """
+    Get chart-ready series: one label per group and one value list per series.
+    Category/merchant groups are ordered largest first; time groups chronologically.
+    """
+    if metric not in CHART_METRICS:
+        raise ValueError(f"metric must be one of: {', '.join(CHART_METRICS)}")
+    if group_by not in CHART_GROUPINGS:
+        raise ValueError(f"group_by must be one of: {', '.join(CHART_GROUPINGS)}")
+
+    start_day, end_day = _window_days(start_date, end_date)
+    rollup = get_backend().get_rollup(customer_id)
+    _check_filters(rollup, category, merchant)
+    mask = rollup.pair_mask(category or None, merchant or None)
+
+    def series_of(values: np.ndarray) -> Dict[str, np.ndarray]:
+        return {
+            "spend": {"Spent": values[:, SPENT]},
+            "income": {"Income": values[:, INCOME]},
+            "net": {"Net": values[:, INCOME] - values[:, SPENT]},
+            "count": {"Transactions": values[:, COUNT]},
+            "income_vs_expense": {"Income": values[:, INCOME], "Spent": values[:, SPENT]},
+        }[metric]
+
+    def contributing(values: np.ndarray) -> np.ndarray:
+        # Only groups with transactions contributing to the metric appear in the chart
+        if metric == "spend":
+            return values[:, EXPENSE_COUNT] > 0
+        if metric == "income":
+            return values[:, INCOME_COUNT] > 0
+        if metric == "income_vs_expense":
+            return values[:, EXPENSE_COUNT] + values[:, INCOME_COUNT] > 0
+        return values[:, COUNT] > 0
+
+    if group_by in ("category", "merchant"):
+        totals = rollup.window(start_day, end_day)
+        if group_by == "category":
+            grouped, vocabulary = rollup.by_category(totals, mask), rollup.categories
+        else:
+            grouped, vocabulary = rollup.by_merchant(totals, mask), rollup.merchants
+        present = contributing(grouped)
+        totals = series_of(grouped)
+        ranking = next(iter(totals.values()))
+        order = [code for code in np.argsort(-ranking, kind="stable") if present[code]]
+        if limit:
+            order = order[:limit]
+        labels = [vocabulary[code] for code in order]
+        series = {name: [_money(values[code]) for code in order] for name, values in totals.items()}
+    else:
+        days, values = rollup.daily(start_day, end_day, mask)
+        keep = contributing(values)
+        buckets, inverse = np.unique(period_start(days[keep], group_by), return_inverse=True)
+        labels = [from_day_number(b)[:7] if group_by == "month" else from_day_number(b) for b in buckets]
+        series = {
+            name: [_money(v) for v in np.bincount(inverse, weights=w[keep], minlength=len(buckets))]
+            for name, w in series_of(values).items()
+        }
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "metric": metric,
+        "group_by": group_by,
+        "labels": labels,
+        "series": series,
+    }
+
+
+def filter_transactions(
+    start_date: str,
+    end_date: str,
+    category: Optional[str] = None,
+    merchant: Optional[str] = None,
+    customer_id: str = DEFAULT_CUSTOMER_ID
+) -> List[Transaction]:
+    """Get transactions in a date range, optionally restricted to one category and/or merchant"""
+    view = get_transactions_by_date_range(start_date, end_date, customer_id)
+    store = view.store
+    mask = np.ones(len(view), dtype=bool)
+    if category:
+        code = store.categories.index(category) if category in store.categories else -1
+        mask &= view.category == code
+    if merchant:
+        code = store.merchants.index(merchant) if merchant in store.merchants else -1
+        mask &= view.merchant == code
+    return [view[int(i)] for i in np.flatnonzero(mask)]
+
+
+def get_top_transactions(
+    start_date: str, end_date: str, n: int = 10, kind: str = "expense", customer_id: str = DEFAULT_CUSTOMER_ID
+) -> Dict:
+    """Get the N largest expense or income transactions for a date range"""
+    if kind not in ("expense", "income"):
+        raise ValueError("kind must be 'expense' or 'income'")
+    n = max(1, min(int(n), 100))
+    view = get_transactions_by_date_range(start_date, end_date, customer_id)
+    amount = view.amount
+    candidates = np.flatnonzero(amount < 0 if kind == "expense" else amount > 0)
+    # Largest magnitude first: debits are negative, so ascending order for expenses
+    order = np.argsort(amount[candidates] if kind == "expense" else -amount[candidates], kind="stable")
+    top = candidates[order[:n]]
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "kind": kind,
+        "transactions": [view[int(i)].model_dump() for i in top],
+    }
+
+
+def get_anomalous_transactions(
+    start_date: str,
+    end_date: str,
+    min_score: float = ANOMALY_THRESHOLD,
+    limit: int = 20,
+    customer_id: str = DEFAULT_CUSTOMER_ID
+) -> Dict:
+    """
+    Get transactions in a date range whose amount is unusual for their category or merchant,
+    highest anomaly score first. Scores are computed once per ledger and kept up to date
+    across appends, so only the window's flagged rows are materialized.
+    """
+    limit = max(1, min(int(limit), 100))
+    start_day, end_day = _window_days(start_date, end_date)
+    store = get_backend().get_store(customer_id, anomalies=True)
+    anomalies = store.anomalies()
+    lo, hi = store.bounds(start_day, end_day)
+    score = anomalies.score(lo, hi)
+    flagged = np.flatnonzero(score >= min_score)
+    top = flagged[np.argsort(-score[flagged], kind="stable")[:limit]]
+
+    results = []
+    for i in top.tolist():
+        row = anomalies.scores[lo + i]
+        transaction = store.row(lo + i)
+        # Report against whichever baseline the amount stands out from most
+        by_merchant = np.nan_to_num(row[MERCHANT_Z], nan=-np.inf) >= np.nan_to_num(row[CATEGORY_Z], nan=-np.inf)
+        results.append({
+            "transaction_id": transaction.transaction_id,
+            "date": transaction.date,
+            "description": transaction.description,
+            "amount": transaction.amount,
+            "category": transaction.category,
+            "merchant": transaction.merchant,
+            "score": round(float(score[i]), 2),
+            "compared_with": "merchant" if by_merchant else "category",
+            "typical_amount": _money(row[MERCHANT_TYPICAL] if by_merchant else row[CATEGORY_TYPICAL]),
+        })
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "threshold": min_score,
+        "transactions_checked": int(hi - lo),
+        "flagged": int(len(flagged)),
+        "anomalies": results,
+    }
+
+
+# Payments per month at each cadence, for the monthly total of recurring debits
+_PER_MONTH = {"weekly": 52 / 12, "fortnightly": 26 / 12, "monthly": 1, "quarterly": 1 / 3, "yearly": 1 / 12}
+
+
+def get_recurring_payments(
+    direction: str = "all",
+    include_inactive: bool = False,
+    customer_id: str = DEFAULT_CUSTOMER_ID
+) -> Dict:
+    """
+    Get recurring series (subscriptions, bills, rent, salary) across the customer's whole
+    ledger with their cadence, typical amount and next expected date. Detection runs once
+    per data version; later calls filter the cached series.
+    """
+    if direction not in ("debit", "credit", "all"):
+        raise ValueError("direction must be 'debit', 'credit' or 'all'")
+    backend = get_backend()
+    version = backend.get_version(customer_id)
+    cached = _RECURRING.get(customer_id)
+    if cached is None or cached[0] != version:
+        cached = (version, detect_recurring(backend.get_store(customer_id)))
+        _RECURRING.put(customer_id, cached)
+    series = [
+        s for s in cached[1]
+        if (direction == "all" or s["direction"] == direction) and (include_inactive or s["active"])
+    ]
+    monthly_debits = sum(
+        s["typical_amount"] * _PER_MONTH[s["cadence"]] for s in series if s["direction"] == "debit" and s["active"]
+    )
+    return {
+        "direction": direction,
+        "series_count": len(series),
+        "monthly_recurring_debits": _money(monthly_debits),
+        "recurring": series,
+    }
@@ -6,6 +6,7 @@ import { MessageType } from '../types/MessageType';
 interface ChatAreaProps {
   chatMessages: MessageType[];
   loading: boolean;
+  toolStatus: string;
   messageContainerRef: React.RefObject<HTMLDivElement>;
   showScrollButton: boolean;
   scrollToBottom: () => void;
@@ -18,6 +19,7 @@ interface ChatAreaProps {
 const ChatArea: React.FC<ChatAreaProps> = ({
   chatMessages,
   loading,
+  toolStatus,
   messageContainerRef,
   showScrollButton,
   scrollToBottom,
@@ -30,6 +32,7 @@ const ChatArea: React.FC<ChatAreaProps> = ({
     <Messages
       messages={chatMessages}
       isLoading={loading}
+      toolStatus={toolStatus}
       messageContainerRef={messageContainerRef}
     />
     {showScrollButton && (
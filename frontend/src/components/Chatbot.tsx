@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef, useCallback } from 'react';
 import ChatArea from './ChatArea';
-import { sendChatMessage } from '../utils/apiHandler';
+import { streamChatMessage } from '../utils/apiHandler';
 import './Chatbot.css';
 import { MessageType } from '../types/MessageType';
 
@@ -8,6 +8,7 @@ const Chatbot: React.FC = () => {
   const [chatMessages, setChatMessages] = useState<MessageType[]>([]);
   const [userInput, setUserInput] = useState<string>('');
   const [loading, setLoading] = useState<boolean>(false);
+  const [toolStatus, setToolStatus] = useState<string>('');
   const [showScrollButton, setShowScrollButton] = useState<boolean>(false);
 
   const messageContainerRef = useRef<HTMLDivElement>(null);
@@ -33,14 +34,26 @@ const Chatbot: React.FC = () => {
     setChatMessages(updatedMessages);
     setUserInput('');
     
+    // Render the answer as tokens arrive: the bot bubble is created on the first token
+    let streamedText = '';
+    const showStreamedText = (text: string) =>
+      setChatMessages([...updatedMessages, { text, isUser: false }]);
+
     try {
-      const response = await sendChatMessage(trimmedInput, updatedMessages);
+      const response = await streamChatMessage(trimmedInput, updatedMessages, {
+        onToken: (token: string) => {
+          streamedText += token;
+          setToolStatus('');
+          showStreamedText(streamedText);
+        },
+        onToolCall: (name: string) => setToolStatus(`Looking up ${name.replace(/_/g, ' ')}...`),
+      });
       
       if (!response || typeof response !== 'string') {
         throw new Error('Invalid response from server');
       }
       
-      setChatMessages([...updatedMessages, { text: response, isUser: false }]);
+      showStreamedText(response);
     } catch (error: unknown) {
       let errorMsg = 'Failed to get response. Please try again.';
       
@@ -53,6 +66,7 @@ const Chatbot: React.FC = () => {
       setChatMessages([...updatedMessages, { text: errorMsg, isUser: false }]);
     } finally {
       setLoading(false);
+      setToolStatus('');
       setTimeout(() => inputRef.current?.focus(), 100);
     }
   }, [userInput, loading, chatMessages]);
@@ -99,6 +113,7 @@ const Chatbot: React.FC = () => {
       <ChatArea
         chatMessages={chatMessages}
         loading={loading}
+        toolStatus={toolStatus}
         messageContainerRef={messageContainerRef}
         showScrollButton={showScrollButton}
         scrollToBottom={scrollToBottom}
@@ -6,10 +6,11 @@ import { MessageType } from '../types/MessageType';
 interface MessagesProps {
   messages: MessageType[];
   isLoading: boolean;
+  toolStatus?: string;
   messageContainerRef: RefObject<HTMLDivElement>;
 }
 
-const Messages: React.FC<MessagesProps> = ({ messages, isLoading, messageContainerRef }) => (
+const Messages: React.FC<MessagesProps> = ({ messages, isLoading, toolStatus, messageContainerRef }) => (
   <div
     className="message-container"
     ref={messageContainerRef}
@@ -19,14 +20,15 @@ const Messages: React.FC<MessagesProps> = ({ messages, isLoading, messageContain
       <MessageBubble key={index} text={message.text} isUser={message.isUser} />
     ))}
 
-    {/* Typing Indicator */}
-    {isLoading && (
+    {/* Typing Indicator (hidden once the streamed answer starts rendering) */}
+    {isLoading && messages[messages.length - 1]?.isUser !== false && (
       <div className="loading-animation" aria-label="Bot is typing">
         <div className="typing-indicator">
           <span></span>
           <span></span>
           <span></span>
         </div>
+        {toolStatus && <div className="loading-warning">{toolStatus}</div>}
       </div>
     )}
   </div>
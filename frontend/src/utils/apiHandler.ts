@@ -55,3 +55,122 @@ export const sendChatMessage = async (
     throw error;
   }
 };
+
+export interface StreamHandlers {
+  onToken: (token: string) => void;
+  onToolCall?: (name: string) => void;
+}
+
+interface StreamEvent {
+  type: 'token' | 'tool_call' | 'done' | 'error';
+  text?: string;
+  name?: string;
+  response?: string;
+  error?: string;
+  time_to_first_token_ms?: number;
+  total_ms?: number;
+}
+
+export const streamChatMessage = async (
+  userAsk: string,
+  conversationHistory: MessageType[],
+  handlers: StreamHandlers,
+): Promise<string> => {
+  if (!userAsk || !userAsk.trim()) {
+    throw new Error('Message cannot be empty');
+  }
+
+  if (userAsk.length > 1000) {
+    throw new Error('Message is too long. Please limit to 1000 characters.');
+  }
+
+  // Abort if the server goes quiet for 30 seconds; reset whenever data arrives
+  const controller = new AbortController();
+  let timeoutId = setTimeout(() => controller.abort(), 30000);
+  const resetTimeout = () => {
+    clearTimeout(timeoutId);
+    timeoutId = setTimeout(() => controller.abort(), 30000);
+  };
+
+  let response: Response;
+  try {
+    response = await fetch(`${API_BASE_URL}/getBotResponse/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ conversationHistory, userAsk: userAsk.trim() }),
+      signal: controller.signal,
+    });
+  } catch (error) {
+    clearTimeout(timeoutId);
+    if (error instanceof DOMException && error.name === 'AbortError') {
+      throw new Error('Request timeout. The server took too long to respond.');
+    }
+    throw new Error('Cannot connect to server. Please check if the backend is running.');
+  }
+
+  if (!response.ok || !response.body) {
+    clearTimeout(timeoutId);
+    throw new Error('Server error occurred');
+  }
+
+  // The server sends newline-delimited JSON events; a read may end mid-line
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let fullText = '';
+
+  const handleEvent = (event: StreamEvent): string | null => {
+    switch (event.type) {
+      case 'token':
+        fullText += event.text || '';
+        handlers.onToken(event.text || '');
+        return null;
+      case 'tool_call':
+        handlers.onToolCall?.(event.name || '');
+        return null;
+      case 'done':
+        console.debug(
+          `FinBot stream: first token ${event.time_to_first_token_ms}ms, total ${event.total_ms}ms`,
+        );
+        return event.response || fullText;
+      case 'error':
+        throw new Error(event.error || 'Failed to get response');
+      default:
+        return null;
+    }
+  };
+
+  try {
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      resetTimeout();
+      buffer += decoder.decode(value, { stream: true });
+
+      let newlineIndex = buffer.indexOf('\n');
+      while (newlineIndex >= 0) {
+        const line = buffer.slice(0, newlineIndex).trim();
+        buffer = buffer.slice(newlineIndex + 1);
+        if (line) {
+          const result = handleEvent(JSON.parse(line) as StreamEvent);
+          if (result !== null) return result;
+        }
+        newlineIndex = buffer.indexOf('\n');
+      }
+    }
+  } catch (error) {
+    if (error instanceof DOMException && error.name === 'AbortError') {
+      throw new Error('Request timeout. The server took too long to respond.');
+    }
+    throw error;
+  } finally {
+    clearTimeout(timeoutId);
+  }
+
+  if (!fullText) {
+    throw new Error('Failed to get response');
+  }
+  return fullText;
+};
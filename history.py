@@ -0,0 +1,137 @@
+import hashlib
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+from cache import TTLCache
+from models import MessageType
+from payloads import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# tiktoken is optional; without it token counts fall back to a character-based estimate.
+# The encoding is loaded on first use since building it slows worker startup.
+_encoding = None
+_encoding_loaded = False
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+Summarizer = Callable[[str, List[MessageType]], Awaitable[str]]
+
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens locally"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = None
+        _encoding_loaded = True
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return estimate_tokens(text)
+
+
+def message_tokens(message: MessageType) -> int:
+    return count_tokens(message.text) + MESSAGE_OVERHEAD_TOKENS
+
+
+def to_chat_message(message: MessageType) -> Dict:
+    return {"role": "user" if message.isUser else "assistant", "content": message.text}
+
+
+def fallback_summary(previous_summary: str, messages: List[MessageType], max_chars: int = 200) -> str:
+    """Extractive summary used when the summarizer is unavailable: truncated turns appended to the summary"""
+    lines = [previous_summary] if previous_summary else []
+    for message in messages:
+        speaker = "User" if message.isUser else "Assistant"
+        text = " ".join(message.text.split())
+        lines.append(f"- {speaker}: {text[:max_chars]}{'...' if len(text) > max_chars else ''}")
+    return "\n".join(lines)
+
+
+class HistoryManager:
+    """
+    Fits conversation history into a token budget.
+
+    The newest turns are kept verbatim while they fit in `budget_tokens`. Older turns are
+    folded into a rolling summary. The summary boundary advances in steps of `chunk_size`
+    messages (rounded towards the newest turns, so the verbatim tail stays within budget)
+    and every summary is cached under a hash of the prefix it covers. Each request extends
+    the longest cached summary with all of its newer folded turns in a single call.
+    """
+
+    def __init__(
+        self,
+        summarize: Summarizer,
+        budget_tokens: int = 3000,
+        chunk_size: int = 6,
+        cache: Optional[TTLCache] = None,
+    ):
+        self.summarize = summarize
+        self.budget_tokens = budget_tokens
+        self.chunk_size = max(1, chunk_size)
+        self.cache = cache or TTLCache(max_entries=1024, ttl_seconds=3600)
+
+    def _split_point(self, history: List[MessageType]) -> int:
+        """Index of the oldest message kept verbatim, rounded up to a chunk boundary"""
+        used = 0
+        split = len(history)
+        while split > 0:
+            cost = message_tokens(history[split - 1])
+            if used + cost > self.budget_tokens:
+                break
+            used += cost
+            split -= 1
+        if split == 0:
+            return 0
+        # Rounding up keeps the verbatim tail within budget; near the end of the history
+        # the boundary stays mid-chunk rather than dropping every verbatim turn
+        rounded = -(-split // self.chunk_size) * self.chunk_size
+        return rounded if rounded < len(history) else split
+
+    @staticmethod
+    def _prefix_hashes(history: List[MessageType], count: int) -> List[str]:
+        """Chained hashes: entry j identifies the prefix history[:j]"""
+        hashes = [""]
+        digest = ""
+        for message in history[:count]:
+            digest = hashlib.sha256(
+                f"{digest}|{int(message.isUser)}|{message.text}".encode()
+            ).hexdigest()
+            hashes.append(digest)
+        return hashes
+
+    async def build(self, history: List[MessageType]) -> List[Dict]:
+        """Return chat messages for the history: an optional summary message plus recent turns"""
+        if not history:
+            return []
+        split = self._split_point(history)
+        recent = [to_chat_message(message) for message in history[split:]]
+        if split == 0:
+            return recent
+
+        hashes = self._prefix_hashes(history, split)
+        summary = self.cache.get(hashes[split])
+        if summary is None:
+            # Extend the longest already-summarized prefix with every newer folded turn at once
+            covered, previous = 0, ""
+            for boundary in range(split - 1, 0, -1):
+                cached = self.cache.get(hashes[boundary])
+                if cached is not None:
+                    covered, previous = boundary, cached
+                    break
+
+            folded = history[covered:split]
+            try:
+                summary = await self.summarize(previous, folded)
+            except Exception as e:
+                logger.warning(f"History summarization failed, using extractive summary: {e}")
+                summary = fallback_summary(previous, folded)
+            self.cache.put(hashes[split], summary)
+            logger.info(f"Folded {split} older messages into summary ({count_tokens(summary)} tokens)")
+
+        return [{"role": "system", "content": SUMMARY_PREFIX + summary}] + recent
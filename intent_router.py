@@ -0,0 +1,335 @@
+"""
+Deterministic fast path for simple lookups.
+
+A rule-based router recognizes a time window, an optional category or merchant and a
+metric in queries like "total spent this week" or "show groceries last 30 days" and
+answers them directly from the data layer. Anything it is not confident about returns
+None and falls through to the LLM.
+"""
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional, Tuple
+from charts import chart_block
+from data import (
+    DEFAULT_CUSTOMER_ID,
+    TRANSACTION_CATEGORIES,
+    filter_transactions,
+    get_income_vs_expense,
+    get_spending_by_category,
+    get_spending_by_merchant,
+    get_spending_over_time
+)
+
+# Maximum rows listed in a fast-path table before truncating
+MAX_LISTED_TRANSACTIONS = 20
+
+CATEGORY_ALIASES = {
+    "grocery": "Groceries", "groceries": "Groceries",
+    "utility": "Utilities", "utilities": "Utilities", "bills": "Utilities",
+    "entertainment": "Entertainment", "movies": "Entertainment",
+    "transport": "Transport", "transportation": "Transport", "travel": "Transport", "commute": "Transport",
+    "dining": "Dining", "restaurants": "Dining", "eating out": "Dining", "food delivery": "Dining",
+    "shopping": "Shopping",
+    "healthcare": "Healthcare", "health": "Healthcare", "medical": "Healthcare", "pharmacy": "Healthcare",
+    "subscriptions": "Subscriptions", "subscription": "Subscriptions",
+    "rent": "Rent",
+    "salary": "Salary",
+}
+
+MERCHANT_NAMES = {
+    merchant.lower(): merchant
+    for template in TRANSACTION_CATEGORIES.values()
+    for merchant in template["merchants"]
+}
+
+# Words that signal analysis, advice or comparisons the fast path should not attempt
+COMPLEX_MARKERS = re.compile(
+    r"\b(why|compare|comparison|versus|should|advice|advise|recommend|suggest|unusual|anomal\w*|"
+    r"predict|forecast|average|median|save more|budget|reduce|cut|explain|percent|increase|decrease|"
+    r"more than|less than|than|except|excluding|between|and|or|"
+    r"largest|biggest|highest|smallest|lowest|most|least|top|cheapest|costliest|priciest|expensive)\b"
+)
+
+# Every category alias and merchant name, longest first, to strip resolved names from a query
+KNOWN_NAMES = re.compile(
+    r"\b(?:" + "|".join(
+        re.escape(name) for name in sorted({**CATEGORY_ALIASES, **MERCHANT_NAMES}, key=len, reverse=True)
+    ) + r")\b"
+)
+
+# "on/at/for/in/by/from <object>" and "<modifier> transactions" name a payee, item, place
+# or person; once known names are stripped, anything but these words is left unresolved
+OBJECT_PATTERN = re.compile(r"\b(?:on|at|for|in|by|from)\s+(?:(?:my|the|a|an|all)\s+)*(\w+)")
+OBJECT_WORDS = {
+    "this", "last", "past", "previous", "current", "today", "yesterday", "ytd", "total",
+    "day", "week", "month", "year", "category",
+}
+MODIFIER_PATTERN = re.compile(r"\b(\w+)\s+(?:transactions|payments|expenses|purchases|orders|rides|spending)\b")
+MODIFIER_WORDS = {
+    "show", "list", "display", "get", "view", "me", "my", "all", "the", "i", "of", "and", "vs",
+    "total", "recent", "latest", "daily", "weekly", "monthly",
+}
+
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "thirty": 30}
+
+WINDOW_PATTERN = re.compile(
+    r"\b(?:last|past|previous)\s+(\d+|" + "|".join(NUMBER_WORDS) + r")\s+(day|week|month)s?\b"
+)
+
+
+class Intent(NamedTuple):
+    metric: str
+    start_date: str
+    end_date: str
+    window_label: str
+    category: Optional[str] = None
+    merchant: Optional[str] = None
+    chart: bool = False
+    granularity: str = "month"
+
+
+def _fmt(day: datetime) -> str:
+    return day.strftime("%Y-%m-%d")
+
+
+def parse_window(query: str, today: datetime) -> Optional[Tuple[str, str, str]]:
+    """Recognize a time window; returns (start_date, end_date, label) or None"""
+    match = WINDOW_PATTERN.search(query)
+    if match:
+        count = match.group(1)
+        count = int(count) if count.isdigit() else NUMBER_WORDS[count]
+        unit = match.group(2)
+        days = count * {"day": 1, "week": 7, "month": 30}[unit]
+        return _fmt(today - timedelta(days=days)), _fmt(today), f"the last {count} {unit}{'s' if count != 1 else ''}"
+
+    if re.search(r"\btoday\b", query):
+        return _fmt(today), _fmt(today), "today"
+    if re.search(r"\byesterday\b", query):
+        yesterday = today - timedelta(days=1)
+        return _fmt(yesterday), _fmt(yesterday), "yesterday"
+    if re.search(r"\b(this|current)\s+week\b", query):
+        return _fmt(today - timedelta(days=today.weekday())), _fmt(today), "this week"
+    if re.search(r"\b(last|previous)\s+week\b", query):
+        start = today - timedelta(days=today.weekday() + 7)
+        return _fmt(start), _fmt(start + timedelta(days=6)), "last week"
+    if re.search(r"\b(this|current)\s+month\b", query):
+        return _fmt(today.replace(day=1)), _fmt(today), "this month"
+    if re.search(r"\b(last|previous)\s+month\b", query):
+        end = today.replace(day=1) - timedelta(days=1)
+        return _fmt(end.replace(day=1)), _fmt(end), "last month"
+    if re.search(r"\b(this|current)\s+year\b|\byear to date\b|\bytd\b", query):
+        return _fmt(today.replace(month=1, day=1)), _fmt(today), "this year"
+    return None
+
+
+def _find_alias(query: str, aliases: Dict[str, str]) -> Optional[str]:
+    # Prefer the longest alias so "food delivery" wins over shorter overlaps
+    for alias in sorted(aliases, key=len, reverse=True):
+        if re.search(r"\b" + re.escape(alias) + r"\b", query):
+            return aliases[alias]
+    return None
+
+
+def has_unresolved_subject(query: str) -> bool:
+    """True when the query names a payee, item, place or person that is not a known category or merchant"""
+    # The placeholder is not a word, so "on <name>" and "<name> transactions" never match
+    remainder = KNOWN_NAMES.sub("<name>", query)
+    if any(match.group(1) not in OBJECT_WORDS for match in OBJECT_PATTERN.finditer(remainder)):
+        return True
+    return any(match.group(1) not in MODIFIER_WORDS for match in MODIFIER_PATTERN.finditer(remainder))
+
+
+def parse_metric(query: str) -> Optional[Tuple[str, bool, str]]:
+    """Recognize what is being asked; returns (metric, wants_chart, granularity) or None"""
+    chart = bool(re.search(r"\b(chart|graph|plot|pie|visuali[sz]e)\b", query))
+    if re.search(r"\bincome (vs\.?|and) (expenses?|spending)\b|\bnet savings\b|\bsavings rate\b", query):
+        return "income_vs_expense", chart, "month"
+    over_time = re.search(
+        r"\b(?:by|per) (day|week|month)\b|\b(daily|weekly|monthly) (?:spending|expenses|totals?)\b", query
+    )
+    if over_time:
+        unit = over_time.group(1) or over_time.group(2)
+        return "spending_over_time", chart, {"daily": "day", "weekly": "week", "monthly": "month"}.get(unit, unit)
+    if re.search(r"\b(by|per) category\b|\bbreakdown\b|\bbreak down\b|\bwhere did my money go\b|\bcategories\b", query):
+        return "category_breakdown", chart, "month"
+    if re.search(r"\b(how much|total|sum)\b.*\b(earn|earned|income|received|salary)\b|\b(total )?income\b", query):
+        return "income_total", chart, "month"
+    if re.search(r"\b(how much|total|sum)\b.*\b(spend|spent|spending|expenses?|pay|paid)\b|\btotal (spend|spent|spending|expenses?)\b", query):
+        return "spend_total", chart, "month"
+    if re.search(r"^(show|list|display|get|view)\b|\b(show|list) (me )?(my )?(all )?(the )?(transactions|payments|expenses)\b", query):
+        return "list", chart, "month"
+    return None
+
+
+class IntentRouter:
+    """Rule-based intent router with hit-rate counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.routed = 0
+
+    def classify(self, query: str, today: Optional[datetime] = None) -> Optional[Intent]:
+        """Return an Intent when the query is a simple lookup we can answer confidently, else None"""
+        text = " ".join(query.lower().split()).rstrip("?!. ")
+        if not text or len(text.split()) > 14:
+            return None
+
+        today = today or datetime.now()
+        window = parse_window(text, today)
+        metric = parse_metric(text)
+        if window is None or metric is None:
+            return None
+
+        # Strip the recognized window before checking for complex phrasing ("last 3 months and ...")
+        remainder = WINDOW_PATTERN.sub(" ", text)
+        if COMPLEX_MARKERS.search(remainder) and metric[0] != "income_vs_expense":
+            return None
+
+        # "spend on Netflix" must not be answered as total spend when Netflix is not a known merchant
+        if has_unresolved_subject(text):
+            return None
+
+        category = _find_alias(text, CATEGORY_ALIASES)
+        merchant = _find_alias(text, MERCHANT_NAMES)
+        if category and merchant:
+            return None
+        if metric[0] in ("category_breakdown", "spending_over_time", "income_vs_expense") and (category or merchant):
+            return None
+
+        start_date, end_date, label = window
+        return Intent(metric[0], start_date, end_date, label, category, merchant, metric[1], metric[2])
+
+    def route(self, query: str, customer_id: str = DEFAULT_CUSTOMER_ID) -> Optional[Dict]:
+        """Answer the query from data if confident; returns a process_query-style result or None"""
+        intent = self.classify(query)
+        with self._lock:
+            self.total += 1
+            if intent is not None:
+                self.routed += 1
+        if intent is None:
+            return None
+        return {
+            "response": answer_intent(intent, customer_id),
+            "metadata": {"route": "fast_path", "intent": intent.metric}
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "queries": self.total,
+                "routed": self.routed,
+                "hit_rate": round(self.routed / self.total, 3) if self.total else 0.0,
+            }
+
+
+def _money(value: float) -> str:
+    return f"{'-' if value < 0 else ''}₹{abs(value):,.2f}"
+
+
+def _chart(chart_type: str, title: str, labels, label: str, data, insights) -> Dict:
+    """A single-dataset chart_request, rendered with the same block as LLM-built charts"""
+    return {
+        "chart_type": chart_type,
+        "title": title,
+        "labels": labels,
+        "datasets": [{"label": label, "data": data}],
+        "insights": insights,
+    }
+
+
+def answer_intent(intent: Intent, customer_id: str = DEFAULT_CUSTOMER_ID) -> str:
+    """Build a markdown answer (with a chart_request block when relevant) for an Intent"""
+    period = f"{intent.window_label} ({intent.start_date} to {intent.end_date})"
+
+    if intent.metric == "spend_total":
+        if intent.merchant:
+            result = get_spending_by_merchant(intent.start_date, intent.end_date, customer_id=customer_id)
+            entry = next((m for m in result["merchants"] if m["merchant"] == intent.merchant), None)
+            total, count = (entry["total"], entry["count"]) if entry else (0.0, 0)
+            return f"You spent **{_money(total)}** at {intent.merchant} across {count} transactions during {period}."
+        result = get_spending_by_category(intent.start_date, intent.end_date, customer_id)
+        if intent.category:
+            entry = next((c for c in result["categories"] if c["category"] == intent.category), None)
+            total, count = (entry["total"], entry["count"]) if entry else (0.0, 0)
+            return f"You spent **{_money(total)}** on {intent.category} across {count} transactions during {period}."
+        count = sum(c["count"] for c in result["categories"])
+        return f"You spent **{_money(result['total_spent'])}** across {count} transactions during {period}."
+
+    if intent.metric == "income_total":
+        result = get_income_vs_expense(intent.start_date, intent.end_date, customer_id)
+        return f"Your total income was **{_money(result['income'])}** from {result['income_count']} credits during {period}."
+
+    if intent.metric == "income_vs_expense":
+        result = get_income_vs_expense(intent.start_date, intent.end_date, customer_id)
+        text = (
+            f"**Income vs. expenses for {period}**\n\n"
+            f"| Income | Expenses | Net | Savings rate |\n|---|---|---|---|\n"
+            f"| {_money(result['income'])} | {_money(result['expenses'])} | {_money(result['net'])} "
+            f"| {result['savings_rate_pct']}% |"
+        )
+        if intent.chart:
+            text += "\n\n" + chart_block(_chart(
+                "bar", f"Income vs. Expenses ({intent.window_label})", ["Income", "Expenses"], "Amount (₹)",
+                [result["income"], result["expenses"]], [f"Net: {_money(result['net'])}"]
+            ))
+        return text
+
+    if intent.metric == "category_breakdown":
+        result = get_spending_by_category(intent.start_date, intent.end_date, customer_id)
+        if not result["categories"]:
+            return f"No spending found for {period}."
+        rows = "\n".join(
+            f"| {c['category']} | {_money(c['total'])} | {c['count']} | {c['share_pct']}% |"
+            for c in result["categories"]
+        )
+        top = result["categories"][0]
+        text = (
+            f"**Spending by category for {period}** — total {_money(result['total_spent'])}\n\n"
+            f"| Category | Total | Transactions | Share |\n|---|---|---|---|\n{rows}"
+        )
+        if intent.chart:
+            text += "\n\n" + chart_block(_chart(
+                "pie", f"Spending by Category ({intent.window_label})",
+                [c["category"] for c in result["categories"]], "Spent (₹)",
+                [c["total"] for c in result["categories"]],
+                [f"{top['category']} is the largest category at {top['share_pct']}% of spending"]
+            ))
+        return text
+
+    if intent.metric == "spending_over_time":
+        granularity = intent.granularity
+        result = get_spending_over_time(intent.start_date, intent.end_date, granularity, customer_id)
+        if not result["periods"]:
+            return f"No transactions found for {period}."
+        rows = "\n".join(f"| {p['period']} | {_money(p['spent'])} | {_money(p['income'])} |" for p in result["periods"])
+        text = f"**Spending per {granularity} for {period}**\n\n| Period | Spent | Income |\n|---|---|---|\n{rows}"
+        if intent.chart:
+            text += "\n\n" + chart_block(_chart(
+                "bar", f"Spending per {granularity.title()} ({intent.window_label})",
+                [p["period"] for p in result["periods"]], "Spent (₹)",
+                [p["spent"] for p in result["periods"]], []
+            ))
+        return text
+
+    # list
+    transactions = filter_transactions(
+        intent.start_date, intent.end_date, intent.category, intent.merchant, customer_id
+    )
+    subject = intent.category or intent.merchant or "all"
+    if not transactions:
+        return f"No {subject} transactions found for {period}."
+    shown = transactions[-MAX_LISTED_TRANSACTIONS:][::-1]
+    rows = "\n".join(
+        f"| {t.date} | {t.merchant} | {t.category} | {_money(t.amount)} |" for t in shown
+    )
+    total = sum(-t.amount for t in transactions if t.amount < 0)
+    header = f"**{subject.title() if subject == 'all' else subject} transactions for {period}** — {len(transactions)} transactions"
+    if len(transactions) > len(shown):
+        header += f", showing the latest {len(shown)}"
+    return f"{header}\n\n| Date | Merchant | Category | Amount |\n|---|---|---|---|\n{rows}\n\nTotal spent: **{_money(total)}**"
+
+
+router = IntentRouter()
@@ -1,11 +1,35 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from models import BotRequest
-from ai_service import process_query
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from models import BatchRequest, BotRequest, IngestRequest
+from ai_service import (
+    process_query,
+    process_batch,
+    stream_query,
+    close_client,
+    preload_openai,
+    get_tool_cache_stats,
+    get_response_cache_stats,
+    get_fast_path_stats,
+    get_coalescing_stats
+)
+from data import get_dataset_cache_stats, ingest_transactions
+from admission import AdmissionController, AdmissionRejected
+from config import (
+    ADMISSION_CONTROL_ENABLED,
+    CHAT_MAX_CONCURRENT,
+    CHAT_MAX_QUEUE,
+    CHAT_MAX_QUEUE_WAIT_SECONDS,
+    CHAT_MAX_PER_CLIENT,
+    BATCH_MAX_CONCURRENCY
+)
+import metrics
+import asyncio
+import json
 import os
 import logging
+import time
 
 # Configure logging
 logging.basicConfig(
@@ -14,6 +38,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Worker readiness: set once startup warm-up (data load, SDK import) has finished
+_started_at = time.monotonic()
+_ready_after_ms = None
+_warm_up_task = None
+
+# Bounds concurrent chat work so overload is turned away early instead of slowing every request
+_admission = (
+    AdmissionController(CHAT_MAX_CONCURRENT, CHAT_MAX_QUEUE, CHAT_MAX_QUEUE_WAIT_SECONDS, CHAT_MAX_PER_CLIENT)
+    if ADMISSION_CONTROL_ENABLED else None
+)
+
 app = FastAPI(
     title="FinBot - Intelligent Financial Assistant",
     description="AI-powered financial chatbot for transaction analysis and insights",
@@ -30,9 +65,76 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    # Count requests and time them until the response starts, labelled by route template
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        metrics.HTTP_REQUESTS.inc(method=request.method, route=route_path, status=status)
+        metrics.HTTP_DURATION.observe(time.perf_counter() - started, method=request.method, route=route_path)
+
+
+def _client_id(http_request: Request) -> str:
+    # Clients may identify themselves; otherwise requests are grouped by remote address
+    client_id = http_request.headers.get("x-client-id")
+    if client_id:
+        return client_id[:128]
+    return http_request.client.host if http_request.client else "unknown"
+
+
+def _retry_later(status_code: int, error: str, retry_after: int) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"success": False, "error": error},
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+async def _admit(http_request: Request, slots: int = 1):
+    """Admission slots for a chat request (None when admission control is off)"""
+    if _admission is None:
+        return None
+    return await _admission.acquire(_client_id(http_request), slots)
+
+
+def _rejected(rejection: AdmissionRejected) -> JSONResponse:
+    logger.warning(f"Chat request rejected ({rejection.reason}), retry after {rejection.retry_after}s")
+    if rejection.status_code == 429:
+        error = "Too many requests in progress for this client. Please try again shortly."
+    else:
+        error = "The service is busy. Please try again shortly."
+    return _retry_later(rejection.status_code, error, rejection.retry_after)
+
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """Releases the admission slot once the response is over, even if the client disconnected"""
+
+    def __init__(self, admission, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.admission is not None:
+                self.admission.release()
+
+
 @app.post("/getBotResponse")
-async def handle_chat_request(request: BotRequest):
+async def handle_chat_request(request: BotRequest, http_request: Request):
     # Processes user queries and returns AI-generated responses
+    try:
+        admission = await _admit(http_request)
+    except AdmissionRejected as rejection:
+        return _rejected(rejection)
     try:
         # Validate input
         user_query = request.userAsk.strip()
@@ -45,29 +147,157 @@ async def handle_chat_request(request: BotRequest):
             logger.warning(f"Query too long: {len(user_query)} characters")
             return {"success": False, "error": "Query is too long. Please limit to 1000 characters."}
         
-        logger.info(f"Processing query: {user_query[:50]}...")
+        logger.info(f"Processing query for {request.customerId}: {user_query[:50]}...")
         
         # Process the query using AI service with conversation history
-        result = await process_query(user_query, request.conversationHistory)
+        result = await process_query(
+            user_query, request.conversationHistory, request.bypassCache, request.customerId, request.debugTiming
+        )
         
         if not result or "response" not in result:
             logger.error("Invalid result from process_query")
             return {"success": False, "error": "Failed to process query"}
         
+        # The OpenAI API is rate limiting us; pass its backoff on to the client
+        retry_after = result.get("metadata", {}).get("retry_after")
+        if retry_after is not None:
+            return _retry_later(503, result["response"], retry_after)
+        
         return {
             "success": True,
-            "response": result["response"]
+            "response": result["response"],
+            "metadata": result.get("metadata", {})
         }
         
     except Exception as e:
         logger.error(f"Error in handle_chat_request: {e}", exc_info=True)
         return {"success": False, "error": f"Error processing request: {str(e)}"}
+    finally:
+        if admission is not None:
+            admission.release()
+
+
+@app.post("/getBotResponse/stream")
+async def handle_chat_stream_request(request: BotRequest, http_request: Request):
+    # Streams tool-call progress and the answer as newline-delimited JSON events
+    user_query = request.userAsk.strip()
+    if not user_query:
+        logger.warning("Received whitespace-only query")
+        return {"success": False, "error": "Query cannot be empty"}
+    
+    # Admitted before the stream starts, so overload still gets a status code; the slot
+    # is held until the last event has been sent
+    try:
+        admission = await _admit(http_request)
+    except AdmissionRejected as rejection:
+        return _rejected(rejection)
+    
+    logger.info(f"Streaming query: {user_query[:50]}...")
+    
+    async def event_stream():
+        async for event in stream_query(
+            user_query, request.conversationHistory, request.bypassCache, request.customerId, request.debugTiming
+        ):
+            if event["type"] == "done":
+                logger.info(
+                    f"Stream finished: ttft={event['time_to_first_token_ms']}ms total={event['total_ms']}ms"
+                )
+            yield json.dumps(event) + "\n"
+    
+    return _AdmittedStreamingResponse(admission, event_stream(), media_type="application/x-ndjson")
+
+
+@app.post("/getBotResponse/batch")
+async def handle_batch_request(request: BatchRequest, http_request: Request):
+    # Answers many queries with bounded concurrency, streaming NDJSON results as items finish.
+    # Each concurrently answered item holds an admission slot, so the batch runs at the
+    # concurrency it was admitted for.
+    concurrency = min(len(request.items), request.concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    try:
+        admission = await _admit(http_request, concurrency)
+    except AdmissionRejected as rejection:
+        return _rejected(rejection)
+    if admission is not None:
+        concurrency = admission.slots
+    
+    logger.info(f"Processing batch of {len(request.items)} queries (concurrency {concurrency})")
+    
+    async def event_stream():
+        async for event in process_batch(request.items, concurrency):
+            if event["type"] == "done":
+                logger.info(
+                    f"Batch finished: {event['succeeded']}/{event['items']} succeeded in {event['total_ms']}ms"
+                )
+            yield json.dumps(event) + "\n"
+    
+    return _AdmittedStreamingResponse(admission, event_stream(), media_type="application/x-ndjson")
+
+
+@app.post("/ingestTransactions")
+async def handle_ingest_request(request: IngestRequest):
+    # Appends a batch of new transactions to a customer's ledger
+    try:
+        result = await asyncio.to_thread(ingest_transactions, request.transactions, request.customerId)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(
+        f"Ingested {result['ingested']} transactions for {request.customerId} "
+        f"(data version {result['data_version']})"
+    )
+    return {"success": True, **result}
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "FinBot"}
+    return {
+        "status": "healthy",
+        "service": "FinBot",
+        "ready": _ready_after_ms is not None,
+        "tool_cache": get_tool_cache_stats(),
+        "response_cache": get_response_cache_stats(),
+        "fast_path": get_fast_path_stats(),
+        "coalescing": get_coalescing_stats(),
+        "admission": _admission.stats() if _admission is not None else {"enabled": False},
+        "datasets": get_dataset_cache_stats()
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics: HTTP, admission, chat path, model call, token and tool timings"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving HTTP"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: startup warm-up has finished, so requests are served at full speed"""
+    if _ready_after_ms is None:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready", "ready_after_ms": _ready_after_ms}
+
+
+def _warm_up():
+    from data import initialize_data
+    initialize_data()
+    preload_openai()
+
+
+async def _warm_up_in_background():
+    global _ready_after_ms
+    try:
+        await asyncio.to_thread(_warm_up)
+    except Exception as e:
+        logger.error(f"Startup warm-up failed: {e}", exc_info=True)
+        return
+    _ready_after_ms = round((time.monotonic() - _started_at) * 1000, 1)
+    logger.info(f"FinBot ready after {_ready_after_ms}ms")
 
 
 @app.on_event("startup")
@@ -80,11 +310,18 @@ async def startup_event():
     else:
         logger.info("OpenAI API key configured")
     
-    # Initialize transaction data once at startup
-    logger.info("Initializing transaction data...")
-    from data import initialize_data
-    initialize_data()
-    logger.info("Transaction data initialized successfully")
+    # Load transaction data (from a snapshot when available) and import the OpenAI SDK
+    # in the background; /health/live answers immediately, /health/ready once this is done
+    global _warm_up_task
+    logger.info("Warming up transaction data...")
+    _warm_up_task = asyncio.get_running_loop().create_task(_warm_up_in_background())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Release pooled OpenAI connections
+    await close_client()
+    logger.info("FinBot API stopped")
 
 
 if __name__ == "__main__":
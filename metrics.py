@@ -0,0 +1,233 @@
+"""
+In-process metrics in the Prometheus text exposition format, plus per-request timing traces.
+
+Counters and histograms are labelled and thread-safe (tools record from executor
+threads). `render()` produces the body served by GET /metrics.
+"""
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond tool calls to slow model calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+COUNT_BUCKETS = (1, 2, 3, 4, 5)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    bucket = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(round(series[-2], 6))}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+_REGISTRY: List[_Metric] = []
+
+
+def _register(metric):
+    _REGISTRY.append(metric)
+    return metric
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text format"""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUESTS = _register(Counter(
+    "finbot_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+HTTP_DURATION = _register(Histogram(
+    "finbot_http_request_duration_seconds", "HTTP request latency until the response starts", ("method", "route")
+))
+CHAT_REQUESTS = _register(Counter(
+    "finbot_chat_requests_total", "Chat requests by how they were answered", ("path",)
+))
+CHAT_DURATION = _register(Histogram(
+    "finbot_chat_duration_seconds", "End-to-end chat latency by answer path", ("path",)
+))
+CHAT_COALESCED = _register(Counter(
+    "finbot_chat_coalesced_total", "Chat requests answered by joining an identical in-flight request", ("endpoint",)
+))
+ADMISSION_ACTIVE = _register(Gauge(
+    "finbot_admission_active", "Chat requests currently admitted and running"
+))
+ADMISSION_QUEUE_DEPTH = _register(Gauge(
+    "finbot_admission_queue_depth", "Chat requests waiting for an admission slot"
+))
+ADMISSION_WAIT = _register(Histogram(
+    "finbot_admission_wait_seconds", "Time admitted chat requests spent queued"
+))
+ADMISSION_REJECTIONS = _register(Counter(
+    "finbot_admission_rejections_total", "Chat requests turned away by admission control", ("reason",)
+))
+TOOL_LOOP_ITERATIONS = _register(Histogram(
+    "finbot_tool_loop_iterations", "Model calls per chat answered by the LLM", buckets=COUNT_BUCKETS
+))
+LLM_DURATION = _register(Histogram(
+    "finbot_llm_call_duration_seconds", "Chat completion latency (until the stream is fully read when streaming)",
+    ("model", "stream")
+))
+LLM_TOKENS = _register(Counter(
+    "finbot_llm_tokens_total", "Prompt and completion tokens reported by the API", ("model", "kind")
+))
+LLM_ERRORS = _register(Counter(
+    "finbot_llm_errors_total", "Failed chat completion calls", ("model", "error")
+))
+TOOL_CALLS = _register(Counter(
+    "finbot_tool_calls_total", "Tool executions by outcome", ("tool", "outcome")
+))
+TOOL_DURATION = _register(Histogram(
+    "finbot_tool_duration_seconds", "Tool execution time including serialization", ("tool", "cached")
+))
+TOOL_PAYLOAD_BYTES = _register(Histogram(
+    "finbot_tool_payload_bytes", "Size of serialized tool results", ("tool",), buckets=BYTES_BUCKETS
+))
+
+
+class RequestTrace:
+    """
+    Timing spans for one chat request: each model call (latency, tokens, tools requested)
+    and each tool execution (latency, payload bytes) of the tool loop.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.iterations = 0
+        self.spans: List[Dict] = []
+
+    def llm_call(self, elapsed: float, usage=None, tool_calls: Optional[List[str]] = None) -> None:
+        self.iterations += 1
+        span = {"span": "llm", "iteration": self.iterations, "ms": round(elapsed * 1000, 1)}
+        if usage is not None:
+            span["prompt_tokens"] = usage.prompt_tokens
+            span["completion_tokens"] = usage.completion_tokens
+        if tool_calls:
+            span["tool_calls"] = tool_calls
+        self.spans.append(span)
+
+    def tool_call(self, name: str, elapsed: float, payload_bytes: int) -> None:
+        self.spans.append({
+            "span": "tool",
+            "iteration": self.iterations,
+            "tool": name,
+            "ms": round(elapsed * 1000, 1),
+            "payload_bytes": payload_bytes,
+        })
+
+    def finish(self, path: str) -> Dict:
+        """Record the request in the chat metrics and return its timing summary"""
+        total = time.perf_counter() - self.started
+        CHAT_REQUESTS.inc(path=path)
+        CHAT_DURATION.observe(total, path=path)
+        if self.iterations:
+            TOOL_LOOP_ITERATIONS.observe(self.iterations)
+        return {
+            "path": path,
+            "total_ms": round(total * 1000, 1),
+            "iterations": self.iterations,
+            "llm_ms": round(sum(s["ms"] for s in self.spans if s["span"] == "llm"), 1),
+            "tool_ms": round(sum(s["ms"] for s in self.spans if s["span"] == "tool"), 1),
+            "spans": self.spans,
+        }
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Literal, Optional
 from datetime import datetime
+from config import BATCH_MAX_ITEMS
 
 
 class Customer(BaseModel):
@@ -43,6 +44,36 @@ class Transaction(BaseModel):
         return v
 
 
+class NewTransaction(BaseModel):
+    """A transaction to ingest; its ID and running balance are assigned by the ledger"""
+    date: str
+    description: Optional[str] = Field(default=None, min_length=1, max_length=500)
+    amount: float = Field(..., description="Negative for debits, positive for credits")
+    category: str = Field(..., min_length=1, max_length=100)
+    transaction_type: Literal["debit", "credit", "transfer"]
+    merchant: str = Field(..., min_length=1, max_length=200)
+    payment_method: str = Field(..., min_length=1, max_length=50)
+
+    @field_validator('date')
+    @classmethod
+    def validate_date(cls, v: str) -> str:
+        try:
+            datetime.strptime(v, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError("Date must be in YYYY-MM-DD format")
+        return v
+
+    @model_validator(mode="after")
+    def validate_amount_sign(self):
+        if self.amount == 0:
+            raise ValueError("Amount must be non-zero")
+        if self.transaction_type == "debit" and self.amount > 0:
+            raise ValueError("Debit amounts must be negative")
+        if self.transaction_type == "credit" and self.amount < 0:
+            raise ValueError("Credit amounts must be positive")
+        return self
+
+
 class MessageType(BaseModel):
     text: str
     isUser: bool
@@ -51,4 +82,17 @@ class MessageType(BaseModel):
 
 class BotRequest(BaseModel):
     userAsk: str = Field(..., min_length=1, max_length=1000, description="User query")
-    conversationHistory: List[MessageType] = Field(default_factory=list, max_length=100)
\ No newline at end of file
+    conversationHistory: List[MessageType] = Field(default_factory=list, max_length=100)
+    customerId: str = Field(default="CUST001", pattern=r"^CUST\d{3,}$", description="Customer whose data the tools query")
+    bypassCache: bool = Field(default=False, description="Skip the response cache for this request")
+    debugTiming: bool = Field(default=False, description="Include per-request timing spans in the response metadata")
+
+
+class BatchRequest(BaseModel):
+    items: List[BotRequest] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    concurrency: Optional[int] = Field(default=None, ge=1, description="Items answered at once (capped by BATCH_MAX_CONCURRENCY)")
+
+
+class IngestRequest(BaseModel):
+    customerId: str = Field(default="CUST001", pattern=r"^CUST\d{3,}$", description="Customer whose ledger receives the batch")
+    transactions: List[NewTransaction] = Field(..., min_length=1, max_length=10000)
@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+from typing import Any, Dict
+from store import TransactionSlice
+
+# orjson is optional; fall back to the standard library encoder when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PAYLOAD_FORMATS = ("json", "columnar", "csv")
+
+
+def dumps(value: Any) -> str:
+    """Serialize to compact JSON (no indentation or spaces after separators)"""
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, separators=(",", ":"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt token estimate (~4 characters per token for English/JSON text)"""
+    return (len(text) + 3) // 4
+
+
+def encode_transactions(transactions: TransactionSlice, payload_format: str = "columnar") -> str:
+    """
+    Encode transaction rows for a tool result.
+
+    - json: the original pretty-printed list of objects (every row repeats every field name)
+    - columnar: {"columns": [...], "rows": [[...], ...]} with a single header
+    - csv: a header line followed by one comma-separated line per row
+    """
+    if payload_format == "json":
+        return json.dumps([t.model_dump() for t in transactions], indent=2)
+
+    columns = transactions.to_columns()
+    names = list(columns)
+    rows = [list(row) for row in zip(*columns.values())]
+
+    if payload_format == "columnar":
+        return dumps({"format": "columnar", "count": len(rows), "columns": names, "rows": rows})
+    if payload_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(names)
+        writer.writerows(rows)
+        return buffer.getvalue()
+    raise ValueError(f"Unknown payload format: {payload_format}")
+
+
+def payload_stats(payload: str) -> Dict[str, int]:
+    """Size of a serialized payload in bytes and estimated prompt tokens"""
+    return {"bytes": len(payload.encode()), "estimated_tokens": estimate_tokens(payload)}
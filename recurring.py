@@ -0,0 +1,171 @@
+"""
+Recurring-payment detection over a customer's ledger.
+
+Transactions are grouped into candidate series at two levels:
+
+- merchant, direction and amount band (sorted amounts split where one is more than 25%
+  above the previous), for payments to one payee such as a subscription
+- category and direction, for bills that rotate payees or vary in amount, such as rent
+  paid to a landlord or a management company
+
+A candidate is monthly when, in most months from its first to its last, it falls within
+a few days of one day of the month, and those transactions make up most of the group.
+Otherwise it is weekly, fortnightly, quarterly or yearly when its gaps consistently match
+that period. A category series made mostly of transactions already in merchant series
+is dropped; one that adds enough payments replaces the merchant series it contains.
+"""
+import calendar
+from datetime import date
+from typing import Dict, List, Optional
+import numpy as np
+from store import TransactionStore, from_day_number, to_day_number
+
+MIN_OCCURRENCES = 4
+# Neighbouring amounts more than this ratio apart start a new amount band; a merchant
+# series' payments must also stay within MERCHANT_SPREAD of each other
+BAND_RATIO = 1.25
+MERCHANT_SPREAD = 1.5
+# Monthly series: days either side of the usual day of the month, share of months from
+# first to last with a payment, and share of the group's transactions in that window
+DAY_TOLERANCE = 1
+MONTHLY_COVERAGE = 0.6
+MONTHLY_SHARE = 0.5
+# Other cadences: (name, period in days, tolerance in days); most gaps must match
+INTERVAL_CADENCES = (("weekly", 7, 1), ("fortnightly", 14, 2), ("quarterly", 91, 5), ("yearly", 365, 7))
+REGULAR_SHARE = 0.75
+# A category series is kept when this share of its payments is in no merchant series,
+# and then replaces merchant series with this share of their payments inside it
+CATEGORY_NEW_SHARE = 0.25
+CATEGORY_CONTAINS_SHARE = 0.8
+# A series is active when its last payment is within this many periods of the ledger's end
+ACTIVE_PERIODS = 2.5
+_MONTH_DAYS = 30.44
+_EPOCH_DAY = to_day_number("1970-01-01")
+
+
+def detect_recurring(store: TransactionStore) -> List[Dict]:
+    """Recurring series in the ledger, credits first, then by typical amount (largest first)"""
+    if not len(store):
+        return []
+    day = store.day.astype(np.int64)
+    months = (day - _EPOCH_DAY).astype("datetime64[D]").astype("datetime64[M]")
+    columns = {
+        "day": day,
+        "month": months.astype(np.int64),
+        "day_of_month": day - (months.astype("datetime64[D]").astype(np.int64) + _EPOCH_DAY) + 1,
+        "magnitude": np.abs(store.amount),
+        "debit": store.amount < 0,
+    }
+    last_day = int(day[-1])
+    debit = columns["debit"].astype(np.int64)
+
+    # Merchant level: sort by merchant, direction and amount; bands break at large amount steps
+    order = np.lexsort((columns["magnitude"], debit, store.merchant))
+    magnitude = columns["magnitude"][order]
+    breaks = np.ones(len(order), dtype=bool)
+    breaks[1:] = (
+        (store.merchant[order][1:] != store.merchant[order][:-1])
+        | (debit[order][1:] != debit[order][:-1])
+        | (magnitude[1:] > magnitude[:-1] * BAND_RATIO)
+    )
+    merchant_series = []
+    for rows in np.split(order, np.flatnonzero(breaks)[1:]):
+        found = _series(np.sort(rows), columns, last_day)
+        if found is not None:
+            amounts = columns["magnitude"][found["rows"]]
+            if amounts.max() <= amounts.min() * MERCHANT_SPREAD:
+                merchant_series.append(found)
+    # owner[row]: index of the merchant series containing the row, or -1
+    owner = np.full(len(store), -1)
+    for index, found in enumerate(merchant_series):
+        owner[found["rows"]] = index
+
+    # Category level, for payments the merchant level split up
+    order = np.lexsort((debit, store.category))
+    keys = store.category[order].astype(np.int64) * 2 + debit[order]
+    category_series, replaced = [], set()
+    for rows in np.split(order, np.flatnonzero(keys[1:] != keys[:-1]) + 1):
+        found = _series(np.sort(rows), columns, last_day)
+        if found is None:
+            continue
+        owners = owner[found["rows"]]
+        if np.mean(owners < 0) < CATEGORY_NEW_SHARE:
+            continue
+        category_series.append(found)
+        for index in np.unique(owners[owners >= 0]).tolist():
+            if np.isin(merchant_series[index]["rows"], found["rows"]).mean() >= CATEGORY_CONTAINS_SHARE:
+                replaced.add(index)
+
+    series = [found for index, found in enumerate(merchant_series) if index not in replaced] + category_series
+    results = [_describe(found, store) for found in series]
+    results.sort(key=lambda s: (s["direction"] == "debit", -s["typical_amount"]))
+    return results
+
+
+def _series(rows: np.ndarray, columns: Dict[str, np.ndarray], last_day: int) -> Optional[Dict]:
+    """The recurring payments among a group's rows (in date order), or None if it doesn't recur"""
+    if len(rows) < MIN_OCCURRENCES:
+        return None
+    # The next expected payment is the first one due after the ledger ends; lapsed series have none
+    monthly = _monthly(rows, columns)
+    if monthly is not None:
+        hits, anchor = monthly
+        next_day = int(columns["day"][hits[-1]])
+        active = last_day - next_day <= ACTIVE_PERIODS * _MONTH_DAYS
+        while active and next_day <= last_day:
+            next_day = _next_monthly_day(next_day, anchor)
+        return {
+            "rows": hits, "cadence": "monthly", "day_of_month": anchor, "next_day": next_day if active else None,
+        }
+
+    days = np.unique(columns["day"][rows])
+    gaps = np.diff(days)
+    for name, period, tolerance in INTERVAL_CADENCES:
+        if len(days) >= MIN_OCCURRENCES and np.mean(np.abs(gaps - period) <= tolerance) >= REGULAR_SHARE:
+            last = int(days[-1])
+            active = last_day - last <= ACTIVE_PERIODS * period
+            next_day = last + period * max(1, -(-(last_day - last) // period)) if active else None
+            return {"rows": rows, "cadence": name, "day_of_month": None, "next_day": next_day}
+    return None
+
+
+def _monthly(rows: np.ndarray, columns: Dict[str, np.ndarray]) -> Optional[tuple]:
+    """(first row per month near the usual day of the month, that day) if the group recurs monthly"""
+    day_of_month, month = columns["day_of_month"][rows], columns["month"][rows]
+    anchor = int(np.bincount(day_of_month).argmax())
+    near = np.abs(day_of_month - anchor) <= DAY_TOLERANCE
+    hit_months, first = np.unique(month[near], return_index=True)
+    if len(hit_months) < MIN_OCCURRENCES:
+        return None
+    span = hit_months[-1] - hit_months[0] + 1
+    in_span = np.count_nonzero((month >= hit_months[0]) & (month <= hit_months[-1]))
+    if len(hit_months) / span < MONTHLY_COVERAGE or len(hit_months) / in_span < MONTHLY_SHARE:
+        return None
+    return rows[np.flatnonzero(near)[first]], anchor
+
+
+def _next_monthly_day(last: int, anchor: int) -> int:
+    """Day number of the next occurrence on the anchor day, in the month after `last`"""
+    current = date.fromordinal(last)
+    year, month = (current.year + 1, 1) if current.month == 12 else (current.year, current.month + 1)
+    return date(year, month, min(anchor, calendar.monthrange(year, month)[1])).toordinal()
+
+
+def _describe(found: Dict, store: TransactionStore) -> Dict:
+    rows = found["rows"]
+    magnitude = np.abs(store.amount[rows])
+    merchants = [store.merchants[code] for code in np.unique(store.merchant[rows])]
+    return {
+        "category": store.categories[int(store.category[rows[0]])],
+        "merchants": merchants,
+        "direction": "debit" if store.amount[rows[0]] < 0 else "credit",
+        "cadence": found["cadence"],
+        **({"day_of_month": found["day_of_month"]} if found["day_of_month"] is not None else {}),
+        "typical_amount": round(float(np.median(magnitude)), 2),
+        "amount_range": [round(float(magnitude.min()), 2), round(float(magnitude.max()), 2)],
+        "occurrences": int(len(rows)),
+        "first_date": from_day_number(store.day[rows[0]]),
+        "last_date": from_day_number(store.day[rows[-1]]),
+        "next_expected_date": from_day_number(found["next_day"]) if found["next_day"] is not None else None,
+        "active": found["next_day"] is not None,
+    }
@@ -0,0 +1,102 @@
+"""
+Single-flight coalescing of identical concurrent requests.
+
+The first request for a key starts the work as its own asyncio task; identical requests
+arriving while it runs attach to that task instead of repeating it, and all of them get
+its result. Nothing is kept once the work finishes, so only requests that overlap in time
+are merged (the response cache covers repeats after that).
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Broadcast:
+    """Runs an event stream once and replays it to any number of subscribers"""
+
+    def __init__(self, source: AsyncIterator[Dict]):
+        self.events: List[Dict] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        # Set once every subscriber has left and the stream was cancelled; new requests start afresh
+        self.abandoned = False
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[Dict]) -> None:
+        try:
+            async for event in source:
+                self.events.append(event)
+                self._notify()
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[Dict]:
+        """Every event from the start, then live ones until the stream ends"""
+        self.subscribers += 1
+        try:
+            index = 0
+            while True:
+                while index < len(self.events):
+                    # Copies, so subscribers can't see each other's edits
+                    yield dict(self.events[index])
+                    index += 1
+                if self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.finished:
+                # Nobody is listening any more: stop the source so it releases what it holds
+                self.abandoned = True
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key onto one in-flight computation"""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, Any] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _join(self, key: Hashable, start: Callable[[], Any]) -> Tuple[Any, bool]:
+        flight = self._flights.get(key)
+        if flight is not None and not getattr(flight, "abandoned", False):
+            self.coalesced += 1
+            return flight, True
+        flight = start()
+        self._flights[key] = flight
+        self.started += 1
+        task = flight if isinstance(flight, asyncio.Future) else flight.task
+        task.add_done_callback(lambda _: self._flights.pop(key, None) if self._flights.get(key) is flight else None)
+        return flight, False
+
+    async def run(self, key: Hashable, work: Callable[[], Awaitable]) -> Tuple[Any, bool]:
+        """Result of work() for this key, and whether this call joined another caller's flight"""
+        task, joined = self._join(key, lambda: asyncio.ensure_future(work()))
+        # Shielded so a caller that goes away doesn't cancel the work the others wait on
+        return await asyncio.shield(task), joined
+
+    def stream(self, key: Hashable, work: Callable[[], AsyncIterator[Dict]]) -> Tuple[AsyncIterator[Dict], bool]:
+        """Events of work() for this key, and whether this call joined another caller's flight"""
+        broadcast, joined = self._join(key, lambda: _Broadcast(work()))
+        return broadcast.subscribe(), joined
+
+    def stats(self) -> Dict:
+        total = self.started + self.coalesced
+        return {
+            "in_flight": len(self._flights),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,595 @@
+"""
+Pluggable transaction storage.
+
+The data layer talks to a StorageBackend instead of a fixed in-memory ledger:
+
+- MemoryBackend keeps per-customer columnar stores resident in a memory-bounded LRU,
+  filling misses from a loader (the synthetic generator by default).
+- SQLiteBackend reads stored transactions from a SQLite database indexed on
+  (customer_id, day). Date-range filtering runs in SQL, so only the requested
+  window is read and decoded.
+
+Both accept appended batches of new transactions (see `append`). The memory backend
+keeps ingested rows in its LRU until restart or eviction; SQLite stores them durably.
+
+Both also serve a DailyRollup per customer (day x category/merchant prefix sums) for
+window aggregates, and the whole ledger as one store for whole-history analyses
+(anomaly scores), kept current across appends.
+
+Seed a database with sample data:
+
+    python storage.py --db finbot_data.sqlite3 CUST001 CUST002
+    python storage.py --db load_test.sqlite3 --count 1000 --start 2023-01-01 --seed 7
+"""
+import argparse
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from cache import TTLCache
+from models import Customer, Transaction
+import numpy as np
+from store import DailyRollup, TransactionSlice, TransactionStore, from_day_number
+
+logger = logging.getLogger(__name__)
+
+
+class CustomerDataset:
+    """A customer's profile plus their columnar, date-indexed transaction store"""
+
+    def __init__(self, customer: Customer, store: TransactionStore, version: int):
+        self.customer = customer
+        self.store = store
+        # Unique per load, so caches keyed on it never serve data from an earlier load
+        self.version = version
+        self._fingerprint = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.store.nbytes
+
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of the dataset, stable across restarts for identical data"""
+        if self._fingerprint is None:
+            store = self.store
+            digest = hashlib.sha256(self.customer.customer_id.encode())
+            for column in (store.day, store.amount, store.category, store.merchant):
+                digest.update(column.tobytes())
+            digest.update("\x1f".join(store.categories + store.merchants).encode())
+            self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+    def appended(self, store: TransactionStore, batch: TransactionStore, version: int) -> "CustomerDataset":
+        """The dataset after appending `batch`; the fingerprint chains on from this one's"""
+        dataset = CustomerDataset(self.customer, store, version)
+        digest = hashlib.sha256(self.fingerprint.encode())
+        for column in (batch.day, batch.amount, batch.category, batch.merchant):
+            digest.update(column.tobytes())
+        digest.update("\x1f".join(batch.categories + batch.merchants).encode())
+        dataset._fingerprint = digest.hexdigest()[:16]
+        return dataset
+
+
+class StorageBackend:
+    """Source of customer profiles and transactions for the data layer"""
+
+    name = "base"
+
+    def get_customer(self, customer_id: str) -> Customer:
+        raise NotImplementedError
+
+    def get_version(self, customer_id: str) -> int:
+        """Stamp that changes whenever the customer's transactions change"""
+        raise NotImplementedError
+
+    def get_fingerprint(self, customer_id: str) -> str:
+        """Content identifier stable across restarts for identical data"""
+        raise NotImplementedError
+
+    def get_range(self, customer_id: str, start_day: int, end_day: int) -> TransactionSlice:
+        """Transactions between two day numbers (inclusive), sorted by date"""
+        raise NotImplementedError
+
+    def get_all(self, customer_id: str) -> List[Transaction]:
+        raise NotImplementedError
+
+    def get_rollup(self, customer_id: str) -> DailyRollup:
+        """Daily category/merchant rollup over all of the customer's transactions"""
+        raise NotImplementedError
+
+    def get_store(self, customer_id: str, anomalies: bool = False) -> TransactionStore:
+        """
+        All of the customer's transactions as one store (with its cached analyses). With
+        `anomalies`, its anomaly scores are built first so cache accounting includes them.
+        """
+        raise NotImplementedError
+
+    def append(self, customer_id: str, batch: TransactionStore) -> Tuple[int, TransactionStore]:
+        """
+        Append new transactions after the customer's last one. Transaction IDs and running
+        balances are assigned here; returns the new data version and the batch as stored.
+        """
+        raise NotImplementedError
+
+    def warm(self, customer_id: str) -> None:
+        """Prepare a customer's data ahead of the first request"""
+
+    def stats(self) -> Dict:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(StorageBackend):
+    """Resident columnar stores per customer, loaded on first use into a bytes-bounded LRU"""
+
+    name = "memory"
+
+    def __init__(
+        self,
+        loader: Callable[[str], CustomerDataset],
+        max_entries: int,
+        max_bytes: int,
+        next_version: Optional[Callable[[], int]] = None
+    ):
+        self._loader = loader
+        self._next_version = next_version
+        self._datasets = TTLCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sizeof=lambda dataset: dataset.nbytes,
+            on_evict=self._evicted
+        )
+        # Customers whose cached dataset holds ingested rows, which the loader can't restore
+        self._ingested = set()
+        # Guards load bookkeeping; per-customer locks make concurrent first requests load once
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # customer_id -> [lock, appends holding or waiting on it]; dropped when unused
+        self._append_locks: Dict[str, list] = {}
+
+    def get_dataset(self, customer_id: str) -> CustomerDataset:
+        """Get a customer's dataset, loading it on first use"""
+        dataset = self._datasets.get(customer_id)
+        if dataset is not None:
+            return dataset
+        with self._lock:
+            load_lock = self._load_locks.setdefault(customer_id, threading.Lock())
+        with load_lock:
+            dataset = self._datasets.get(customer_id)
+            if dataset is None:
+                dataset = self._loader(customer_id)
+                # Nearly every query reads the rollup; building it first counts it in the LRU budget
+                dataset.store.rollup()
+                self._datasets.put(customer_id, dataset)
+        with self._lock:
+            self._load_locks.pop(customer_id, None)
+        return dataset
+
+    def get_customer(self, customer_id: str) -> Customer:
+        return self.get_dataset(customer_id).customer
+
+    def get_version(self, customer_id: str) -> int:
+        return self.get_dataset(customer_id).version
+
+    def get_fingerprint(self, customer_id: str) -> str:
+        return self.get_dataset(customer_id).fingerprint
+
+    def get_range(self, customer_id: str, start_day: int, end_day: int) -> TransactionSlice:
+        return self.get_dataset(customer_id).store.slice(start_day, end_day)
+
+    def get_all(self, customer_id: str) -> List[Transaction]:
+        return self.get_dataset(customer_id).store.rows()
+
+    def get_rollup(self, customer_id: str) -> DailyRollup:
+        return self.get_dataset(customer_id).store.rollup()
+
+    def get_store(self, customer_id: str, anomalies: bool = False) -> TransactionStore:
+        store = self.get_dataset(customer_id).store
+        if anomalies:
+            store.anomalies()
+            # The scores are built lazily after the dataset was sized for the LRU
+            self._datasets.resize(customer_id)
+        return store
+
+    def append(self, customer_id: str, batch: TransactionStore) -> Tuple[int, TransactionStore]:
+        with self._lock:
+            append_lock = self._append_locks.setdefault(customer_id, [threading.Lock(), 0])
+            append_lock[1] += 1
+        try:
+            with append_lock[0]:
+                return self._append(customer_id, batch)
+        finally:
+            with self._lock:
+                append_lock[1] -= 1
+                if not append_lock[1]:
+                    del self._append_locks[customer_id]
+
+    def _append(self, customer_id: str, batch: TransactionStore) -> Tuple[int, TransactionStore]:
+        dataset = self.get_dataset(customer_id)
+        store = dataset.store
+        if len(store):
+            last_day, last_balance = int(store.day[-1]), float(store.balance[-1])
+            last_number = _transaction_number(str(store.transaction_id[-1]))
+        else:
+            last_day, last_balance, last_number = None, 0.0, None
+        batch = _ledger_batch(
+            batch, last_day, last_balance, _next_transaction_number(last_number, lambda: len(store))
+        )
+        version = self._next_version() if self._next_version else dataset.version + 1
+        # Queries already holding the previous dataset keep reading it unchanged
+        appended = dataset.appended(store.appended(batch), batch, version)
+        if not self._datasets.put(customer_id, appended):
+            raise ValueError(f"Ledger for {customer_id} would exceed the dataset cache budget")
+        with self._lock:
+            self._ingested.add(customer_id)
+        return version, batch
+
+    def _evicted(self, customer_id: str, dataset: CustomerDataset) -> None:
+        with self._lock:
+            if customer_id not in self._ingested:
+                return
+            self._ingested.discard(customer_id)
+        logger.warning(
+            f"Evicted {customer_id} from the dataset cache; their ingested transactions are dropped "
+            "(use the sqlite backend to keep them)"
+        )
+
+    def warm(self, customer_id: str) -> None:
+        self.get_dataset(customer_id)
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, **self._datasets.stats(), "ingested_customers": len(self._ingested)}
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    account_number TEXT NOT NULL,
+    account_type TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    joining_date TEXT NOT NULL,
+    data_version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    customer_id TEXT NOT NULL,
+    transaction_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    amount REAL NOT NULL,
+    category TEXT NOT NULL,
+    transaction_type TEXT NOT NULL,
+    balance REAL NOT NULL,
+    merchant TEXT NOT NULL,
+    payment_method TEXT NOT NULL,
+    PRIMARY KEY (customer_id, transaction_id)
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_customer_day ON transactions (customer_id, day);
+CREATE INDEX IF NOT EXISTS idx_transactions_customer_number
+    ON transactions (customer_id, CAST(substr(transaction_id, 4) AS INTEGER));
+"""
+
+# Column order of transaction reads; "day" holds the date as an integer day number
+_COLUMNS = (
+    "transaction_id", "day", "description", "amount", "category",
+    "transaction_type", "balance", "merchant", "payment_method",
+)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Transactions stored in SQLite, indexed on (customer_id, day).
+
+    Each thread reads through its own connection (WAL mode allows concurrent readers).
+    Range queries are answered by an index range scan and decoded straight into a
+    columnar store holding just the requested window.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, rollup_cache_entries: int = 64, store_cache_entries: int = 16):
+        self.path = path
+        self._local = threading.local()
+        # customer_id -> (data_version, rollup)
+        self._rollups = TTLCache(max_entries=rollup_cache_entries)
+        # customer_id -> (data_version, full ledger store)
+        self._stores = TTLCache(max_entries=store_cache_entries)
+        # customer_id -> (data_version, fingerprint)
+        self._fingerprints: Dict[str, Tuple[int, str]] = {}
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _snapshot(self):
+        """
+        One read transaction: every query inside sees the same committed state, so a version
+        read there always matches the rows read with it, even while appends commit.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+    def _customer_row(self, customer_id: str) -> tuple:
+        row = self._connect().execute(
+            "SELECT customer_id, name, account_number, account_type, email, phone, joining_date, data_version "
+            "FROM customers WHERE customer_id = ?",
+            (customer_id,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown customer: {customer_id}")
+        return row
+
+    def get_customer(self, customer_id: str) -> Customer:
+        row = self._customer_row(customer_id)
+        return Customer(
+            customer_id=row[0], name=row[1], account_number=row[2], account_type=row[3],
+            email=row[4], phone=row[5], joining_date=row[6]
+        )
+
+    def get_version(self, customer_id: str) -> int:
+        return self._customer_row(customer_id)[7]
+
+    def get_fingerprint(self, customer_id: str) -> str:
+        version = self.get_version(customer_id)
+        cached_version, fingerprint = self._fingerprints.get(customer_id, (None, None))
+        if cached_version != version:
+            with self._snapshot() as conn:
+                version = self.get_version(customer_id)
+                count, last_day, total, last_id = conn.execute(
+                    "SELECT COUNT(*), MAX(day), TOTAL(amount), MAX(transaction_id) "
+                    "FROM transactions WHERE customer_id = ?",
+                    (customer_id,)
+                ).fetchone()
+            digest = hashlib.sha256(f"{customer_id}|{version}|{count}|{last_day}|{total:.2f}|{last_id}".encode())
+            fingerprint = digest.hexdigest()[:16]
+            self._fingerprints[customer_id] = (version, fingerprint)
+        return fingerprint
+
+    def _query(self, customer_id: str, start_day: int, end_day: int) -> TransactionStore:
+        rows = self._connect().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM transactions "
+            "WHERE customer_id = ? AND day BETWEEN ? AND ? ORDER BY day, rowid",
+            (customer_id, start_day, end_day)
+        ).fetchall()
+        if not rows:
+            # Distinguish an empty window from an unknown customer
+            self._customer_row(customer_id)
+        columns = list(zip(*rows)) if rows else [()] * len(_COLUMNS)
+        return TransactionStore.from_columns(dict(zip(_COLUMNS, columns)))
+
+    def get_range(self, customer_id: str, start_day: int, end_day: int) -> TransactionSlice:
+        return self._query(customer_id, start_day, end_day).slice(start_day, end_day)
+
+    def get_all(self, customer_id: str) -> List[Transaction]:
+        return self._query(customer_id, 0, 2 ** 31 - 1).rows()
+
+    def get_rollup(self, customer_id: str) -> DailyRollup:
+        version = self.get_version(customer_id)
+        cached = self._rollups.get(customer_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        # Aggregate per day, category and merchant in SQL so only the groups reach Python;
+        # the version is re-read in the same snapshot so append extends exactly these rows
+        with self._snapshot() as conn:
+            version = self.get_version(customer_id)
+            groups = conn.execute(
+                "SELECT day, category, merchant, "
+                "TOTAL(CASE WHEN amount < 0 THEN -amount ELSE 0 END), TOTAL(CASE WHEN amount > 0 THEN amount ELSE 0 END), "
+                "TOTAL(amount < 0), TOTAL(amount > 0), COUNT(*) "
+                "FROM transactions WHERE customer_id = ? GROUP BY day, category, merchant ORDER BY day",
+                (customer_id,)
+            ).fetchall()
+        day, category, merchant, *values = zip(*groups) if groups else [()] * 8
+        categories, category_codes = np.unique(np.asarray(category, dtype=str), return_inverse=True)
+        merchants, merchant_codes = np.unique(np.asarray(merchant, dtype=str), return_inverse=True)
+        rollup = DailyRollup.from_groups(
+            np.asarray(day, dtype=np.int32),
+            category_codes.reshape(-1),
+            categories.tolist(),
+            merchant_codes.reshape(-1),
+            merchants.tolist(),
+            np.asarray(values, dtype=np.float64).reshape(len(values), -1).T,
+        )
+        self._rollups.put(customer_id, (version, rollup))
+        return rollup
+
+    def get_store(self, customer_id: str, anomalies: bool = False) -> TransactionStore:
+        version = self.get_version(customer_id)
+        cached = self._stores.get(customer_id)
+        if cached is not None and cached[0] == version:
+            store = cached[1]
+        else:
+            # Tag the rows with the version they were read at; append extends exactly that
+            with self._snapshot():
+                version = self.get_version(customer_id)
+                store = self._query(customer_id, 0, 2 ** 31 - 1)
+            self._stores.put(customer_id, (version, store))
+        if anomalies:
+            store.anomalies()
+        return store
+
+    def warm(self, customer_id: str) -> None:
+        self._customer_row(customer_id)
+
+    def append(self, customer_id: str, batch: TransactionStore) -> Tuple[int, TransactionStore]:
+        conn = self._connect()
+        with conn:
+            # Take the write lock up front so concurrent appends see each other's last row
+            conn.execute("BEGIN IMMEDIATE")
+            version = self._customer_row(customer_id)[7] + 1
+            last = conn.execute(
+                "SELECT day, balance FROM transactions WHERE customer_id = ? ORDER BY day DESC, rowid DESC LIMIT 1",
+                (customer_id,)
+            ).fetchone()
+            # Compare ID numbers, not text: "TXN999999" sorts after "TXN1000000"
+            last_number = conn.execute(
+                "SELECT MAX(CAST(substr(transaction_id, 4) AS INTEGER)) FROM transactions WHERE customer_id = ?",
+                (customer_id,)
+            ).fetchone()[0]
+            first_number = _next_transaction_number(last_number, lambda: conn.execute(
+                "SELECT COUNT(*) FROM transactions WHERE customer_id = ?", (customer_id,)
+            ).fetchone()[0])
+            batch = _ledger_batch(batch, last[0] if last else None, last[1] if last else 0.0, first_number)
+            conn.executemany(
+                f"INSERT INTO transactions (customer_id, {', '.join(_COLUMNS)}) VALUES ({', '.join('?' * 10)})",
+                _store_records(customer_id, batch)
+            )
+            conn.execute("UPDATE customers SET data_version = ? WHERE customer_id = ?", (version, customer_id))
+        cached = self._rollups.get(customer_id)
+        if cached is not None and cached[0] == version - 1:
+            self._rollups.put(customer_id, (version, cached[1].extended(batch)))
+        cached = self._stores.get(customer_id)
+        if cached is not None and cached[0] == version - 1:
+            self._stores.put(customer_id, (version, cached[1].appended(batch)))
+        return version, batch
+
+    def import_customer(self, customer: Customer, store: TransactionStore) -> int:
+        """Replace a customer's profile and transactions; returns the new data version"""
+        conn = self._connect()
+        with conn:
+            previous = conn.execute(
+                "SELECT data_version FROM customers WHERE customer_id = ?", (customer.customer_id,)
+            ).fetchone()
+            version = previous[0] + 1 if previous else 1
+            conn.execute(
+                "INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    customer.customer_id, customer.name, customer.account_number, customer.account_type,
+                    customer.email, customer.phone, customer.joining_date, version
+                )
+            )
+            conn.execute("DELETE FROM transactions WHERE customer_id = ?", (customer.customer_id,))
+            conn.executemany(
+                f"INSERT INTO transactions (customer_id, {', '.join(_COLUMNS)}) VALUES ({', '.join('?' * 10)})",
+                _store_records(customer.customer_id, store)
+            )
+        return version
+
+    def stats(self) -> Dict:
+        # Only in-process counters: /health calls this on the event loop, and a row count is a table scan
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "rollups": self._rollups.stats(),
+            "stores": self._stores.stats()
+        }
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _transaction_number(transaction_id: str) -> Optional[int]:
+    """The number in a TXNnnnnnn ID, or None for other IDs"""
+    match = re.fullmatch(r"TXN(\d+)", transaction_id)
+    return int(match.group(1)) if match else None
+
+
+def _next_transaction_number(last_number: Optional[int], row_count: Callable[[], int]) -> int:
+    """Number for the next TXNnnnnnn ID, continuing from the last one (or the row count)"""
+    return (last_number if last_number is not None else row_count()) + 1
+
+
+def _ledger_batch(
+    batch: TransactionStore, last_day: Optional[int], last_balance: float, first_number: int
+) -> TransactionStore:
+    """Assign IDs and running balances to a batch appended after a ledger's last row"""
+    if last_day is not None and len(batch) and batch.day[0] < last_day:
+        raise ValueError(
+            f"Transactions dated before {from_day_number(last_day)} cannot be appended; "
+            "the ledger only accepts new activity"
+        )
+    numbers = np.arange(first_number, first_number + len(batch))
+    return TransactionStore(
+        day=batch.day,
+        amount=batch.amount,
+        balance=np.maximum(np.round(last_balance + np.cumsum(batch.amount), 2), 0.0),
+        transaction_id=np.char.add("TXN", np.char.zfill(numbers.astype(str), 6)),
+        category=(batch.category, batch.categories),
+        merchant=(batch.merchant, batch.merchants),
+        description=(batch.description, batch.descriptions),
+        transaction_type=(batch.transaction_type, batch.transaction_types),
+        payment_method=(batch.payment_method, batch.payment_methods),
+    )
+
+
+def _store_records(customer_id: str, store: TransactionStore) -> Iterable[tuple]:
+    """Rows of a columnar store as INSERT parameter tuples"""
+
+    def decode(codes, vocabulary: List[str]) -> list:
+        return [vocabulary[code] for code in codes.tolist()]
+
+    return zip(
+        [customer_id] * len(store),
+        store.transaction_id.tolist(),
+        store.day.tolist(),
+        decode(store.description, store.descriptions),
+        store.amount.tolist(),
+        decode(store.category, store.categories),
+        decode(store.transaction_type, store.transaction_types),
+        store.balance.tolist(),
+        decode(store.merchant, store.merchants),
+        decode(store.payment_method, store.payment_methods),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a FinBot SQLite database with generated sample data")
+    parser.add_argument("customer_ids", nargs="*", default=["CUST001"], help="customer IDs to generate")
+    parser.add_argument("--db", default="finbot_data.sqlite3", help="database path")
+    parser.add_argument("--count", type=int, help="generate CUST001..CUSTnnn instead of the listed IDs")
+    parser.add_argument("--start", help="first date (YYYY-MM-DD) for --count, default January 1st")
+    parser.add_argument("--end", help="last date (YYYY-MM-DD) for --count, default today")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for --count")
+    args = parser.parse_args()
+
+    from data import _load_customer_dataset, generate_customer_stores, get_current_year_window
+
+    if args.count:
+        year_start, today = get_current_year_window()
+        generated = generate_customer_stores(args.count, args.start or year_start, args.end or today, args.seed)
+    else:
+        generated = (
+            (dataset.customer, dataset.store)
+            for dataset in map(_load_customer_dataset, args.customer_ids)
+        )
+
+    backend = SQLiteBackend(args.db)
+    started = time.perf_counter()
+    total = 0
+    for customer, store in generated:
+        version = backend.import_customer(customer, store)
+        total += len(store)
+        if not args.count:
+            print(
+                f"Stored {len(store)} transactions for {customer.customer_id} "
+                f"({from_day_number(store.day[0])} to {from_day_number(store.day[-1])}, version {version})"
+            )
+    print(f"Stored {total} transactions in {time.perf_counter() - started:.1f}s")
+    backend.close()
+
+
+if __name__ == "__main__":
+    main()
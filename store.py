@@ -0,0 +1,742 @@
+from collections.abc import Sequence
+from datetime import date
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from models import Transaction
+
+
+def to_day_number(value: str) -> int:
+    """Convert a YYYY-MM-DD string to an integer day number (proleptic ordinal)"""
+    return date.fromisoformat(value).toordinal()
+
+
+def from_day_number(day: int) -> str:
+    """Convert an integer day number back to a YYYY-MM-DD string"""
+    return date.fromordinal(int(day)).isoformat()
+
+
+def _encode(values: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """Dictionary-encode a string column into int32 codes plus a vocabulary"""
+    vocabulary, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return codes.astype(np.int32), [str(v) for v in vocabulary]
+
+
+# Rough per-row footprint of a materialized Transaction model and its field values
+_ROW_OVERHEAD_BYTES = 1500
+
+
+class TransactionStore:
+    """
+    Columnar, date-sorted transaction ledger.
+
+    Dates are stored as integer day numbers and kept sorted, so a date range maps
+    to a contiguous ``[lo, hi)`` row interval found by binary search. String
+    columns (category, merchant, ...) are dictionary-encoded into NumPy code arrays.
+    """
+
+    def __init__(
+        self,
+        day: np.ndarray,
+        amount: np.ndarray,
+        balance: np.ndarray,
+        transaction_id: np.ndarray,
+        category: Tuple[np.ndarray, List[str]],
+        merchant: Tuple[np.ndarray, List[str]],
+        description: Tuple[np.ndarray, List[str]],
+        transaction_type: Tuple[np.ndarray, List[str]],
+        payment_method: Tuple[np.ndarray, List[str]],
+        rows: Optional[List[Transaction]] = None,
+    ):
+        order = None
+        if len(day) > 1 and np.any(day[1:] < day[:-1]):
+            order = np.argsort(day, kind="stable")
+
+        def _sorted(column: np.ndarray) -> np.ndarray:
+            return column if order is None else column[order]
+
+        self.day = _sorted(np.asarray(day, dtype=np.int32))
+        self.amount = _sorted(np.asarray(amount, dtype=np.float64))
+        self.balance = _sorted(np.asarray(balance, dtype=np.float64))
+        self.transaction_id = _sorted(np.asarray(transaction_id))
+        self.category, self.categories = _sorted(category[0]), list(category[1])
+        self.merchant, self.merchants = _sorted(merchant[0]), list(merchant[1])
+        self.description, self.descriptions = _sorted(description[0]), list(description[1])
+        self.transaction_type, self.transaction_types = _sorted(transaction_type[0]), list(transaction_type[1])
+        self.payment_method, self.payment_methods = _sorted(payment_method[0]), list(payment_method[1])
+
+        if rows is not None and order is not None:
+            rows = [rows[i] for i in order]
+        self._rows = rows
+        self._buffers: Optional[_ColumnBuffers] = None
+        self._rollup: Optional[DailyRollup] = None
+        self._anomalies: Optional[AnomalyScores] = None
+
+    @classmethod
+    def from_transactions(cls, transactions: List[Transaction], keep_rows: bool = True) -> "TransactionStore":
+        """
+        Build a store from a list of validated Transaction models.
+        With keep_rows=False only the columns are retained and rows are rebuilt on demand.
+        """
+        return cls(
+            day=np.fromiter((to_day_number(t.date) for t in transactions), dtype=np.int32, count=len(transactions)),
+            amount=np.fromiter((t.amount for t in transactions), dtype=np.float64, count=len(transactions)),
+            balance=np.fromiter((t.balance for t in transactions), dtype=np.float64, count=len(transactions)),
+            transaction_id=np.array([t.transaction_id for t in transactions], dtype=str),
+            category=_encode([t.category for t in transactions]),
+            merchant=_encode([t.merchant for t in transactions]),
+            description=_encode([t.description for t in transactions]),
+            transaction_type=_encode([t.transaction_type for t in transactions]),
+            payment_method=_encode([t.payment_method for t in transactions]),
+            rows=list(transactions) if keep_rows else None,
+        )
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Sequence]) -> "TransactionStore":
+        """
+        Build a store from per-field value sequences keyed by Transaction field name.
+        The "day" column holds integer day numbers in place of "date" strings.
+        """
+        return cls(
+            day=np.asarray(columns["day"], dtype=np.int32),
+            amount=np.asarray(columns["amount"], dtype=np.float64),
+            balance=np.asarray(columns["balance"], dtype=np.float64),
+            transaction_id=np.asarray(columns["transaction_id"], dtype=str),
+            category=_encode(columns["category"]),
+            merchant=_encode(columns["merchant"]),
+            description=_encode(columns["description"]),
+            transaction_type=_encode(columns["transaction_type"]),
+            payment_method=_encode(columns["payment_method"]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def appended(self, batch: "TransactionStore") -> "TransactionStore":
+        """
+        A new store holding this store's rows followed by `batch`, in time proportional
+        to the batch.
+
+        Columns live in over-allocated buffers shared with the stores appended from them,
+        so only the batch is copied. This store is left unchanged (its views end at its own
+        row count), so readers holding it keep a consistent snapshot while ingestion goes on.
+        Batch days must not precede this store's last day. Callers serialize appends.
+        """
+        size, added = len(self), len(batch)
+        if added and size and batch.day[0] < self.day[-1]:
+            raise ValueError(
+                f"Transactions dated before {from_day_number(self.day[-1])} cannot be appended"
+            )
+
+        # Re-encode the batch's string columns against this store's vocabularies
+        vocabularies = {}
+        batch_columns = {name: getattr(batch, name) for name in _NUMERIC_COLUMNS}
+        for column, name in _ENCODED_COLUMNS.items():
+            vocabularies[name], mapping = _extend_vocabulary(getattr(self, name), getattr(batch, name))
+            batch_columns[column] = mapping[getattr(batch, column)]
+
+        buffers, columns = _append_rows(
+            self._buffers, {column: getattr(self, column) for column in _COLUMNS}, batch_columns
+        )
+        store = TransactionStore.__new__(TransactionStore)
+        for column, array in columns.items():
+            setattr(store, column, array)
+        for name, vocabulary in vocabularies.items():
+            setattr(store, name, vocabulary)
+        store._rows = None
+        store._buffers = buffers
+        store._rollup = self._rollup.extended(batch) if self._rollup is not None else None
+        store._anomalies = self._anomalies.extended(store, size) if self._anomalies is not None else None
+        return store
+
+    def rollup(self) -> "DailyRollup":
+        """The store's daily rollup, built on first use and extended by appends"""
+        if self._rollup is None:
+            self._rollup = DailyRollup.build(self)
+        return self._rollup
+
+    def anomalies(self) -> "AnomalyScores":
+        """Per-transaction anomaly scores, computed on first use and extended by appends"""
+        if self._anomalies is None:
+            self._anomalies = AnomalyScores.build(self)
+        return self._anomalies
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size of the store in bytes"""
+        arrays = (
+            self.day, self.amount, self.balance, self.transaction_id, self.category,
+            self.merchant, self.description, self.transaction_type, self.payment_method,
+        )
+        vocabularies = (
+            self.categories, self.merchants, self.descriptions, self.transaction_types, self.payment_methods,
+        )
+        size = sum(array.nbytes for array in arrays)
+        size += sum(len(value) + 50 for vocabulary in vocabularies for value in vocabulary)
+        if self._rows is not None:
+            size += len(self._rows) * _ROW_OVERHEAD_BYTES
+        if self._rollup is not None:
+            size += self._rollup.nbytes
+        if self._anomalies is not None:
+            size += self._anomalies.nbytes
+        return size
+
+    def bounds(self, start_day: int, end_day: int) -> Tuple[int, int]:
+        """Return the ``[lo, hi)`` row interval covering start_day..end_day inclusive"""
+        # Cast keys to the column dtype so searchsorted doesn't upcast (copy) the whole index
+        lo = int(np.searchsorted(self.day, self.day.dtype.type(start_day), side="left"))
+        hi = int(np.searchsorted(self.day, self.day.dtype.type(end_day), side="right"))
+        return lo, max(lo, hi)
+
+    def slice(self, start_day: int, end_day: int) -> "TransactionSlice":
+        """Get a zero-copy view of the rows between two day numbers (inclusive)"""
+        lo, hi = self.bounds(start_day, end_day)
+        return TransactionSlice(self, lo, hi)
+
+    def row(self, index: int) -> Transaction:
+        """Materialize a single row as a Transaction model"""
+        if self._rows is not None:
+            return self._rows[index]
+        return Transaction.model_construct(
+            transaction_id=str(self.transaction_id[index]),
+            date=from_day_number(self.day[index]),
+            description=self.descriptions[self.description[index]],
+            amount=float(self.amount[index]),
+            category=self.categories[self.category[index]],
+            transaction_type=self.transaction_types[self.transaction_type[index]],
+            balance=float(self.balance[index]),
+            merchant=self.merchants[self.merchant[index]],
+            payment_method=self.payment_methods[self.payment_method[index]],
+        )
+
+    def rows(self, lo: int = 0, hi: Optional[int] = None) -> List[Transaction]:
+        """Materialize rows ``[lo, hi)`` as Transaction models"""
+        hi = len(self) if hi is None else hi
+        if self._rows is not None:
+            return self._rows[lo:hi]
+        return [self.row(i) for i in range(lo, hi)]
+
+
+class _ColumnBuffers:
+    """Column arrays with spare capacity, shared by a store and the stores appended from it"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], rows: Dict[str, np.ndarray], capacity: int):
+        self.capacity = capacity
+        self.arrays = {}
+        for name, column in columns.items():
+            array = np.empty((capacity,) + column.shape[1:], dtype=np.result_type(column.dtype, rows[name].dtype))
+            array[:len(column)] = column
+            self.arrays[name] = array
+        # Rows written so far; only the store ending here may append in place
+        self.length = len(next(iter(columns.values())))
+
+
+def _append_rows(
+    buffers: Optional[_ColumnBuffers], columns: Dict[str, np.ndarray], rows: Dict[str, np.ndarray]
+) -> Tuple[_ColumnBuffers, Dict[str, np.ndarray]]:
+    """
+    Append rows to same-length columns, returning the buffers used and views of the result.
+    Only the rows are copied unless the buffers are full, don't fit the rows, or were
+    already extended past these columns by another append.
+    """
+    first = next(iter(columns))
+    size, added = len(columns[first]), len(rows[first])
+    if (
+        buffers is None
+        or buffers.length != size
+        or buffers.capacity < size + added
+        or any(
+            rows[name].shape[1:] != buffers.arrays[name].shape[1:]
+            or not np.can_cast(rows[name].dtype, buffers.arrays[name].dtype)
+            for name in columns
+        )
+    ):
+        buffers = _ColumnBuffers(columns, rows, max(2 * (size + added), 64))
+    for name in columns:
+        buffers.arrays[name][size:size + added] = rows[name]
+    buffers.length = size + added
+    return buffers, {name: array[:size + added] for name, array in buffers.arrays.items()}
+
+
+def _extend_vocabulary(vocabulary: List[str], values: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """Add unseen values to a vocabulary; returns it and each value's code in it"""
+    index = {value: code for code, value in enumerate(vocabulary)}
+    mapping = np.array([index.setdefault(value, len(index)) for value in values], dtype=np.int32)
+    return (list(index) if len(index) > len(vocabulary) else vocabulary), mapping
+
+
+# Measures kept per day and (category, merchant) pair by DailyRollup
+ROLLUP_MEASURES = ("spent", "income", "expense_count", "income_count", "count")
+SPENT, INCOME, EXPENSE_COUNT, INCOME_COUNT, COUNT = range(len(ROLLUP_MEASURES))
+
+
+def _measures(amount: np.ndarray) -> np.ndarray:
+    """Per-row ROLLUP_MEASURES contributions, shape (rows, measures)"""
+    expense, income = amount < 0, amount > 0
+    return np.stack(
+        [np.where(expense, -amount, 0.0), np.where(income, amount, 0.0), expense, income, np.ones(len(amount))],
+        axis=1,
+    )
+
+
+class DailyRollup:
+    """
+    Materialized day x (category, merchant) totals of a ledger, stored as running
+    prefix sums over days.
+
+    Totals for any date window are two binary searches over the distinct days plus
+    one subtraction, independent of how many transactions fall in the window; per-day
+    values (for time series) are differences of consecutive prefix rows. Appends add
+    prefix rows for the batch's days, so a day may appear twice at the end.
+    """
+
+    def __init__(
+        self,
+        day: np.ndarray,
+        prefix: np.ndarray,
+        categories: List[str],
+        merchants: List[str],
+        pair_category: np.ndarray,
+        pair_merchant: np.ndarray,
+        buffers: Optional[_ColumnBuffers] = None,
+    ):
+        self.day = day
+        # prefix[i, p, m]: measure m of pair p summed over days up to and including day[i]
+        self.prefix = prefix
+        self.categories = categories
+        self.merchants = merchants
+        self.pair_category = pair_category
+        self.pair_merchant = pair_merchant
+        self._buffers = buffers
+        self._category_members: Optional[np.ndarray] = None
+        self._merchant_members: Optional[np.ndarray] = None
+
+    @classmethod
+    def build(cls, store: TransactionStore) -> "DailyRollup":
+        return cls.from_groups(
+            store.day, store.category, store.categories, store.merchant, store.merchants, _measures(store.amount)
+        )
+
+    @classmethod
+    def from_groups(
+        cls,
+        day: np.ndarray,
+        category: np.ndarray,
+        categories: List[str],
+        merchant: np.ndarray,
+        merchants: List[str],
+        values: np.ndarray,
+    ) -> "DailyRollup":
+        """Build from date-sorted rows (transactions or pre-aggregated groups) and their measure values"""
+        key = category.astype(np.int64) * max(len(merchants), 1) + merchant
+        pairs, pair_index = np.unique(key, return_inverse=True)
+        days, day_index = np.unique(day, return_inverse=True)
+        daily = _daily_values(day_index * len(pairs) + pair_index, values, len(days), len(pairs))
+        return cls(
+            days.astype(np.int32),
+            np.cumsum(daily, axis=0),
+            list(categories),
+            list(merchants),
+            (pairs // max(len(merchants), 1)).astype(np.int32),
+            (pairs % max(len(merchants), 1)).astype(np.int32),
+        )
+
+    def extended(self, batch: TransactionStore) -> "DailyRollup":
+        """The rollup with a date-sorted batch (dated no earlier than the last day) added"""
+        if not len(batch):
+            return self
+        categories, category_codes = _extend_vocabulary(self.categories, batch.categories)
+        merchants, merchant_codes = _extend_vocabulary(self.merchants, batch.merchants)
+        category, merchant = category_codes[batch.category], merchant_codes[batch.merchant]
+
+        pair_codes = {(c, m): p for p, (c, m) in enumerate(zip(self.pair_category.tolist(), self.pair_merchant.tolist()))}
+        batch_pairs, pair_inverse = np.unique(np.stack([category, merchant], axis=1), axis=0, return_inverse=True)
+        pair_map = np.array([pair_codes.setdefault((int(c), int(m)), len(pair_codes)) for c, m in batch_pairs])
+        pair_index = pair_map[pair_inverse.reshape(-1)]
+        pair_count = len(pair_codes)
+
+        prefix = self.prefix
+        if pair_count > prefix.shape[1]:
+            # New pairs widen every prefix row, so this append copies the rollup
+            prefix = np.pad(prefix, ((0, 0), (0, pair_count - prefix.shape[1]), (0, 0)))
+        days, day_index = np.unique(batch.day, return_inverse=True)
+        daily = _daily_values(day_index * pair_count + pair_index, _measures(batch.amount), len(days), pair_count)
+        rows = np.cumsum(daily, axis=0)
+        if len(prefix):
+            rows += prefix[-1]
+
+        buffers, columns = _append_rows(
+            self._buffers, {"day": self.day, "prefix": prefix}, {"day": days.astype(np.int32), "prefix": rows}
+        )
+        pairs = np.array(list(pair_codes), dtype=np.int32).reshape(-1, 2)
+        return DailyRollup(columns["day"], columns["prefix"], categories, merchants, pairs[:, 0], pairs[:, 1], buffers)
+
+    @property
+    def nbytes(self) -> int:
+        return self.day.nbytes + self.prefix.nbytes
+
+    def _bounds(self, start_day: int, end_day: int) -> Tuple[int, int]:
+        lo = int(np.searchsorted(self.day, start_day, side="left"))
+        hi = int(np.searchsorted(self.day, end_day, side="right"))
+        return lo, max(lo, hi)
+
+    def pair_mask(self, category: Optional[str] = None, merchant: Optional[str] = None) -> np.ndarray:
+        """Pairs matching an optional category and merchant"""
+        mask = np.ones(len(self.pair_category), dtype=bool)
+        if category is not None:
+            mask &= self.pair_category == self.categories.index(category)
+        if merchant is not None:
+            mask &= self.pair_merchant == self.merchants.index(merchant)
+        return mask
+
+    def window(self, start_day: int, end_day: int) -> np.ndarray:
+        """Totals per pair between two day numbers (inclusive), shape (pairs, measures)"""
+        lo, hi = self._bounds(start_day, end_day)
+        if lo == hi:
+            return np.zeros(self.prefix.shape[1:])
+        totals = self.prefix[hi - 1].copy()
+        if lo:
+            totals -= self.prefix[lo - 1]
+        return totals
+
+    def daily(self, start_day: int, end_day: int, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Days in the window and their totals over the masked pairs, shape (days, measures)"""
+        lo, hi = self._bounds(start_day, end_day)
+        prefix = self.prefix[max(lo - 1, 0):hi][:, mask].sum(axis=1)
+        values = np.diff(prefix, axis=0) if lo else np.concatenate([prefix[:1], np.diff(prefix, axis=0)])
+        return self.day[lo:hi], values
+
+    def by_category(self, totals: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Per-pair totals (optionally only masked pairs) summed per category code, shape (categories, measures)"""
+        if self._category_members is None:
+            self._category_members = _membership(self.pair_category, len(self.categories))
+        return self._category_members @ (totals if mask is None else totals * mask[:, None])
+
+    def by_merchant(self, totals: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Per-pair totals (optionally only masked pairs) summed per merchant code, shape (merchants, measures)"""
+        if self._merchant_members is None:
+            self._merchant_members = _membership(self.pair_merchant, len(self.merchants))
+        return self._merchant_members @ (totals if mask is None else totals * mask[:, None])
+
+
+def _daily_values(cell: np.ndarray, values: np.ndarray, days: int, pairs: int) -> np.ndarray:
+    """Sum row values into (days, pairs, measures) cells given each row's flat cell index"""
+    return np.stack(
+        [np.bincount(cell, weights=values[:, m], minlength=days * pairs) for m in range(values.shape[1])], axis=1
+    ).reshape(days, pairs, values.shape[1])
+
+
+def _membership(codes: np.ndarray, groups: int) -> np.ndarray:
+    """One-hot (groups, pairs) matrix, so summing pairs into groups is one matrix product"""
+    members = np.zeros((groups, len(codes)))
+    members[codes, np.arange(len(codes))] = 1.0
+    return members
+
+
+# Anomaly scoring: each transaction is compared with the previous ANOMALY_BASELINE
+# transactions of the same direction in its category, and in its merchant
+ANOMALY_BASELINE = 30
+ANOMALY_MIN_HISTORY = 8
+# Modified z-score above which a transaction counts as anomalous (Iglewicz & Hoaglin)
+ANOMALY_THRESHOLD = 3.5
+# Lower bound on the baseline's MAD of log amounts, so near-fixed amounts (rent,
+# subscriptions) aren't flagged for a few percent of change
+_MAD_FLOOR = 0.05
+# Rows scored per vectorized block, bounding the (rows x baseline) working arrays
+_SCORE_BLOCK = 65536
+# Columns of AnomalyScores.scores
+CATEGORY_Z, CATEGORY_TYPICAL, MERCHANT_Z, MERCHANT_TYPICAL = range(4)
+
+
+class AnomalyScores:
+    """
+    Robust z-scores of every transaction against rolling baselines.
+
+    A transaction's baseline is the previous ANOMALY_BASELINE transactions of the same
+    direction (debit or credit) in its category, and separately in its merchant. The
+    score is the modified z-score of its log amount against the baseline's median and
+    MAD, so the occasional large purchase in a category stands out while normal spread
+    does not. Rows with fewer than ANOMALY_MIN_HISTORY earlier transactions in a group
+    are not scored against it. The last baseline of each group is kept, so appends score
+    only the new rows.
+    """
+
+    def __init__(
+        self,
+        scores: np.ndarray,
+        category_tails: Dict[int, np.ndarray],
+        merchant_tails: Dict[int, np.ndarray],
+        buffers: Optional[_ColumnBuffers] = None,
+    ):
+        # scores[i]: category z, typical category amount, merchant z, typical merchant amount
+        self.scores = scores
+        self.category_tails = category_tails
+        self.merchant_tails = merchant_tails
+        self._buffers = buffers
+
+    @classmethod
+    def build(cls, store: TransactionStore) -> "AnomalyScores":
+        values, category_groups, merchant_groups = _anomaly_inputs(store, 0)
+        category_z, category_typical = _trailing_robust_z(values, category_groups)
+        merchant_z, merchant_typical = _trailing_robust_z(values, merchant_groups)
+        return cls(
+            np.stack([category_z, category_typical, merchant_z, merchant_typical], axis=1),
+            _group_tails(values, category_groups),
+            _group_tails(values, merchant_groups),
+        )
+
+    def extended(self, store: TransactionStore, start: int) -> "AnomalyScores":
+        """Scores for `store`, whose rows from `start` on were appended after the scored ones"""
+        if start == len(store):
+            return self
+        values, category_groups, merchant_groups = _anomaly_inputs(store, start)
+        columns, tails = [], []
+        for groups, previous in ((category_groups, self.category_tails), (merchant_groups, self.merchant_tails)):
+            # Put each affected group's last baseline ahead of the new rows, then score only the new rows
+            keys = [key for key in np.unique(groups).tolist() if key in previous]
+            history = [previous[key] for key in keys]
+            history_values = np.concatenate(history + [values])
+            history_groups = np.concatenate([np.full(len(h), key) for h, key in zip(history, keys)] + [groups])
+            skip = len(history_values) - len(values)
+            columns.extend(_trailing_robust_z(history_values, history_groups, skip))
+            tails.append({**previous, **_group_tails(history_values, history_groups)})
+
+        buffers, result = _append_rows(
+            self._buffers, {"scores": self.scores}, {"scores": np.stack(columns, axis=1).astype(self.scores.dtype)}
+        )
+        return AnomalyScores(result["scores"], tails[0], tails[1], buffers)
+
+    @property
+    def nbytes(self) -> int:
+        return self.scores.nbytes
+
+    def score(self, lo: int, hi: int) -> np.ndarray:
+        """Anomaly score of rows [lo, hi): the larger of the category and merchant z (NaN if unscored)"""
+        window = self.scores[lo:hi]
+        return np.fmax(window[:, CATEGORY_Z], window[:, MERCHANT_Z])
+
+
+def _anomaly_inputs(store: TransactionStore, start: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Log amounts of rows from `start` on, and their (category, direction) and (merchant, direction) keys"""
+    amount = store.amount[start:]
+    direction = (amount < 0).astype(np.int64)
+    return (
+        np.log1p(np.abs(amount)),
+        store.category[start:].astype(np.int64) * 2 + direction,
+        store.merchant[start:].astype(np.int64) * 2 + direction,
+    )
+
+
+def _trailing_robust_z(values: np.ndarray, groups: np.ndarray, skip: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Modified z-score of each row from `skip` on against the up to ANOMALY_BASELINE previous
+    rows of its group, and the baseline median as an amount. Rows are in time order.
+    """
+    order = np.argsort(groups, kind="stable")
+    values, groups = values[order], groups[order]
+    z = np.full(len(values), np.nan, dtype=np.float32)
+    typical = np.full(len(values), np.nan, dtype=np.float32)
+    targets = np.flatnonzero(order >= skip)
+    offsets = np.arange(-ANOMALY_BASELINE, 0)
+    for block in range(0, len(targets), _SCORE_BLOCK):
+        rows = targets[block:block + _SCORE_BLOCK]
+        window = rows[:, None] + offsets
+        valid = window >= 0
+        window = np.where(valid, window, 0)
+        valid &= groups[window] == groups[rows][:, None]
+        history = np.where(valid, values[window], np.nan)
+        counts = valid.sum(axis=1)
+        median = _row_median(history, counts)
+        mad = np.maximum(_row_median(np.abs(history - median[:, None]), counts), _MAD_FLOOR)
+        scored = counts >= ANOMALY_MIN_HISTORY
+        z[rows] = np.where(scored, 0.6745 * (values[rows] - median) / mad, np.nan)
+        typical[rows] = np.where(scored, np.expm1(median), np.nan)
+    # Back to time order, dropping the baseline-only rows
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    return z[inverse[skip:]], typical[inverse[skip:]]
+
+
+def _row_median(values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median of each row's non-NaN values, given how many there are"""
+    ordered = np.sort(values, axis=1)
+    lo = np.maximum((counts - 1) // 2, 0)
+    hi = np.maximum(counts // 2, 0)
+    median = (np.take_along_axis(ordered, lo[:, None], 1) + np.take_along_axis(ordered, hi[:, None], 1))[:, 0] / 2
+    return np.where(counts > 0, median, np.nan)
+
+
+def _group_tails(values: np.ndarray, groups: np.ndarray) -> Dict[int, np.ndarray]:
+    """The last ANOMALY_BASELINE values of each group (rows in time order)"""
+    order = np.argsort(groups, kind="stable")
+    values, groups = values[order], groups[order]
+    ends = np.append(np.flatnonzero(groups[1:] != groups[:-1]) + 1, len(groups))
+    starts = np.concatenate([[0], ends[:-1]])
+    return {
+        int(groups[start]): values[max(start, end - ANOMALY_BASELINE):end].copy()
+        for start, end in zip(starts.tolist(), ends.tolist())
+        if end > start
+    }
+
+
+class TransactionSlice(Sequence):
+    """
+    Read-only view over a contiguous row interval of a TransactionStore.
+
+    Column attributes are NumPy views into the parent store, so creating a slice
+    never copies data. Indexing and iteration yield Transaction models, which keeps
+    the slice a drop-in replacement for the list previously returned by the data layer.
+    """
+
+    def __init__(self, store: TransactionStore, lo: int, hi: int):
+        self.store = store
+        self.lo = lo
+        self.hi = hi
+
+    def __len__(self) -> int:
+        return self.hi - self.lo
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.store.rows(self.lo, self.hi)[index]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction index out of range")
+        return self.store.row(self.lo + index)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        return iter(self.store.rows(self.lo, self.hi))
+
+    def to_columns(self) -> Dict[str, list]:
+        """Decode the slice into plain Python lists, one per Transaction field (in field order)"""
+        store = self.store
+        day = self.day
+        dates = {int(d): from_day_number(d) for d in np.unique(day)}
+
+        def decode(codes: np.ndarray, vocabulary: List[str]) -> list:
+            return [vocabulary[code] for code in codes.tolist()]
+
+        return {
+            "transaction_id": [str(v) for v in store.transaction_id[self.lo:self.hi].tolist()],
+            "date": [dates[d] for d in day.tolist()],
+            "description": decode(store.description[self.lo:self.hi], store.descriptions),
+            "amount": self.amount.tolist(),
+            "category": decode(self.category, store.categories),
+            "transaction_type": decode(self.transaction_type, store.transaction_types),
+            "balance": self.balance.tolist(),
+            "merchant": decode(self.merchant, store.merchants),
+            "payment_method": decode(store.payment_method[self.lo:self.hi], store.payment_methods),
+        }
+
+    @property
+    def day(self) -> np.ndarray:
+        return self.store.day[self.lo:self.hi]
+
+    @property
+    def amount(self) -> np.ndarray:
+        return self.store.amount[self.lo:self.hi]
+
+    @property
+    def balance(self) -> np.ndarray:
+        return self.store.balance[self.lo:self.hi]
+
+    @property
+    def category(self) -> np.ndarray:
+        return self.store.category[self.lo:self.hi]
+
+    @property
+    def merchant(self) -> np.ndarray:
+        return self.store.merchant[self.lo:self.hi]
+
+    @property
+    def transaction_type(self) -> np.ndarray:
+        return self.store.transaction_type[self.lo:self.hi]
+
+
+# Day number of 1970-01-01, the NumPy datetime64 epoch
+_EPOCH_DAY = to_day_number("1970-01-01")
+
+
+def period_start(day: np.ndarray, granularity: str) -> np.ndarray:
+    """Map day numbers to the day number starting their day, week (Monday) or month"""
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        # Day number 1 (0001-01-01) is a Monday
+        return day - (day - 1) % 7
+    if granularity == "month":
+        months = (day - _EPOCH_DAY).astype("datetime64[D]").astype("datetime64[M]")
+        return months.astype("datetime64[D]").astype(np.int64).astype(day.dtype) + _EPOCH_DAY
+    raise ValueError("granularity must be one of: day, week, month")
+
+
+# Snapshots
+# A store saved as one .npy file per column plus a JSON file of vocabularies. Loading
+# memory-maps the columns, so a boot reads only the pages its queries touch instead of
+# regenerating or parsing the data.
+
+_NUMERIC_COLUMNS = ("day", "amount", "balance", "transaction_id")
+_ENCODED_COLUMNS = {
+    "category": "categories",
+    "merchant": "merchants",
+    "description": "descriptions",
+    "transaction_type": "transaction_types",
+    "payment_method": "payment_methods",
+}
+_COLUMNS = _NUMERIC_COLUMNS + tuple(_ENCODED_COLUMNS)
+_SNAPSHOT_META = "snapshot.json"
+
+
+def save_snapshot(store: TransactionStore, path: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Write a store to the snapshot `path`, replacing any previous snapshot atomically.
+    The files go into a fresh sibling directory and `path` is a symlink swapped onto it last,
+    so concurrent writers never collide and readers see either the old or the new snapshot.
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    data_dir = tempfile.mkdtemp(prefix=f"{name}.", dir=parent)
+    link = f"{data_dir}.link"
+    try:
+        for column in _COLUMNS:
+            np.save(os.path.join(data_dir, f"{column}.npy"), getattr(store, column))
+        meta = {
+            "rows": len(store),
+            "vocabularies": {column: getattr(store, name) for column, name in _ENCODED_COLUMNS.items()},
+            "metadata": metadata or {},
+        }
+        with open(os.path.join(data_dir, _SNAPSHOT_META), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.symlink(os.path.basename(data_dir), link)
+        previous = os.readlink(path) if os.path.islink(path) else None
+        if os.path.isdir(path) and not os.path.islink(path):
+            # A snapshot from before the symlink layout; it can't be swapped over in place
+            shutil.rmtree(path, ignore_errors=True)
+        os.replace(link, path)
+    except BaseException:
+        shutil.rmtree(data_dir, ignore_errors=True)
+        if os.path.lexists(link):
+            os.remove(link)
+        raise
+    if previous is not None and previous != os.path.basename(data_dir):
+        shutil.rmtree(os.path.join(parent, previous), ignore_errors=True)
+
+
+def load_snapshot(path: str, mmap: bool = True) -> Tuple[TransactionStore, Dict[str, Any]]:
+    """Load a snapshot written by save_snapshot; returns the store and its metadata"""
+    with open(os.path.join(path, _SNAPSHOT_META), encoding="utf-8") as f:
+        meta = json.load(f)
+    mode = "r" if mmap else None
+
+    def column(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+
+    store = TransactionStore(
+        **{name: column(name) for name in _NUMERIC_COLUMNS},
+        **{name: (column(name), meta["vocabularies"][name]) for name in _ENCODED_COLUMNS},
+    )
+    return store, meta["metadata"]
@@ -0,0 +1,68 @@
+import os
+import sys
+from typing import Dict
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import _customer_profile, generate_transaction_store
+from store import DailyRollup, TransactionStore, to_day_number
+
+
+def take(store: TransactionStore, lo: int, hi: int) -> TransactionStore:
+    """Rows [lo, hi) of a store as a new store sharing its vocabularies"""
+    return TransactionStore(
+        day=store.day[lo:hi],
+        amount=store.amount[lo:hi],
+        balance=store.balance[lo:hi],
+        transaction_id=store.transaction_id[lo:hi],
+        category=(store.category[lo:hi], store.categories),
+        merchant=(store.merchant[lo:hi], store.merchants),
+        description=(store.description[lo:hi], store.descriptions),
+        transaction_type=(store.transaction_type[lo:hi], store.transaction_types),
+        payment_method=(store.payment_method[lo:hi], store.payment_methods),
+    )
+
+
+def new_batch(start_date: str, amounts, category: str = "Shopping", merchant: str = "New Merchant") -> TransactionStore:
+    """An unstamped batch (no IDs or balances yet), one transaction per day from start_date"""
+    day = to_day_number(start_date) + np.arange(len(amounts))
+    return TransactionStore.from_columns({
+        "day": day,
+        "amount": amounts,
+        "balance": np.zeros(len(amounts)),
+        "transaction_id": [""] * len(amounts),
+        "category": [category] * len(amounts),
+        "merchant": [merchant] * len(amounts),
+        "description": [f"{merchant} purchase"] * len(amounts),
+        "transaction_type": ["debit" if amount < 0 else "credit" for amount in amounts],
+        "payment_method": ["card"] * len(amounts),
+    })
+
+
+def rollup_totals(rollup: DailyRollup, start_day: int, end_day: int) -> Dict[tuple, np.ndarray]:
+    """Window totals keyed by (category, merchant) name, comparable across vocabulary orders"""
+    totals = rollup.window(start_day, end_day)
+    return {
+        (rollup.categories[c], rollup.merchants[m]): totals[p]
+        for p, (c, m) in enumerate(zip(rollup.pair_category.tolist(), rollup.pair_merchant.tolist()))
+        if totals[p].any()
+    }
+
+
+def assert_same_totals(actual: DailyRollup, expected: DailyRollup, start_day: int, end_day: int) -> None:
+    actual_totals, expected_totals = rollup_totals(actual, start_day, end_day), rollup_totals(expected, start_day, end_day)
+    assert actual_totals.keys() == expected_totals.keys()
+    for pair, totals in expected_totals.items():
+        np.testing.assert_allclose(actual_totals[pair], totals, err_msg=str(pair))
+
+
+@pytest.fixture
+def ledger() -> TransactionStore:
+    return generate_transaction_store("2024-01-01", "2024-06-30", np.random.default_rng(7))
+
+
+@pytest.fixture
+def customer():
+    return _customer_profile("CUST002")
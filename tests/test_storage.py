@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+from conftest import assert_same_totals, new_batch, take
+from storage import CustomerDataset, MemoryBackend, SQLiteBackend
+from store import AnomalyScores, DailyRollup, to_day_number
+
+
+@pytest.fixture
+def memory_backend(ledger, customer):
+    loads = []
+
+    def loader(customer_id):
+        loads.append(customer_id)
+        return CustomerDataset(customer.model_copy(update={"customer_id": customer_id}), take(ledger, 0, len(ledger)), 1)
+
+    backend = MemoryBackend(loader, max_entries=8, max_bytes=2 ** 30)
+    backend.loads = loads
+    return backend
+
+
+@pytest.fixture
+def sqlite_backend(ledger, customer, tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "ledger.sqlite3"))
+    backend.import_customer(customer, ledger)
+    yield backend
+    backend.close()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request):
+    return request.getfixturevalue(f"{request.param}_backend")
+
+
+def _with_last_id(ledger, number):
+    """The ledger renumbered so its last transaction ID is TXN<number>"""
+    store = take(ledger, 0, len(ledger))
+    numbers = np.arange(number - len(store) + 1, number + 1)
+    store.transaction_id = np.char.add("TXN", np.char.zfill(numbers.astype(str), 6))
+    return store
+
+
+def test_append_keeps_cached_rollup_and_store_coherent(backend, customer, ledger):
+    cid = customer.customer_id
+    # Prime the caches so the append has to extend them rather than rebuild
+    backend.get_rollup(cid)
+    backend.get_store(cid, anomalies=True)
+    version = backend.get_version(cid)
+
+    batch = new_batch("2024-07-01", [-120.0, -35.5, 2500.0], category="Pets", merchant="Pet Shop")
+    new_version, stored = backend.append(cid, batch)
+    assert new_version > version and backend.get_version(cid) == new_version
+
+    store = backend.get_store(cid, anomalies=True)
+    assert len(store) == len(ledger) + 3
+    np.testing.assert_array_equal(store.transaction_id[-3:], stored.transaction_id)
+    np.testing.assert_allclose(
+        store.balance[-3:], np.maximum(np.round(ledger.balance[-1] + np.cumsum(batch.amount), 2), 0.0)
+    )
+    assert_same_totals(backend.get_rollup(cid), DailyRollup.build(store), int(ledger.day[0]), to_day_number("2024-07-03"))
+    np.testing.assert_allclose(store.anomalies().scores, AnomalyScores.build(store).scores, equal_nan=True)
+    assert backend.get_range(cid, to_day_number("2024-07-01"), to_day_number("2024-07-31")).to_columns()[
+        "merchant"
+    ] == ["Pet Shop"] * 3
+
+
+def test_sqlite_append_matches_fresh_reader(sqlite_backend, customer, ledger):
+    cid = customer.customer_id
+    sqlite_backend.get_rollup(cid)
+    sqlite_backend.get_store(cid)
+    sqlite_backend.append(cid, new_batch("2024-07-01", [-80.0, -15.0]))
+    sqlite_backend.append(cid, new_batch("2024-07-02", [-60.0]))
+
+    fresh = SQLiteBackend(sqlite_backend.path)
+    try:
+        cached, stored = sqlite_backend.get_store(cid), fresh.get_store(cid)
+        np.testing.assert_array_equal(cached.transaction_id, stored.transaction_id)
+        np.testing.assert_allclose(cached.balance, stored.balance)
+        assert_same_totals(
+            sqlite_backend.get_rollup(cid), fresh.get_rollup(cid), int(ledger.day[0]), to_day_number("2024-07-02")
+        )
+        assert sqlite_backend.get_fingerprint(cid) == fresh.get_fingerprint(cid)
+    finally:
+        fresh.close()
+
+
+def test_readers_keep_their_snapshot_across_appends(backend, customer, ledger):
+    cid = customer.customer_id
+    before = backend.get_store(cid)
+    backend.append(cid, new_batch("2024-07-01", [-10.0]))
+    assert len(before) == len(ledger)
+    assert len(backend.get_store(cid)) == len(ledger) + 1
+
+
+def test_append_before_last_day_is_rejected(backend, customer):
+    version = backend.get_version(customer.customer_id)
+    with pytest.raises(ValueError):
+        backend.append(customer.customer_id, new_batch("2024-01-01", [-10.0]))
+    assert backend.get_version(customer.customer_id) == version
+
+
+@pytest.mark.parametrize("backend_name", ["memory", "sqlite"])
+def test_transaction_ids_roll_over_past_999999(backend_name, customer, ledger, tmp_path):
+    store = _with_last_id(ledger, 999999)
+    if backend_name == "memory":
+        backend = MemoryBackend(lambda cid: CustomerDataset(customer, store, 1), max_entries=8, max_bytes=2 ** 30)
+    else:
+        backend = SQLiteBackend(str(tmp_path / "rollover.sqlite3"))
+        backend.import_customer(customer, store)
+
+    _, first = backend.append(customer.customer_id, new_batch("2024-07-01", [-1.0, -2.0]))
+    # The next append must continue from TXN1000001, which sorts before TXN999999 as text
+    _, second = backend.append(customer.customer_id, new_batch("2024-07-03", [-3.0]))
+    assert first.transaction_id.tolist() == ["TXN1000000", "TXN1000001"]
+    assert second.transaction_id.tolist() == ["TXN1000002"]
+    backend.close()
+
+
+def test_memory_backend_loads_once_and_tracks_bytes(memory_backend, customer):
+    cid = customer.customer_id
+    dataset = memory_backend.get_dataset(cid)
+    assert memory_backend.get_dataset(cid) is dataset
+    assert memory_backend.loads == [cid]
+    # The rollup is built before the dataset is sized, so the budget counts it
+    assert dataset.store._rollup is not None
+    assert memory_backend.stats()["bytes"] == dataset.nbytes
+
+    memory_backend.get_store(cid, anomalies=True)
+    assert memory_backend.stats()["bytes"] == dataset.nbytes
+    assert dataset.store.anomalies().nbytes > 0
+
+
+def test_memory_backend_evicts_least_recently_used_by_bytes(memory_backend):
+    size = memory_backend.get_dataset("CUST001").nbytes
+    backend = MemoryBackend(memory_backend._loader, max_entries=8, max_bytes=int(size * 2.5))
+    for cid in ("CUST001", "CUST002", "CUST001", "CUST003"):
+        backend.get_dataset(cid)
+
+    stats = backend.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    assert stats["bytes"] == 2 * size
+    # CUST002 was least recently used, so it went and is loaded again on next use
+    loads = len(memory_backend.loads)
+    backend.get_dataset("CUST001")
+    assert len(memory_backend.loads) == loads
+    backend.get_dataset("CUST002")
+    assert len(memory_backend.loads) == loads + 1
+
+
+def test_memory_backend_rejects_ledger_over_budget(memory_backend, customer):
+    size = memory_backend.get_dataset(customer.customer_id).nbytes
+    backend = MemoryBackend(memory_backend._loader, max_entries=8, max_bytes=size)
+    backend.get_dataset(customer.customer_id)
+    version = backend.get_version(customer.customer_id)
+    with pytest.raises(ValueError):
+        backend.append(customer.customer_id, new_batch("2024-07-01", [-5.0] * 100))
+    assert backend.get_version(customer.customer_id) == version
+
+
+def test_memory_backend_forgets_evicted_ingested_customers(memory_backend, customer):
+    cid = customer.customer_id
+    size = memory_backend.get_dataset(cid).nbytes
+    backend = MemoryBackend(memory_backend._loader, max_entries=1, max_bytes=size * 4)
+    backend.append(cid, new_batch("2024-07-01", [-5.0]))
+    assert backend.stats()["ingested_customers"] == 1
+    backend.get_dataset("CUST009")
+    assert backend.stats()["ingested_customers"] == 0
+    # Reloading restores the generated ledger without the dropped append
+    assert len(backend.get_store(cid)) == len(memory_backend.get_store(cid))
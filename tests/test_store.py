@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from conftest import assert_same_totals, new_batch, take
+from store import AnomalyScores, DailyRollup, load_snapshot, save_snapshot
+
+
+def _split_points(store, parts):
+    return np.linspace(0, len(store), parts + 1).astype(int).tolist()
+
+
+@pytest.mark.parametrize("parts", [2, 5])
+def test_extended_rollup_matches_rebuild(ledger, parts):
+    bounds = _split_points(ledger, parts)
+    store = take(ledger, 0, bounds[1])
+    store.rollup()
+    for lo, hi in zip(bounds[1:], bounds[2:]):
+        store = store.appended(take(ledger, lo, hi))
+
+    rebuilt = DailyRollup.build(ledger)
+    first, last = int(ledger.day[0]), int(ledger.day[-1])
+    assert_same_totals(store.rollup(), rebuilt, first, last)
+    # Windows that start or end inside an appended batch, including a day split across batches
+    middle = int(ledger.day[bounds[1]])
+    assert_same_totals(store.rollup(), rebuilt, middle, last)
+    assert_same_totals(store.rollup(), rebuilt, first, middle)
+    assert_same_totals(store.rollup(), rebuilt, middle, middle)
+
+
+def test_extended_rollup_adds_new_categories_and_merchants(ledger):
+    batch = new_batch("2024-07-01", [-25.0, -40.0], category="Pets", merchant="Pet Shop")
+    ledger.rollup()
+    store = ledger.appended(batch)
+    rollup = store.rollup()
+    assert "Pets" in rollup.categories and "Pet Shop" in rollup.merchants
+    assert_same_totals(rollup, DailyRollup.build(store), int(ledger.day[0]), int(batch.day[-1]))
+
+
+@pytest.mark.parametrize("parts", [2, 7])
+def test_extended_anomaly_scores_match_rebuild(ledger, parts):
+    bounds = _split_points(ledger, parts)
+    store = take(ledger, 0, bounds[1])
+    store.anomalies()
+    for lo, hi in zip(bounds[1:], bounds[2:]):
+        store = store.appended(take(ledger, lo, hi))
+
+    np.testing.assert_allclose(store.anomalies().scores, AnomalyScores.build(ledger).scores, equal_nan=True)
+
+
+def test_appended_leaves_original_store_unchanged(ledger):
+    half = len(ledger) // 2
+    store = take(ledger, 0, half)
+    rollup, scores = store.rollup(), store.anomalies().scores.copy()
+    appended = store.appended(take(ledger, half, len(ledger)))
+
+    assert len(store) == half and len(appended) == len(ledger)
+    assert store.rollup() is rollup
+    np.testing.assert_array_equal(store.anomalies().scores, scores)
+    np.testing.assert_array_equal(appended.day, ledger.day)
+
+
+def test_append_before_last_day_is_rejected(ledger):
+    with pytest.raises(ValueError):
+        take(ledger, len(ledger) // 2, len(ledger)).appended(take(ledger, 0, 1))
+
+
+def test_nbytes_counts_rollup_and_anomaly_scores(ledger):
+    columns_only = ledger.nbytes
+    ledger.rollup()
+    with_rollup = ledger.nbytes
+    ledger.anomalies()
+    assert with_rollup == columns_only + ledger.rollup().nbytes
+    assert ledger.nbytes == with_rollup + ledger.anomalies().nbytes
+
+
+def test_snapshot_round_trip_and_replace(ledger, tmp_path):
+    path = str(tmp_path / "CUST002")
+    save_snapshot(take(ledger, 0, 10), path, {"generation": 1})
+    save_snapshot(ledger, path, {"generation": 2})
+
+    store, metadata = load_snapshot(path)
+    assert metadata == {"generation": 2}
+    np.testing.assert_array_equal(store.amount, ledger.amount)
+    assert store.rows(0, 5) == ledger.rows(0, 5)
+    # Only the live snapshot's directory and its pointer are left behind
+    assert len(list(tmp_path.iterdir())) == 2